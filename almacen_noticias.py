@@ -0,0 +1,114 @@
+# almacen_noticias.py
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+# Almacén local (SQLite) de artículos ya descargados desde Event Registry.
+# - Clave: URL canónica (url_key)
+# - Por host guarda la cobertura continua [cubre_desde, hwm] ya descargada,
+#   para pedirle a ER solo lo más nuevo que el último artículo visto.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articulos (
+    url_key     TEXT PRIMARY KEY,
+    host        TEXT NOT NULL,
+    published   TEXT NOT NULL,   -- UTC "YYYY-MM-DDTHH:MM:SSZ" (orden lexicográfico = cronológico)
+    url         TEXT NOT NULL,
+    title       TEXT NOT NULL,
+    description TEXT NOT NULL,
+    fetched_at  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_articulos_host_pub ON articulos(host, published);
+CREATE TABLE IF NOT EXISTS fuentes (
+    host        TEXT PRIMARY KEY,
+    cubre_desde TEXT NOT NULL,
+    hwm         TEXT NOT NULL
+);
+"""
+
+def _fmt(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _parse(s: str) -> datetime:
+    return datetime.fromisoformat(s.replace("Z", "+00:00"))
+
+class AlmacenArticulos:
+    """Store SQLite thread-safe (una conexión + lock) usado por los fetch concurrentes."""
+
+    def __init__(self, path: str):
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def cobertura(self, host: str) -> tuple[datetime, datetime] | None:
+        """(cubre_desde, hwm) ya descargados sin huecos para el host, o None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT cubre_desde, hwm FROM fuentes WHERE host = ?", (host,)
+            ).fetchone()
+        if not row:
+            return None
+        return _parse(row[0]), _parse(row[1])
+
+    def guardar(self, host: str, filas: list[dict]) -> None:
+        """Upsert de filas {url_key, url, title, description, published(datetime)}."""
+        ahora = _fmt(datetime.now(timezone.utc))
+        datos = [
+            (f["url_key"], host, _fmt(f["published"]), f["url"], f["title"], f["description"], ahora)
+            for f in filas if f.get("published") is not None
+        ]
+        if not datos:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO articulos (url_key, host, published, url, title, description, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(url_key) DO UPDATE SET "
+                "  title = excluded.title, description = excluded.description, "
+                "  published = excluded.published, url = excluded.url",
+                datos,
+            )
+            self._conn.commit()
+
+    def actualizar_cobertura(self, host: str, cubre_desde: datetime, hwm: datetime) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO fuentes (host, cubre_desde, hwm) VALUES (?, ?, ?) "
+                "ON CONFLICT(host) DO UPDATE SET cubre_desde = excluded.cubre_desde, hwm = excluded.hwm",
+                (host, _fmt(cubre_desde), _fmt(hwm)),
+            )
+            self._conn.commit()
+
+    def ventana(self, host: str, desde: datetime, hasta: datetime) -> list[dict]:
+        """Artículos del host publicados en [desde, hasta], más nuevos primero."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, title, description, published FROM articulos "
+                "WHERE host = ? AND published >= ? AND published <= ? "
+                "ORDER BY published DESC",
+                (host, _fmt(desde), _fmt(hasta)),
+            ).fetchall()
+        return [
+            {"url": r[0], "title": r[1], "description": r[2], "published": _parse(r[3]), "publishedAt": r[3]}
+            for r in rows
+        ]
+
+    def purgar(self, antes_de: datetime) -> int:
+        """Elimina artículos anteriores a `antes_de` y ajusta la cobertura declarada."""
+        lim = _fmt(antes_de)
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM articulos WHERE published < ?", (lim,))
+            self._conn.execute("UPDATE fuentes SET cubre_desde = ? WHERE cubre_desde < ?", (lim, lim))
+            self._conn.commit()
+            return cur.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
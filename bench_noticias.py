@@ -0,0 +1,474 @@
+# bench_noticias.py
+"""
+Benchmark offline de los hot paths (sin llaves de Event Registry ni OpenAI).
+
+Genera corpus sintéticos de noticias en español y listas sintéticas de empresas/alias,
+instala stand-ins en proceso para `eventregistry` y `openai`, y mide por etapa
+tiempo, throughput y (opcional) peak de memoria, escalando artículos y empresas.
+
+Uso:
+  python bench_noticias.py --articulos 1000,10000,100000 --empresas 62,500,5000 --salida bench.json
+
+Modo carga IA (--ia-carga N): clasifica N ítems contra un stand-in de OpenAI con latencia, 429
+inyectados y límites RPM/TPM propios (responde 429 + retry-after al excederlos), y reporta lo que el
+servidor aceptó por ventana de 60 s, los 429 vistos y los reintentos del cliente:
+  python bench_noticias.py --ia-carga 1500 --ia-latencia 0.2 --ia-429 0.1 --ia-rpm 120 --ia-tpm 200000
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import re
+import sys
+import time
+import threading
+import tracemalloc
+import types
+import unicodedata
+from datetime import datetime, timedelta, timezone
+
+# ===================== STAND-INS (antes de importar solo_apis) =====================
+_CORPUS_POR_HOST: dict[str, list[dict]] = {}
+
+class _FakeEventRegistry:
+    def __init__(self, apiKey=None, **kw):
+        pass
+
+    def getSourceUri(self, host):
+        host = host[4:] if host.startswith("www.") else host
+        return host if host in _CORPUS_POR_HOST else None
+
+def _sin_tildes(s: str) -> str:
+    return unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode("ascii").lower()
+
+class _FakeQueryItems:
+    def __init__(self, items):
+        self.items = list(items)
+
+    @classmethod
+    def OR(cls, items):
+        return cls(items)
+
+class _FakeArticleInfoFlags:
+    def __init__(self, bodyLen=-1, **kw):
+        self.bodyLen = bodyLen
+
+class _FakeReturnInfo:
+    def __init__(self, articleInfo=None, **kw):
+        self.articleInfo = articleInfo or _FakeArticleInfoFlags()
+
+class _FakeQueryArticlesIter:
+    """Sirve el corpus por host; con `keywords` filtra como el keyword search de ER (sin tildes, palabra completa)."""
+
+    def __init__(self, sourceUri=None, keywords=None, **kw):
+        self.source = sourceUri
+        terminos = keywords.items if isinstance(keywords, _FakeQueryItems) else ([keywords] if keywords else [])
+        self.patron = (re.compile(r"\b(?:" + "|".join(re.escape(_sin_tildes(t)) for t in terminos) + r")\b")
+                       if terminos else None)
+
+    def execQuery(self, er, sortBy="rel", sortByAsc=False, maxItems=100, returnInfo=None, **kw):
+        body_len = returnInfo.articleInfo.bodyLen if returnInfo is not None else -1
+        arts = _CORPUS_POR_HOST.get(self.source, [])
+        if sortBy == "date":
+            arts = sorted(arts, key=lambda a: a["dateTime"], reverse=not sortByAsc)
+        n = 0
+        for art in arts:
+            if n >= maxItems:
+                return
+            if self.patron and not self.patron.search(_sin_tildes(f"{art['title']} {art['body']}")):
+                continue
+            n += 1
+            yield {**art, "body": art["body"][:body_len]} if body_len >= 0 else art
+
+class _FakeCompletions:
+    """Responde ALTA/MEDIA/BAJA/NULA a cada id del payload, sin red."""
+
+    def create(self, model=None, messages=None, **kw):
+        payload = json.loads(messages[-1]["content"].split("\n", 1)[1])
+        ids = []
+        for c in payload:
+            ids.extend(o["id"] for o in c.get("objetivos", [c]))
+        cats = ["ALTA", "MEDIA", "BAJA", "NULA"]
+        content = json.dumps([{"id": i, "categoria": cats[hash(i) % 4]} for i in ids])
+        msg = types.SimpleNamespace(content=content)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=msg)],
+                                     usage=types.SimpleNamespace(prompt_tokens=0, completion_tokens=0))
+
+class _FakeRateLimitError(Exception):
+    """Forma de openai.RateLimitError que mira filtro_IA: status_code y response.headers."""
+
+    def __init__(self, msg: str, retry_after: float | None = None):
+        super().__init__(msg)
+        self.status_code = 429
+        headers = {} if retry_after is None else {"retry-after": f"{retry_after:.3f}"}
+        self.response = types.SimpleNamespace(headers=headers)
+
+class _CupoServidor:
+    """Token bucket del lado servidor (capacidad = límite por minuto), sin bloquear."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.t = time.monotonic()
+
+    def falta(self, n: float, ahora: float) -> float:
+        """Segundos hasta que alcancen `n` unidades (0 = alcanzan ya; no descuenta)."""
+        if self.rate <= 0:
+            return 0.0
+        self.tokens = min(self.capacity, self.tokens + (ahora - self.t) * self.rate)
+        self.t = ahora
+        return max(0.0, (min(n, self.capacity) - self.tokens) / self.rate)
+
+    def tomar(self, n: float) -> None:
+        if self.rate > 0:
+            self.tokens -= min(n, self.capacity)
+
+class _FakeCompletionsCarga(_FakeCompletions):
+    """
+    Como _FakeCompletions, pero con `latencia` por request, una fracción `p429` de 429 sin
+    retry-after (backoff con jitter del cliente) y límites RPM/TPM del servidor: si no hay cupo
+    responde 429 con retry-after, como la API real. Los tokens se cuentan con la misma regla
+    de ~4 caracteres por token y se reportan en `usage`; `aceptados` registra (t, tokens).
+    """
+
+    def __init__(self, latencia: float, p429: float, rpm: float, tpm: float, seed: int):
+        self.latencia = latencia
+        self.p429 = p429
+        self.rpm = _CupoServidor(rpm)
+        self.tpm = _CupoServidor(tpm)
+        self.rng = random.Random(seed)
+        self.aceptados: list[tuple[float, int]] = []
+        self.rechazos_limite = 0
+        self.rechazos_inyectados = 0
+        self._lock = threading.Lock()
+
+    def create(self, model=None, messages=None, **kw):
+        prompt = sum(len(m["content"]) // 4 + 1 for m in messages)
+        resp = super().create(model=model, messages=messages, **kw)
+        completion = len(resp.choices[0].message.content) // 4 + 1
+        with self._lock:
+            ahora = time.monotonic()
+            if self.rng.random() < self.p429:
+                self.rechazos_inyectados += 1
+                error = _FakeRateLimitError("429 inyectado")
+            else:
+                espera = max(self.rpm.falta(1, ahora), self.tpm.falta(prompt + completion, ahora))
+                if espera > 0:
+                    self.rechazos_limite += 1
+                    error = _FakeRateLimitError("Rate limit reached", retry_after=espera)
+                else:
+                    error = None
+                    self.rpm.tomar(1)
+                    self.tpm.tomar(prompt + completion)
+                    self.aceptados.append((ahora, prompt + completion))
+        if error is not None:
+            raise error
+        time.sleep(self.latencia)
+        resp.usage = types.SimpleNamespace(prompt_tokens=prompt, completion_tokens=completion)
+        return resp
+
+# Completions que entrega el cliente falso (None = _FakeCompletions instantáneo)
+_COMPLETIONS: _FakeCompletions | None = None
+
+class _FakeOpenAI:
+    def __init__(self, api_key=None, **kw):
+        self.chat = types.SimpleNamespace(completions=_COMPLETIONS or _FakeCompletions())
+
+def _instalar_stand_ins() -> None:
+    er = types.ModuleType("eventregistry")
+    er.EventRegistry = _FakeEventRegistry
+    er.QueryArticlesIter = _FakeQueryArticlesIter
+    er.QueryItems = _FakeQueryItems
+    er.ReturnInfo = _FakeReturnInfo
+    er.ArticleInfoFlags = _FakeArticleInfoFlags
+    oa = types.ModuleType("openai")
+    oa.OpenAI = _FakeOpenAI
+    sys.modules["eventregistry"] = er
+    sys.modules["openai"] = oa
+    # Sin disco ni red: solo medimos CPU/memoria de las etapas
+    os.environ["ER_API_KEY"] = "bench"
+    os.environ["OPENAI_API_KEY"] = "bench"
+    os.environ["ARTICLE_STORE_PATH"] = ""
+    os.environ["IA_CACHE_PATH"] = ""
+    os.environ["MATCHER_CACHE_DIR"] = ""
+    os.environ["IA_PRE_PATH"] = ""          # el pre-clasificador no debe entrenarse con etiquetas falsas
+    os.environ["IA_PRECLASIFICADOR"] = "0"
+    os.environ["IA_RPM"] = "0"
+    os.environ["IA_TPM"] = "0"
+
+_instalar_stand_ins()
+import filtro_IA  # noqa: E402
+import solo_apis as sa  # noqa: E402
+
+# ===================== CORPUS SINTÉTICO =====================
+_PALABRAS = (
+    "el la los las de del en por para con sin sobre tras ante según durante mercado gobierno "
+    "empresa compañía anunció informó aseguró señaló proyecto inversión millones dólares pesos "
+    "trimestre resultados ventas crecimiento caída alza baja precio tasa banco central ministro "
+    "regulador acuerdo contrato licitación directorio accionistas junta gerente ejecutivo "
+    "región santiago valparaíso concepción antofagasta minería energía retail salud tecnología"
+).split()
+
+def _empresas_sinteticas(n: int, rng: random.Random) -> tuple[list[str], dict[str, list[str]]]:
+    """Las empresas reales primero; el resto, emisores inventados con 2-3 alias."""
+    base = list(sa.empresas)[:n]
+    aliases = {e: list(sa.EMPRESA_ALIASES.get(e, [])) for e in base}
+    raices = ["Andes", "Pacífico", "Austral", "Cordillera", "Maule", "Biobío", "Atacama", "Patagonia"]
+    giros = ["Inversiones", "Inmobiliaria", "Energía", "Minera", "Forestal", "Pesquera", "Transportes", "Servicios"]
+    i = 0
+    while len(base) < n:
+        i += 1
+        nombre = f"{rng.choice(giros)} {rng.choice(raices)} {i} S.A."
+        corto = nombre.replace(" S.A.", "")
+        base.append(nombre)
+        aliases[nombre] = [corto, f"Grupo {corto}", f"{corto.split()[0][:3].upper()}{i}"][: rng.randint(2, 3)]
+    return base, aliases
+
+def _corpus(n_articulos: int, empresas: list[str], aliases: dict[str, list[str]],
+            rng: random.Random, p_mencion: float = 0.3, p_fuera: float = 0.0) -> dict[str, list[dict]]:
+    """
+    Artículos ER-like (title/body/url/dateTime) repartidos entre ER_SOURCES dentro de la ventana.
+    Una fracción `p_fuera` queda hasta 24 h antes de la ventana (ER filtra por día calendario).
+    """
+    kws = [k for ks in sa.INDUSTRIA_KEYWORDS.values() for k in ks]
+    hosts = [sa._normalize_domain(h) for h in sa.ER_SOURCES]
+    ahora = datetime.now(timezone.utc)
+    out: dict[str, list[dict]] = {h: [] for h in hosts}
+    for i in range(n_articulos):
+        host = hosts[i % len(hosts)]
+        palabras = [rng.choice(_PALABRAS) for _ in range(rng.randint(60, 110))]
+        if rng.random() < p_mencion:
+            e = rng.choice(empresas)
+            palabras.insert(rng.randrange(len(palabras)), rng.choice([e] + aliases.get(e, [])))
+        if rng.random() < 0.4:
+            palabras.insert(rng.randrange(len(palabras)), rng.choice(kws))
+        if rng.random() < p_fuera:
+            dt = ahora - timedelta(minutes=rng.uniform(sa.HOURS_BACK * 60 + 5, (sa.HOURS_BACK + 24) * 60))
+        else:
+            dt = ahora - timedelta(minutes=rng.uniform(1, sa.HOURS_BACK * 60 - 5))
+        out[host].append({
+            "title": " ".join(palabras[:12]).capitalize(),
+            "body": " ".join(palabras[12:]),
+            "url": f"https://www.{host}/noticias/{i}",
+            "dateTime": dt.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        })
+    return out
+
+# ===================== MEDICIÓN =====================
+def _medir(nombre: str, fn, unidades: int, memoria: bool) -> dict:
+    """Tiempo (y opcionalmente peak de memoria en una segunda pasada) de una etapa."""
+    t0 = time.perf_counter()
+    fn()
+    dt = time.perf_counter() - t0
+    res = {"etapa": nombre, "segundos": round(dt, 4), "unidades": unidades,
+           "throughput_por_s": round(unidades / dt, 1) if dt > 0 else None}
+    if memoria:
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        res["peak_mem_mb"] = round(peak / 1e6, 2)
+    return res
+
+def _configurar(empresas: list[str], aliases: dict[str, list[str]]) -> None:
+    sa.empresas[:] = empresas
+    sa.EMPRESA_ALIASES.clear()
+    sa.EMPRESA_ALIASES.update(aliases)
+    sa._ALIAS_MATCHER = None
+
+def _trafico_er() -> dict:
+    """Consultas, páginas (≈ tokens de ER; útiles = con algo en la ventana), artículos y bytes de la última descarga."""
+    c = sa.RUN_STATS["counts"]
+    return {k: sum(c.get(f"er_{k}_{h}", 0) for h in _CORPUS_POR_HOST)
+            for k in ("consultas", "paginas", "paginas_utiles", "items", "fuera_ventana", "bytes")}
+
+def correr_caso(n_articulos: int, n_empresas: int, memoria: bool, max_pares: int, seed: int,
+                corpus: dict[str, list[dict]] | None = None, p_fuera: float = 0.0) -> dict:
+    rng = random.Random(seed)
+    empresas, aliases = _empresas_sinteticas(n_empresas, rng)
+    _configurar(empresas, aliases)
+    _CORPUS_POR_HOST.clear()
+    _CORPUS_POR_HOST.update(corpus or _corpus(n_articulos, empresas, aliases, rng, p_fuera=p_fuera))
+    n_articulos = sum(len(v) for v in _CORPUS_POR_HOST.values())
+    sa.ER_MAX_ITEMS_RAW = n_articulos
+    etapas = []
+
+    def _fetch_modo(pushdown: bool):
+        def _fetch():
+            sa.ER_PUSHDOWN = pushdown
+            sa._ER_ARTICLES_CACHE_BY_HOST.clear()
+            sa.RUN_STATS["counts"].clear()
+            sa._er_articles_all_sources()
+        return _fetch
+    etapas.append(_medir("fetch_er", _fetch_modo(False), n_articulos, memoria))
+    trafico = {"completo": _trafico_er()}
+    arts = [a for arts in sa._ER_ARTICLES_CACHE_BY_HOST.values() for a in arts]
+
+    # Camino antiguo (empresas × artículos × alias) sobre una muestra acotada de pares
+    muestra = arts[: max(1, min(len(arts), max_pares // max(1, len(empresas))))]
+    def _contiene():
+        for a in muestra:
+            for e in empresas:
+                sa.contiene_empresa(a.title, a.description, e, aliases.get(e, []))
+    etapas.append(_medir("contiene_empresa", _contiene, len(muestra) * len(empresas), memoria))
+
+    def _industrias():
+        for a in arts:
+            a.industrias = None
+            sa.detectar_industrias_detalle(a)
+    etapas.append(_medir("detectar_industrias", _industrias, len(arts), memoria))
+
+    noticias: list[dict] = []
+    def _obtener():
+        noticias[:] = sa.obtener_noticias()
+    etapas.append(_medir("obtener_noticias", _obtener, len(arts), memoria))
+
+    klass: dict[str, str] = {}
+    def _clasificar():
+        klass.clear()
+        klass.update(sa._clasificar(noticias))
+    etapas.append(_medir("classify_batch_stand_in", _clasificar, len(noticias), memoria))
+
+    def _agrupar():
+        sa._group_and_collapse_by_url(noticias, klass)
+    etapas.append(_medir("group_and_collapse_by_url", _agrupar, len(noticias), memoria))
+
+    # Pushdown de alias a ER (al final: deja el caché de artículos con el subconjunto)
+    etapas.append(_medir("fetch_er_pushdown", _fetch_modo(True), n_articulos, memoria))
+    trafico["pushdown"] = _trafico_er()
+    sa.ER_PUSHDOWN = False
+
+    return {"articulos": n_articulos, "empresas": n_empresas, "items": len(noticias), "etapas": etapas,
+            "trafico_er": trafico}
+
+# ===================== CARGA IA (latencia + 429) =====================
+def _max_en_ventana(eventos: list[tuple[float, int]], segundos: float = 60.0) -> tuple[int, int]:
+    """Máximo de (requests, tokens) aceptados dentro de cualquier ventana de `segundos`."""
+    max_req = max_tok = tok = 0
+    i = 0
+    for j, (t, n) in enumerate(eventos):
+        tok += n
+        while t - eventos[i][0] >= segundos:
+            tok -= eventos[i][1]
+            i += 1
+        max_req = max(max_req, j - i + 1)
+        max_tok = max(max_tok, tok)
+    return max_req, max_tok
+
+def correr_carga_ia(n_items: int, latencia: float, p429: float, rpm: float, tpm: float,
+                    lote: int, limitador: bool, seed: int) -> dict:
+    """
+    Clasifica `n_items` contra _FakeCompletionsCarga con el cliente configurado a los mismos
+    RPM/TPM que el servidor (o sin limitador, para ver los 429 y el backoff solos).
+    Con el limitador, `rechazos_limite` debe quedar en 0 y el máximo por ventana de 60 s
+    acotado por el bucket (capacidad + 1 min de recarga = 2 × límite).
+    """
+    global _COMPLETIONS
+    rng = random.Random(seed)
+    servidor = _COMPLETIONS = _FakeCompletionsCarga(latencia, p429, rpm, tpm, seed)
+    filtro_IA._CLIENT = None
+    filtro_IA.BATCH_SIZE = lote
+    filtro_IA.IA_RPM, filtro_IA.IA_TPM = (rpm, tpm) if limitador else (0, 0)
+    filtro_IA._RPM_BUCKET = filtro_IA._TokenBucket(filtro_IA.IA_RPM)
+    filtro_IA._TPM_BUCKET = filtro_IA._TokenBucket(filtro_IA.IA_TPM)
+    filtro_IA.IA_STATS.clear()
+    filtro_IA.IA_LOTES.clear()
+    items = [{"id": f"n{i}", "titulo": " ".join(rng.choice(_PALABRAS) for _ in range(12)) + f" {i}",
+              "descripcion": " ".join(rng.choice(_PALABRAS) for _ in range(40)),
+              "empresa": "Empresa Bench S.A.", "industrias": [], "tipo": "empresa"}
+             for i in range(n_items)]
+
+    t0 = time.perf_counter()
+    try:
+        out = filtro_IA.classify_batch(items)
+    finally:
+        _COMPLETIONS = None
+        filtro_IA._CLIENT = None
+    segundos = time.perf_counter() - t0
+
+    max_req, max_tok = _max_en_ventana(servidor.aceptados)
+    lotes = filtro_IA.IA_LOTES
+    return {
+        "items": n_items,
+        "limitador_cliente": limitador,
+        "servidor": {"latencia_s": latencia, "p429": p429, "rpm": rpm, "tpm": tpm},
+        "segundos": round(segundos, 2),
+        "requests_aceptados": len(servidor.aceptados),
+        "max_requests_60s": max_req,
+        "max_tokens_60s": max_tok,
+        "rpm_medio": round(len(servidor.aceptados) * 60 / segundos, 1) if segundos else None,
+        "tpm_medio": round(sum(n for _, n in servidor.aceptados) * 60 / segundos, 1) if segundos else None,
+        "rechazos_limite": servidor.rechazos_limite,
+        "rechazos_inyectados": servidor.rechazos_inyectados,
+        "reintentos": sum(l["intentos"] - 1 for l in lotes),
+        "max_intentos": max((l["intentos"] for l in lotes), default=0),
+        "sin_clasificar": sum(1 for r in out if r.get("categoria") == "SIN CLASIFICAR"),
+    }
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--articulos", default="1000,10000,100000", help="tamaños de corpus, separados por coma")
+    ap.add_argument("--empresas", default="62,500,5000", help="tamaños de watchlist, separados por coma")
+    ap.add_argument("--sin-memoria", action="store_true", help="no medir peak de memoria (más rápido)")
+    ap.add_argument("--max-pares", type=int, default=20_000,
+                    help="tope de pares (empresa, artículo) para medir contiene_empresa")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--corpus", default="",
+                    help="JSON grabado {host: [artículos ER]} en vez del corpus sintético (ignora --articulos)")
+    ap.add_argument("--fuera-ventana", type=float, default=0.0,
+                    help="fracción del corpus sintético anterior a la ventana (mide el corte temprano del paginado)")
+    ap.add_argument("--ia-carga", type=int, default=0,
+                    help="ítems a clasificar contra el stand-in con latencia y 429 (0 = modo hot paths)")
+    ap.add_argument("--ia-latencia", type=float, default=0.2, help="segundos por request del stand-in")
+    ap.add_argument("--ia-429", type=float, default=0.1, help="fracción de requests con 429 inyectado")
+    ap.add_argument("--ia-rpm", type=float, default=120, help="límite de requests/min del stand-in y del cliente")
+    ap.add_argument("--ia-tpm", type=float, default=200_000, help="límite de tokens/min del stand-in y del cliente")
+    ap.add_argument("--ia-lote", type=int, default=10, help="objetivos por request (BATCH_SIZE)")
+    ap.add_argument("--ia-sin-limitador", action="store_true",
+                    help="cliente sin RPM/TPM propios: solo los 429 y el backoff lo frenan")
+    ap.add_argument("--salida", default="-", help="archivo JSON de resultados ('-' = stdout)")
+    args = ap.parse_args(argv)
+
+    sa.DEBUG_SUMMARY = False
+    filtro_IA.VERBOSE = False
+    sa.HOURS_BACK = 14.5
+
+    reporte = {
+        "fecha": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "python": sys.version.split()[0],
+    }
+    if args.ia_carga:
+        with contextlib.redirect_stdout(sys.stderr):
+            reporte["carga_ia"] = correr_carga_ia(args.ia_carga, args.ia_latencia, args.ia_429, args.ia_rpm,
+                                                  args.ia_tpm, args.ia_lote, not args.ia_sin_limitador, args.seed)
+        return _escribir(reporte, args.salida)
+
+    corpus = None
+    if args.corpus:
+        with open(args.corpus, encoding="utf-8") as fh:
+            corpus = {sa._normalize_domain(h): arts for h, arts in json.load(fh).items()}
+    casos = []
+    # Los logs del pipeline van a stderr para no ensuciar el JSON en stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        for n_emp in [int(x) for x in args.empresas.split(",") if x.strip()]:
+            for n_art in [int(x) for x in args.articulos.split(",") if x.strip()]:
+                print(f"… {n_art} artículos × {n_emp} empresas", flush=True)
+                casos.append(correr_caso(n_art, n_emp, not args.sin_memoria, args.max_pares, args.seed, corpus,
+                                         args.fuera_ventana))
+
+    reporte["casos"] = casos
+    return _escribir(reporte, args.salida)
+
+def _escribir(reporte: dict, salida: str) -> int:
+    texto = json.dumps(reporte, ensure_ascii=False, indent=2)
+    if salida == "-":
+        print(texto)
+    else:
+        with open(salida, "w", encoding="utf-8") as fh:
+            fh.write(texto)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+# duplicados_noticias.py
+import re
+import threading
+from typing import Any, Hashable
+
+# Detección de casi-duplicados (misma nota en DF / La Tercera / EMOL, o cable repetido).
+# - Firma MinHash "one permutation" (un hash por shingle, repartido en k bins con
+#   densificación por rotación) sobre shingles de palabras del texto normalizado.
+# - Índice LSH por bandas: solo se comparan artículos que comparten algún bucket,
+#   así el costo crece ~lineal con el corpus (no todos contra todos).
+# - Los candidatos se verifican con la similitud estimada y se unen con union-find.
+
+_TOKEN_RE = re.compile(r"\w+")
+_MASK = (1 << 64) - 1
+
+class IndiceDuplicados:
+    """
+    Índice incremental de casi-duplicados (thread-safe).
+
+    `agregar(clave, texto, obj)` devuelve el representante actual del cluster del
+    artículo (el primero que llegó). `umbral` es la similitud Jaccard estimada mínima
+    para unir; `bandas` × `filas` = largo de la firma (bins MinHash).
+    """
+
+    def __init__(self, umbral: float = 0.7, bandas: int = 8, filas: int = 4,
+                 shingle: int = 3, min_shingles: int = 12):
+        self.umbral = umbral
+        self.bandas = bandas
+        self.filas = filas
+        self.shingle = shingle
+        self.min_shingles = min_shingles
+        self._buckets: list[dict[tuple, list[int]]] = [{} for _ in range(bandas)]
+        self._firmas: list[tuple[int, ...] | None] = []
+        self._padre: list[int] = []
+        self._objs: list[Any] = []
+        self._pos: dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    def _firma(self, texto: str) -> tuple[int, ...] | None:
+        toks = _TOKEN_RE.findall(texto)
+        w = self.shingle
+        shingles = {hash(" ".join(toks[i:i + w])) & _MASK for i in range(max(0, len(toks) - w + 1))}
+        if len(shingles) < self.min_shingles:
+            return None  # texto demasiado corto: no se agrupa (evita falsos positivos)
+        k = self.bandas * self.filas
+        bins: list[int | None] = [None] * k
+        for h in shingles:
+            b, v = h % k, h // k
+            if bins[b] is None or v < bins[b]:
+                bins[b] = v
+        # Bin vacío: toma el del siguiente bin no vacío, desplazado por la distancia
+        firma = []
+        for j in range(k):
+            d = 0
+            while bins[(j + d) % k] is None:
+                d += 1
+            firma.append(bins[(j + d) % k] + (d << 64))
+        return tuple(firma)
+
+    def _raiz(self, i: int) -> int:
+        while self._padre[i] != i:
+            self._padre[i] = self._padre[self._padre[i]]
+            i = self._padre[i]
+        return i
+
+    def _unir(self, i: int, j: int) -> None:
+        ri, rj = self._raiz(i), self._raiz(j)
+        if ri != rj:
+            # La raíz es siempre el miembro más antiguo (= representante estable)
+            self._padre[max(ri, rj)] = min(ri, rj)
+
+    def agregar(self, clave: Hashable, texto: str, obj: Any = None) -> Any:
+        """Indexa un artículo (idempotente por clave) y devuelve el objeto representante."""
+        firma = self._firma(texto)  # fuera del lock: es lo caro
+        with self._lock:
+            if clave in self._pos:
+                return self._objs[self._raiz(self._pos[clave])]
+            i = len(self._objs)
+            self._pos[clave] = i
+            self._objs.append(obj)
+            self._padre.append(i)
+            self._firmas.append(firma)
+            if firma is None:
+                return obj
+            n = len(firma)
+            vistos: set[int] = set()
+            for b in range(self.bandas):
+                banda = firma[b * self.filas:(b + 1) * self.filas]
+                cands = self._buckets[b].setdefault(banda, [])
+                for j in cands:
+                    if j in vistos:
+                        continue
+                    vistos.add(j)
+                    otra = self._firmas[j]
+                    if sum(x == y for x, y in zip(firma, otra)) / n >= self.umbral:
+                        self._unir(i, j)
+                cands.append(i)
+            return self._objs[self._raiz(i)]
+
+    def representante(self, clave: Hashable) -> Any:
+        with self._lock:
+            i = self._pos.get(clave)
+            return None if i is None else self._objs[self._raiz(i)]
+
+    def clusters(self) -> list[list[Any]]:
+        """Clusters con más de un miembro (en orden de llegada; el primero es el representante)."""
+        with self._lock:
+            por_raiz: dict[int, list[Any]] = {}
+            for i, obj in enumerate(self._objs):
+                por_raiz.setdefault(self._raiz(i), []).append(obj)
+        return [m for m in por_raiz.values() if len(m) > 1]
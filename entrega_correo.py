@@ -0,0 +1,260 @@
+# entrega_correo.py
+import errno
+import hashlib
+import json
+import os
+import random
+import smtplib
+import socket
+import ssl
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+
+# Entrega de correos:
+# - Una conexión SMTP autenticada que se reutiliza para varios mensajes (NOOP antes de
+#   usarla; si el servidor la cerró, se reconecta).
+# - Reintentos con backoff exponencial + jitter solo ante fallas transitorias
+#   (conexión caída o rechazada, timeout, respuestas 4xx). Las 5xx, la autenticación,
+#   las extensiones no soportadas y los certificados inválidos fallan de inmediato y su
+#   entrada de spool se descarta: reintentarlas no cambia el resultado.
+# - Spool en disco: el mensaje ya renderizado se escribe antes de enviarlo y se borra al
+#   entregarlo, así un envío fallido se reenvía sin volver a descargar ni clasificar.
+#   Con `ventana`, la entrada se nombra por (ventana, destinatarios): un mismo reporte
+#   re-generado reemplaza al anterior en vez de acumular copias.
+# - Host/puerto/seguridad configurables (p. ej. un servidor SMTP local de prueba).
+
+SEGURIDADES = ("ssl", "starttls", "ninguna")
+
+_ERRNO_RED = {errno.ENETUNREACH, errno.EHOSTUNREACH, errno.ENETDOWN, errno.EHOSTDOWN}
+
+def _transitoria(e: Exception) -> bool:
+    # Ojo: SMTPException hereda de OSError, y los errores SSL también; el orden importa
+    if isinstance(e, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in e.recipients.values())
+    if isinstance(e, smtplib.SMTPAuthenticationError):
+        return False
+    if isinstance(e, smtplib.SMTPResponseException):  # incluye SMTPConnectError, SMTPDataError, ...
+        return 400 <= e.smtp_code < 500
+    if isinstance(e, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(e, smtplib.SMTPException):  # SMTPNotSupportedError y demás sin código
+        return False
+    if isinstance(e, (ssl.SSLEOFError, ssl.SSLZeroReturnError)):
+        return True   # la conexión se cortó durante TLS
+    if isinstance(e, ssl.SSLError):  # certificado inválido, versión/protocolo: configuración
+        return False
+    if isinstance(e, (ConnectionError, TimeoutError, socket.gaierror)):
+        return True
+    return isinstance(e, OSError) and e.errno in _ERRNO_RED
+
+def _mtime(ruta: str) -> float:
+    try:
+        return os.path.getmtime(ruta)
+    except OSError:
+        return 0.0  # borrada entre el listado y el orden (otro envío la entregó)
+
+class EntregaCorreo:
+    """
+    Componente de envío thread-safe. `spool_dir` vacío = sin spool.
+    `stats`: enviados, intentos, reintentos, conexiones, sin_plazo, spool_pendientes, spool_descartados.
+    """
+
+    def __init__(self, host: str, port: int, usuario: str = "", password: str = "",
+                 seguridad: str = "ssl", reintentos: int = 4, backoff_s: float = 2.0,
+                 timeout_s: float = 30.0, spool_dir: str = ""):
+        if seguridad not in SEGURIDADES:
+            raise ValueError(f"seguridad SMTP desconocida: {seguridad!r} (usa {', '.join(SEGURIDADES)})")
+        self.host = host
+        self.port = port
+        self.usuario = usuario
+        self.password = password
+        self.seguridad = seguridad
+        self.reintentos = reintentos
+        self.backoff_s = backoff_s
+        self.timeout_s = timeout_s
+        self.spool_dir = spool_dir
+        self.stats: dict[str, int] = defaultdict(int)
+        self._smtp: smtplib.SMTP | None = None
+        self._lock = threading.Lock()
+
+    # ---------- conexión ----------
+    def _conectar(self) -> smtplib.SMTP:
+        if self.seguridad == "ssl":
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout_s,
+                                    context=ssl.create_default_context())
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout_s)
+            if self.seguridad == "starttls":
+                smtp.starttls(context=ssl.create_default_context())
+        try:
+            smtp.ehlo_or_helo_if_needed()
+            if self.usuario and self.password and smtp.has_extn("auth"):
+                smtp.login(self.usuario, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        self.stats["conexiones"] += 1
+        return smtp
+
+    def _conexion(self) -> smtplib.SMTP:
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._descartar()
+        self._smtp = self._conectar()
+        return self._smtp
+
+    def _descartar(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.close()
+            except Exception:
+                pass
+            self._smtp = None
+
+    def cerrar(self) -> None:
+        with self._lock:
+            if self._smtp is not None:
+                try:
+                    self._smtp.quit()
+                except Exception:
+                    pass
+                self._smtp = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    # ---------- envío ----------
+    def _enviar_una_vez(self, remitente: str, destinatarios: list[str], mensaje: bytes) -> None:
+        with self._lock:
+            smtp = self._conexion()
+            try:
+                smtp.sendmail(remitente, destinatarios, mensaje)
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                # El servidor respondió: la conexión sirve si se reinicia la transacción
+                try:
+                    smtp.rset()
+                except (smtplib.SMTPException, OSError):
+                    self._descartar()
+                raise
+            except OSError:  # desconexión, socket, TLS (SMTPException también es OSError)
+                self._descartar()
+                raise
+
+    def _enviar_con_reintentos(self, remitente: str, destinatarios: list[str], mensaje: bytes,
+                               deadline: float | None = None) -> None:
+        for intento in range(self.reintentos + 1):
+            self.stats["intentos"] += 1
+            try:
+                self._enviar_una_vez(remitente, destinatarios, mensaje)
+                self.stats["enviados"] += 1
+                return
+            except Exception as e:
+                if intento >= self.reintentos or not _transitoria(e):
+                    raise
+                espera = self.backoff_s * (2 ** intento) * (0.5 + random.random())
+                if deadline is not None and time.monotonic() + espera >= deadline:
+                    # Sin tiempo para otro intento: el mensaje queda en el spool para --reenviar / el daemon
+                    self.stats["sin_plazo"] += 1
+                    raise
+                print(f"[WARN] Envío SMTP falló ({type(e).__name__}: {e}); reintento en {espera:.1f}s", flush=True)
+                self.stats["reintentos"] += 1
+                time.sleep(espera)
+
+    def enviar(self, remitente: str, destinatarios: list[str], mensaje: str | bytes,
+               deadline: float | None = None, ventana: str = "") -> None:
+        """
+        Deja el mensaje en el spool, lo envía con reintentos y lo saca del spool al entregarlo.
+        Con `deadline` (time.monotonic) el primer intento siempre se hace, pero no se
+        reintenta si la espera del backoff lo cruza. `ventana` (p. ej. "2026-10-18-am")
+        deja una sola entrada de spool por ventana y destinatarios. Ante una falla
+        permanente la entrada se descarta (no se reintenta desde el spool).
+        """
+        if isinstance(mensaje, str):
+            mensaje = mensaje.encode("utf-8")
+        ruta = self._spool_guardar(remitente, destinatarios, mensaje, ventana)
+        try:
+            self._enviar_con_reintentos(remitente, destinatarios, mensaje, deadline)
+        except Exception as e:
+            if ruta and not _transitoria(e):
+                os.remove(ruta)
+                self.stats["spool_descartados"] += 1
+            raise
+        if ruta:
+            os.remove(ruta)
+
+    # ---------- spool ----------
+    def _spool_guardar(self, remitente: str, destinatarios: list[str], mensaje: bytes,
+                       ventana: str = "") -> str | None:
+        if not self.spool_dir:
+            return None
+        os.makedirs(self.spool_dir, exist_ok=True)
+        ahora = datetime.now(timezone.utc)
+        if ventana:
+            para = hashlib.sha256(",".join(sorted(d.lower() for d in destinatarios)).encode("utf-8")).hexdigest()[:12]
+            nombre = f"{ventana}--{para}.json"
+        else:
+            nombre = f"{ahora:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.json"
+        ruta = os.path.join(self.spool_dir, nombre)
+        tmp = ruta + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"creado": ahora.strftime("%Y-%m-%dT%H:%M:%SZ"), "ventana": ventana, "remitente": remitente,
+                       "destinatarios": destinatarios, "mensaje": mensaje.decode("utf-8")}, fh)
+        os.replace(tmp, ruta)  # escritura atómica (reemplaza la entrada previa de la misma ventana)
+        return ruta
+
+    def pendientes(self, ventana: str = "") -> list[str]:
+        """Rutas de mensajes en el spool (solo los de `ventana`, si se indica), del más antiguo al más nuevo."""
+        if not self.spool_dir or not os.path.isdir(self.spool_dir):
+            return []
+        rutas = [os.path.join(self.spool_dir, f) for f in os.listdir(self.spool_dir)
+                 if f.endswith(".json") and (not ventana or f.startswith(f"{ventana}--"))]
+        return sorted(rutas, key=_mtime)
+
+    def reenviar_pendientes(self, max_edad_s: float) -> list[str]:
+        """
+        Reenvía lo que quedó en el spool (p. ej. de una corrida cuyo envío falló).
+        Los mensajes más viejos que `max_edad_s` se descartan: un reporte atrasado ya no sirve.
+        Devuelve las rutas de spool entregadas; las que vuelven a fallar siguen en el spool
+        y las descartadas (ilegibles, vencidas, falla permanente) no figuran.
+        """
+        entregados: list[str] = []
+        ahora = datetime.now(timezone.utc)
+        for ruta in self.pendientes():
+            try:
+                with open(ruta, encoding="utf-8") as fh:
+                    item = json.load(fh)
+                creado = datetime.fromisoformat(item["creado"].replace("Z", "+00:00"))
+            except Exception as e:
+                print(f"[WARN] Spool ilegible ({ruta}): {e}; se descarta.", flush=True)
+                os.remove(ruta)
+                self.stats["spool_descartados"] += 1
+                continue
+            if (ahora - creado).total_seconds() > max_edad_s:
+                print(f"[WARN] Spool vencido ({os.path.basename(ruta)}, creado {item['creado']}); se descarta.", flush=True)
+                os.remove(ruta)
+                self.stats["spool_descartados"] += 1
+                continue
+            try:
+                self._enviar_con_reintentos(item["remitente"], item["destinatarios"], item["mensaje"].encode("utf-8"))
+            except Exception as e:
+                if not _transitoria(e):
+                    print(f"[WARN] Reenvío desde el spool falló sin remedio ({os.path.basename(ruta)}): {e}; se descarta.", flush=True)
+                    os.remove(ruta)
+                    self.stats["spool_descartados"] += 1
+                    continue
+                print(f"[WARN] Reenvío desde el spool falló ({os.path.basename(ruta)}): {e}", flush=True)
+                self.stats["spool_pendientes"] += 1
+                continue
+            os.remove(ruta)
+            entregados.append(ruta)
+        return entregados
@@ -1,6 +1,10 @@
 # filtro_IA.py
 import json, re, os
-from typing import List, Dict
+import atexit, hashlib, random, sqlite3, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
+
+from preclasificador_IA import PreClasificador
 
 # =============== HABILITADOR ===============
 # Pon "Si" para usar la IA (llama a OpenAI) o "No" para saltarla.
@@ -8,28 +12,62 @@ Correr_codigo = "Si"
 # ==========================================
 
 VERBOSE = True
-BATCH_SIZE = 60  # opcional: por estabilidad si hay muchas noticias
+BATCH_SIZE = 150  # tope duro de objetivos por request (además de los presupuestos de tokens)
+
+# Lotes armados por presupuesto estimado de tokens (entrada / salida)
+IA_MAX_INPUT_TOKENS = int(os.getenv("IA_MAX_INPUT_TOKENS", "12000"))   # payload de usuario, sin el prompt
+IA_MAX_OUTPUT_TOKENS = int(os.getenv("IA_MAX_OUTPUT_TOKENS", "3000"))
+IA_MAX_REQUEUE = 2  # veces que se reintenta un id que el modelo omitió en su respuesta
+
+# Caché persistente de clasificaciones (vacío = desactivado)
+IA_CACHE_PATH = os.getenv("IA_CACHE_PATH", ".news-cache/clasificaciones.sqlite").strip()
+IA_CACHE_TTL_DAYS = float(os.getenv("IA_CACHE_TTL_DAYS", "14"))
+IA_CACHE_MAX_ENTRIES = int(os.getenv("IA_CACHE_MAX_ENTRIES", "50000"))
+
+# Despacho concurrente a OpenAI (lotes en paralelo, con rate limit y reintentos)
+IA_MAX_CONCURRENCY = int(os.getenv("IA_MAX_CONCURRENCY", "4"))
+IA_RPM = float(os.getenv("IA_RPM", "500"))        # requests/min (0 = sin límite)
+IA_TPM = float(os.getenv("IA_TPM", "200000"))     # tokens/min estimados (0 = sin límite)
+IA_MAX_RETRIES = int(os.getenv("IA_MAX_RETRIES", "4"))
+IA_BACKOFF_BASE_S = 1.0
+IA_BACKOFF_MAX_S = 30.0
+IA_OUTPUT_TOKENS_PER_ITEM = 15  # {"id": "...", "categoria": "..."} ≈ 15 tokens
+
+# Pre-clasificador local (modelo lineal entrenado con las etiquetas del LLM)
+#   "0" = apagado | "sombra" = solo predice y mide acuerdo | "1" = NULA/ALTA confiables no van a la API
+IA_PRECLASIFICADOR = os.getenv("IA_PRECLASIFICADOR", "sombra").strip().lower()
+IA_PRE_PATH = os.getenv("IA_PRE_PATH", ".news-cache/preclasificador.bin").strip()
+IA_PRE_UMBRAL = float(os.getenv("IA_PRE_UMBRAL", "0.9"))          # probabilidad mínima para confiar
+IA_PRE_MIN_EJEMPLOS = int(os.getenv("IA_PRE_MIN_EJEMPLOS", "2000"))  # no resuelve local antes de ver tantos
+IA_PRE_AUDITORIA = float(os.getenv("IA_PRE_AUDITORIA", "0.05"))     # fracción confiable que igual va al LLM
+IA_PRE_GUARDAR_CADA_S = float(os.getenv("IA_PRE_GUARDAR_CADA_S", "30"))  # y al salir, solo si entrenó
+
+# Contadores de la última corrida (solo_apis los vuelca en RUN_STATS)
+IA_STATS: Dict[str, int] = {}
+# Un registro por request exitoso: objetivos, segundos, intentos y tokens reportados por la API
+IA_LOTES: List[Dict] = []
+_STATS_LOCK = threading.Lock()
 
 PROMPT_BASE = """
-Eres un analista que clasifica noticias EXCLUSIVAMENTE desde la perspectiva de la entidad objetivo indicada en el item:
+Eres un analista que clasifica noticias EXCLUSIVAMENTE desde la perspectiva de cada entidad objetivo indicada en los 'objetivos' de la noticia.
+Una misma noticia puede traer varios objetivos: evalúa CADA objetivo por separado, como si fuera la única entidad de interés.
 
 - Si 'tipo' = "empresa": la entidad objetivo es el campo 'empresa'.
 - Si 'tipo' = "industria": la entidad objetivo es el/los sectores listados en 'industrias'.
 
-DEVUELVE SOLO JSON con este formato:
+DEVUELVE SOLO JSON con UN elemento POR CADA objetivo (usa el 'id' del objetivo), con este formato:
 [
   {"id": "...", "categoria": "ALTA|MEDIA|BAJA|NULA"}
 ]
 
-Cada item de entrada provee:
-- id
+Cada noticia de entrada provee:
 - titulo
 - descripcion
-- empresa
-- industrias (lista de strings)
-- es_empresa (bool)
-- es_industria (bool)
-- tipo ("empresa" | "industria")
+- objetivos (lista), cada uno con:
+  - id
+  - tipo ("empresa" | "industria")
+  - empresa (si tipo = "empresa")
+  - industrias (lista de strings, si tipo = "industria")
 
 REGLAS DE DECISIÓN (aplican SIEMPRE respecto de la entidad objetivo):
 
@@ -67,20 +105,447 @@ def _extract_json(s: str) -> str:
     m = re.search(r'\[\s*\{.*?\}\s*\]', s, flags=re.S)
     return m.group(0) if m else s
 
-def _chunk(lst, size):
-    for i in range(0, len(lst), size):
-        yield lst[i:i+size]
-
 def _normalize_cat(value) -> str:
     v = (value or "").strip().upper()
     if v in {"ALTA", "MEDIA", "BAJA", "NULA"}:
         return v
     return "NULA"
 
-def classify_batch(items: List[Dict]) -> List[Dict]:
+# ===================== CACHÉ DE CLASIFICACIONES =====================
+def _prompt_hash() -> str:
+    return hashlib.sha256(PROMPT_BASE.strip().encode("utf-8")).hexdigest()[:16]
+
+def _cache_key(it: Dict, model: str, prompt_hash: str) -> str:
+    """
+    Hash de (titulo, descripcion, entidad objetivo, tipo, modelo, prompt).
+    Los ids ("3-7-E") son posicionales y no sirven como clave entre corridas.
+    """
+    tipo = it.get("tipo", "empresa")
+    objetivo = it.get("empresa", "") if tipo == "empresa" else sorted(it.get("industrias", []) or [])
+    raw = json.dumps(
+        [it.get("titulo", "") or "", it.get("descripcion", "") or "", objetivo, tipo, model, prompt_hash],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class _CacheClasificaciones:
+    """SQLite clave -> categoría, con expiración por edad y tope LRU."""
+
+    def __init__(self, path: str):
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS clasificaciones ("
+            " clave TEXT PRIMARY KEY, categoria TEXT NOT NULL,"
+            " creado REAL NOT NULL, usado REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_clasif_usado ON clasificaciones(usado)")
+        self._conn.commit()
+
+    def get_many(self, claves: List[str]) -> Dict[str, str]:
+        if not claves:
+            return {}
+        ahora = time.time()
+        out: Dict[str, str] = {}
+        with self._lock:
+            for i in range(0, len(claves), 500):
+                parte = claves[i:i + 500]
+                marks = ",".join("?" * len(parte))
+                for clave, cat in self._conn.execute(
+                    f"SELECT clave, categoria FROM clasificaciones WHERE clave IN ({marks})", parte
+                ):
+                    out[clave] = cat
+            if out:
+                self._conn.executemany(
+                    "UPDATE clasificaciones SET usado = ? WHERE clave = ?", [(ahora, k) for k in out]
+                )
+                self._conn.commit()
+        return out
+
+    def put_many(self, pares: Dict[str, str]) -> None:
+        if not pares:
+            return
+        ahora = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO clasificaciones (clave, categoria, creado, usado) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(clave) DO UPDATE SET categoria = excluded.categoria, "
+                "creado = excluded.creado, usado = excluded.usado",
+                [(k, v, ahora, ahora) for k, v in pares.items()],
+            )
+            self._conn.commit()
+
+    def evict(self, ttl_days: float, max_entries: int) -> int:
+        """Borra entradas más viejas que ttl_days y, sobre el tope, las menos usadas."""
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM clasificaciones WHERE creado < ?", (time.time() - ttl_days * 86400,)
+            )
+            borradas = cur.rowcount
+            cur = self._conn.execute(
+                "DELETE FROM clasificaciones WHERE clave IN ("
+                " SELECT clave FROM clasificaciones ORDER BY usado DESC LIMIT -1 OFFSET ?)",
+                (max_entries,),
+            )
+            borradas += cur.rowcount
+            self._conn.commit()
+        return borradas
+
+_CACHE: Optional[_CacheClasificaciones] = None
+
+def _get_cache() -> Optional[_CacheClasificaciones]:
+    global _CACHE
+    if not IA_CACHE_PATH:
+        return None
+    if _CACHE is None:
+        try:
+            _CACHE = _CacheClasificaciones(IA_CACHE_PATH)
+            _CACHE.evict(IA_CACHE_TTL_DAYS, IA_CACHE_MAX_ENTRIES)
+        except Exception as e:
+            if VERBOSE:
+                print("⚠️  Caché de clasificaciones no disponible:", e, flush=True)
+            return None
+    return _CACHE
+
+# ===================== PRE-CLASIFICADOR LOCAL =====================
+_PRE: Optional[PreClasificador] = None
+_PRE_LOCK = threading.Lock()
+_PRE_GUARDADO = 0.0
+
+def _get_pre() -> Optional[PreClasificador]:
+    """Modelo local (cargado de disco o nuevo); None si está apagado."""
+    global _PRE
+    if IA_PRECLASIFICADOR not in ("sombra", "1"):
+        return None
+    with _PRE_LOCK:
+        if _PRE is None:
+            _PRE = (PreClasificador.cargar(IA_PRE_PATH) if IA_PRE_PATH else None) or PreClasificador()
+            if IA_PRE_PATH:
+                atexit.register(_guardar_pre, True)
+        return _PRE
+
+def _guardar_pre(forzar: bool = False) -> None:
+    global _PRE_GUARDADO
+    if _PRE is None or not IA_PRE_PATH or not _PRE.sucio:
+        return  # sin ejemplos nuevos no se reescribe el archivo
+    if not forzar and time.monotonic() - _PRE_GUARDADO < IA_PRE_GUARDAR_CADA_S:
+        return
+    _PRE_GUARDADO = time.monotonic()
+    try:
+        _PRE.guardar(IA_PRE_PATH)
+    except Exception as e:
+        if VERBOSE:
+            print("⚠️  No se pudo guardar el pre-clasificador:", e, flush=True)
+
+def _objetivo_texto(it: Dict) -> str:
+    o = _objetivo(it)
+    return o.get("empresa") or "ind:" + ",".join(o.get("industrias", []))
+
+# ===================== DESPACHO A OPENAI =====================
+_CLIENT = None
+_CLIENT_KEY: Optional[str] = None
+_CLIENT_LOCK = threading.Lock()
+
+def _get_client(api_key: str):
+    """
+    Cliente OpenAI compartido entre llamadas (mismo pool HTTP keep-alive); se recrea
+    solo si cambia la key. Reintentos los manejamos nosotros (backoff con jitter +
+    rate limiter compartido), por eso max_retries=0.
+    """
+    global _CLIENT, _CLIENT_KEY
+    with _CLIENT_LOCK:
+        if _CLIENT is None or _CLIENT_KEY != api_key:
+            from openai import OpenAI
+            _CLIENT = OpenAI(api_key=api_key, max_retries=0)
+            _CLIENT_KEY = api_key
+        return _CLIENT
+
+class _TokenBucket:
+    """Token bucket thread-safe: `per_minute` unidades por minuto (0 = sin límite)."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, float(per_minute))
+        self.tokens = self.capacity
+        self.t = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, n: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """
+        Toma `n` unidades esperando lo necesario. Con `timeout` (segundos) desiste apenas
+        la espera no cabe en él y devuelve False sin descontar nada.
+        """
+        if self.rate <= 0:
+            return True
+        n = min(float(n), self.capacity)
+        limite = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.t) * self.rate)
+                self.t = now
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return True
+                espera = (n - self.tokens) / self.rate
+            if limite is not None and now + espera > limite:
+                return False
+            time.sleep(min(espera, 1.0))
+
+_RPM_BUCKET = _TokenBucket(IA_RPM)
+_TPM_BUCKET = _TokenBucket(IA_TPM)
+
+def _estimate_tokens(text: str) -> int:
+    # Aproximación estándar (~4 caracteres por token)
+    return len(text) // 4 + 1
+
+def _es_reintentable(e: Exception) -> bool:
+    code = getattr(e, "status_code", None)
+    if code is not None:
+        return code in (408, 409, 429) or code >= 500
+    return type(e).__name__ in {"APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError"}
+
+def _contexto_excedido(e: Exception) -> bool:
+    """400 por payload más largo que el contexto del modelo: un lote más chico sí cabe."""
+    if getattr(e, "status_code", None) != 400:
+        return False
+    return getattr(e, "code", None) == "context_length_exceeded" or "context_length_exceeded" in str(e)
+
+def _retry_after(e: Exception) -> Optional[float]:
+    try:
+        v = e.response.headers.get("retry-after")  # type: ignore[attr-defined]
+        return float(v) if v is not None else None
+    except Exception:
+        return None
+
+def _registrar_lote(resp, n_items: int, segundos: float, intentos: int) -> None:
+    """Latencia (incluye esperas de rate limit y reintentos) y uso de tokens de un request."""
+    usage = getattr(resp, "usage", None)
+    pt = int(getattr(usage, "prompt_tokens", 0) or 0)
+    ct = int(getattr(usage, "completion_tokens", 0) or 0)
+    with _STATS_LOCK:
+        IA_LOTES.append({"objetivos": n_items, "segundos": round(segundos, 3), "intentos": intentos,
+                         "prompt_tokens": pt, "completion_tokens": ct})
+        IA_STATS["requests"] = IA_STATS.get("requests", 0) + 1
+        IA_STATS["prompt_tokens"] = IA_STATS.get("prompt_tokens", 0) + pt
+        IA_STATS["completion_tokens"] = IA_STATS.get("completion_tokens", 0) + ct
+
+class PlazoAgotado(RuntimeError):
+    """El plazo de clasificación de la corrida se agotó antes de este request."""
+
+def _create_with_retry(client, model: str, user_payload: str, n_items: int, deadline: Optional[float] = None):
+    """
+    chat.completions.create con rate limit (req/min y tokens/min) y backoff con jitter en 429/5xx.
+    Con `deadline` (time.monotonic), la espera por cupo RPM/TPM y el timeout del request
+    se acotan al tiempo que queda, y no se reintenta si el backoff lo cruza.
+    """
+    system = PROMPT_BASE.strip()
+    tokens = _estimate_tokens(system) + _estimate_tokens(user_payload) + IA_OUTPUT_TOKENS_PER_ITEM * n_items
+    t0 = time.perf_counter()
+    for intento in range(IA_MAX_RETRIES + 1):
+        for bucket, n in ((_RPM_BUCKET, 1), (_TPM_BUCKET, tokens)):
+            if not bucket.acquire(n, timeout=None if deadline is None else deadline - time.monotonic()):
+                raise PlazoAgotado("plazo de clasificación agotado esperando cupo RPM/TPM")
+        extra = {}
+        if deadline is not None:
+            queda = deadline - time.monotonic()
+            if queda <= 0:
+                raise PlazoAgotado("plazo de clasificación agotado")
+            extra["timeout"] = queda
+        try:
+            resp = client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": user_payload}
+                ],
+                temperature=0,
+                **extra,
+            )
+            _registrar_lote(resp, n_items, time.perf_counter() - t0, intento + 1)
+            return resp
+        except Exception as e:
+            if intento >= IA_MAX_RETRIES or not _es_reintentable(e):
+                raise
+            # Full jitter: espera aleatoria hasta base * 2^intento (o lo que pida el servidor)
+            espera = _retry_after(e) or random.uniform(0, min(IA_BACKOFF_MAX_S, IA_BACKOFF_BASE_S * 2 ** intento))
+            if deadline is not None and time.monotonic() + espera >= deadline:
+                raise PlazoAgotado("plazo de clasificación agotado") from e
+            if VERBOSE:
+                print(f"⏳ OpenAI {getattr(e, 'status_code', type(e).__name__)}: reintento {intento + 1} en {espera:.1f}s", flush=True)
+            time.sleep(espera)
+
+def _objetivo(it: Dict) -> Dict:
+    """Entidad objetivo de un item (lo único que cambia entre items de una misma noticia)."""
+    if it.get("tipo", "empresa") == "industria":
+        return {"tipo": "industria", "industrias": it.get("industrias", []) or []}
+    return {"tipo": "empresa", "empresa": it.get("empresa", "")}
+
+def _agrupar_por_noticia(items: List[Dict]) -> List[Dict]:
+    """
+    Agrupa items por texto de noticia (titulo, descripcion), en orden de aparición.
+    Cada grupo: {"titulo", "descripcion", "objetivos": {firma_objetivo: [items...]}}
+    Items con el mismo objetivo sobre el mismo texto se envían una sola vez.
+    """
+    grupos: Dict[tuple, Dict] = {}
+    for it in items:
+        k = (it.get("titulo", "") or "", it.get("descripcion", "") or "")
+        g = grupos.get(k)
+        if g is None:
+            g = grupos[k] = {"titulo": k[0], "descripcion": k[1], "objetivos": {}}
+        firma = json.dumps(_objetivo(it), ensure_ascii=False, sort_keys=True)
+        g["objetivos"].setdefault(firma, []).append(it)
+    return list(grupos.values())
+
+def _noticia_payload(g: Dict, i: int) -> Dict:
+    objetivos = [{"id": its[0].get("id", ""), **json.loads(firma)} for firma, its in g["objetivos"].items()]
+    return {"noticia": i, "titulo": g["titulo"], "descripcion": g["descripcion"], "objetivos": objetivos}
+
+def _chunk_grupos(grupos: List[Dict]):
+    """
+    Empaqueta noticias en lotes según presupuesto estimado de tokens de entrada
+    (IA_MAX_INPUT_TOKENS) y de salida (IA_OUTPUT_TOKENS_PER_ITEM por objetivo,
+    hasta IA_MAX_OUTPUT_TOKENS), con BATCH_SIZE como tope duro de objetivos.
+    Una noticia con demasiados objetivos se parte.
+    """
+    max_obj = max(1, min(BATCH_SIZE, IA_MAX_OUTPUT_TOKENS // IA_OUTPUT_TOKENS_PER_ITEM))
+    batch: List[Dict] = []
+    n_obj = n_tok = 0
+    for g in grupos:
+        firmas = list(g["objetivos"].items())
+        for i in range(0, len(firmas), max_obj):
+            parte = {**g, "objetivos": dict(firmas[i:i + max_obj])}
+            k = len(parte["objetivos"])
+            t = _estimate_tokens(json.dumps(_noticia_payload(parte, 0), ensure_ascii=False))
+            if batch and (n_obj + k > max_obj or n_tok + t > IA_MAX_INPUT_TOKENS):
+                yield batch
+                batch, n_obj, n_tok = [], 0, 0
+            batch.append(parte)
+            n_obj += k
+            n_tok += t
+    if batch:
+        yield batch
+
+def _stat_inc(k: str, n: int = 1) -> None:
+    with _STATS_LOCK:
+        IA_STATS[k] = IA_STATS.get(k, 0) + n
+
+def _partir_lote(batch: List[Dict]) -> List[List[Dict]]:
+    """Divide un lote en dos mitades (por noticias; si es una sola, por objetivos)."""
+    if len(batch) > 1:
+        m = len(batch) // 2
+        return [batch[:m], batch[m:]]
+    g = batch[0]
+    firmas = list(g["objetivos"].items())
+    m = len(firmas) // 2
+    return [[{**g, "objetivos": dict(firmas[:m])}], [{**g, "objetivos": dict(firmas[m:])}]]
+
+def _sin_clasificar(batch: List[Dict]) -> Dict[str, str]:
+    return {it["id"]: "SIN CLASIFICAR" for g in batch for its in g["objetivos"].values() for it in its}
+
+def _classify_chunk(client, model: str, batch: List[Dict], claves: Dict[str, str],
+                    cache: Optional["_CacheClasificaciones"], requeue: int = 0,
+                    deadline: Optional[float] = None) -> Dict[str, str]:
+    """
+    Clasifica un lote de noticias agrupadas: cada texto viaja UNA vez con su lista de
+    objetivos y el resultado de cada objetivo se copia a todos los ids que lo comparten.
+    - Si la respuesta no se puede parsear o el payload excede el contexto del modelo, el
+      lote se parte en mitades y se reintenta recursivamente; solo un objetivo aislado que
+      sigue fallando queda SIN CLASIFICAR.
+    - Cualquier otra falla (auth, permisos, 404, o 429/5xx con los reintentos agotados)
+      deja el lote SIN CLASIFICAR de una vez: partirlo solo multiplicaría los requests.
+    - Los objetivos que el modelo omite se re-encolan (hasta IA_MAX_REQUEUE veces).
+    - Con el plazo (`deadline`) agotado el lote no se envía: queda SIN CLASIFICAR.
+    """
+    if deadline is not None and time.monotonic() >= deadline:
+        sin = _sin_clasificar(batch)
+        _stat_inc("plazo_sin_clasificar", len(sin))
+        return sin
+    results: Dict[str, str] = {}
+    noticias = []
+    ids_por_objetivo: Dict[str, List[str]] = {}  # id enviado -> ids de items equivalentes
+    for i, g in enumerate(batch, start=1):
+        for its in g["objetivos"].values():
+            ids_por_objetivo[its[0].get("id", "")] = [x["id"] for x in its]
+        noticias.append(_noticia_payload(g, i))
+    n_objetivos = len(ids_por_objetivo)
+
+    user_payload = "Clasifica estas noticias (JSON de entrada):\n" + json.dumps(noticias, ensure_ascii=False)
+
+    try:
+        resp = _create_with_retry(client, model, user_payload, n_objetivos, deadline)
+    except PlazoAgotado:
+        sin = _sin_clasificar(batch)
+        _stat_inc("plazo_sin_clasificar", len(sin))
+        return sin
+    except Exception as e:
+        error, partir = e, _contexto_excedido(e)
+    else:
+        try:
+            raw = (resp.choices[0].message.content or "").strip()
+            raw = _extract_json(raw)
+            data = json.loads(raw)  # json.JSONDecodeError es ValueError
+            if not isinstance(data, list):
+                raise ValueError("respuesta no es una lista JSON")
+            error = None
+        except (ValueError, TypeError, KeyError, IndexError, AttributeError) as e:
+            error, partir = e, True
+    if error is not None:
+        if partir and n_objetivos > 1:
+            if VERBOSE:
+                print(f"✂️  Lote de {n_objetivos} objetivos falló ({error}); se divide y reintenta.", flush=True)
+            _stat_inc("lotes_divididos")
+            for mitad in _partir_lote(batch):
+                results.update(_classify_chunk(client, model, mitad, claves, cache, requeue, deadline))
+            return results
+        if VERBOSE:
+            print("❌ Error clasificando con OpenAI:", error, flush=True)
+        # Sin romper el flujo: marcamos como SIN CLASIFICAR
+        results.update(_sin_clasificar(batch))
+        return results
+
+    nuevos: Dict[str, str] = {}
+    respondidos = set()
+    for c in data:
+        if not isinstance(c, dict):
+            continue
+        _id = c.get("id")
+        cat = _normalize_cat(c.get("categoria"))
+        if _id in ids_por_objetivo:
+            respondidos.add(_id)
+        for item_id in ids_por_objetivo.get(_id, [_id] if _id else []):
+            results[item_id] = cat
+            if item_id in claves:
+                nuevos[claves[item_id]] = cat
+    if cache is not None:
+        try:
+            cache.put_many(nuevos)
+        except Exception as e:
+            if VERBOSE:
+                print("⚠️  Falla escribiendo caché de clasificaciones:", e, flush=True)
+
+    # Re-encolar objetivos omitidos por el modelo (respuesta parcial / truncada)
+    faltantes = set(ids_por_objetivo) - respondidos
+    if faltantes and requeue < IA_MAX_REQUEUE:
+        _stat_inc("objetivos_reencolados", len(faltantes))
+        resto = []
+        for g in batch:
+            objs = {f: its for f, its in g["objetivos"].items() if its[0].get("id", "") in faltantes}
+            if objs:
+                resto.append({**g, "objetivos": objs})
+        results.update(_classify_chunk(client, model, resto, claves, cache, requeue + 1, deadline))
+    return results
+
+def classify_batch(items: List[Dict], deadline: Optional[float] = None) -> List[Dict]:
     """
     Recibe items con:
       { "id","titulo","descripcion","empresa","industrias","es_empresa","es_industria","tipo" }
+    Los items que comparten noticia se envían juntos (texto una vez, varios objetivos).
+    `deadline` (time.monotonic): los lotes que no alcanzan a salir antes quedan
+    SIN CLASIFICAR (IA_STATS["plazo_sin_clasificar"]) en vez de atrasar el correo.
 
     Devuelve:
       [ {"id": "...", "categoria": "ALTA|MEDIA|BAJA|NULA|SIN CLASIFICAR"}, ... ]
@@ -96,59 +561,95 @@ def classify_batch(items: List[Dict]) -> List[Dict]:
             print(f"⚙️  {msg}: 'SIN CLASIFICAR' para todos.", flush=True)
         return [{"id": it["id"], "categoria": "SIN CLASIFICAR"} for it in items]
 
-    try:
-        from openai import OpenAI
-    except Exception as e:
-        print("❌ Falta paquete openai:", e, flush=True)
-        return [{"id": it["id"], "categoria": "SIN CLASIFICAR"} for it in items]
-
-    client = OpenAI(api_key=api_key)
     model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 
     results: Dict[str, str] = {}
 
-    for batch in _chunk(items, BATCH_SIZE):
-        # Payload compacto y directo
-        casos = []
-        for it in batch:
-            casos.append({
-                "id": it.get("id", ""),
-                "empresa": it.get("empresa", ""),
-                "industrias": it.get("industrias", []) or [],
-                "es_empresa": bool(it.get("es_empresa", False)),
-                "es_industria": bool(it.get("es_industria", False)),
-                "tipo": it.get("tipo", "empresa"),
-                "titulo": it.get("titulo", "") or "",
-                "descripcion": it.get("descripcion", "") or "",
-            })
-
-        user_payload = "Clasifica estas noticias (JSON de entrada):\n" + json.dumps(casos, ensure_ascii=False)
-
+    # Caché: solo los misses llegan a la API
+    cache = _get_cache()
+    claves: Dict[str, str] = {}
+    pendientes = items
+    if cache is not None:
+        ph = _prompt_hash()
+        claves = {it["id"]: _cache_key(it, model, ph) for it in items}
         try:
-            resp = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": PROMPT_BASE.strip()},
-                    {"role": "user", "content": user_payload}
-                ],
-                temperature=0,
-            )
-            raw = (resp.choices[0].message.content or "").strip()
-            raw = _extract_json(raw)
-            data = json.loads(raw)
+            hits = cache.get_many(list(set(claves.values())))
+        except Exception as e:
+            if VERBOSE:
+                print("⚠️  Falla leyendo caché de clasificaciones:", e, flush=True)
+            hits = {}
+        pendientes = []
+        for it in items:
+            cat = hits.get(claves[it["id"]])
+            if cat:
+                results[it["id"]] = cat
+            else:
+                pendientes.append(it)
+        _stat_inc("cache_hits", len(items) - len(pendientes))
+        _stat_inc("cache_misses", len(pendientes))
+        if VERBOSE:
+            print(f"🗃️  Caché IA: {len(items) - len(pendientes)} hits / {len(pendientes)} misses", flush=True)
 
-            for c in data:
-                _id = c.get("id")
-                cat = _normalize_cat(c.get("categoria"))
-                if _id:
-                    results[_id] = cat
+    # Pre-clasificador local: en modo "1" los NULA/ALTA confiables se resuelven aquí
+    # (salvo una muestra de auditoría) una vez visto IA_PRE_MIN_EJEMPLOS; el acuerdo con
+    # el LLM se mide desde el primer ejemplo, para saber cuándo conviene activarlo
+    pre = _get_pre()
+    feats: Dict[str, List[int]] = {}
+    prediccion: Dict[str, str] = {}
+    if pre is not None and pendientes:
+        decide = pre.n >= IA_PRE_MIN_EJEMPLOS
+        a_la_api = []
+        for it in pendientes:
+            f = feats[it["id"]] = pre.features(it.get("titulo", ""), it.get("descripcion", ""), _objetivo_texto(it))
+            cat, p = pre.predecir(f)
+            if cat in ("NULA", "ALTA") and p >= IA_PRE_UMBRAL:
+                _stat_inc("pre_confiables")
+                prediccion[it["id"]] = cat
+                if decide and IA_PRECLASIFICADOR == "1" and random.random() >= IA_PRE_AUDITORIA:
+                    results[it["id"]] = cat
+                    _stat_inc("pre_resueltos_local")
+                    continue
+            a_la_api.append(it)
+        pendientes = a_la_api
 
+    # Una noticia = un texto en el payload, con N objetivos (empresa/industria).
+    # Lotes en paralelo (concurrencia acotada); el orden de salida lo fija `items`
+    batches = list(_chunk_grupos(_agrupar_por_noticia(pendientes)))
+    client = None
+    if batches:
+        try:
+            client = _get_client(api_key)
         except Exception as e:
-            if VERBOSE:
-                print("❌ Error clasificando con OpenAI:", e, flush=True)
-            for it in batch:
-                # Sin romper el flujo: marcamos como SIN CLASIFICAR
-                results[it["id"]] = "SIN CLASIFICAR"
+            print("❌ Falta paquete openai:", e, flush=True)
+            batches = []
+    workers = max(1, min(IA_MAX_CONCURRENCY, len(batches)))
+    if workers == 1:
+        parciales = [_classify_chunk(client, model, b, claves, cache, deadline=deadline) for b in batches]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ia") as pool:
+            parciales = list(pool.map(lambda b: _classify_chunk(client, model, b, claves, cache, deadline=deadline), batches))
+    for parcial in parciales:
+        results.update(parcial)
+
+    # Etiquetas del LLM → acuerdo en sombra + entrenamiento online (una vez por texto+objetivo)
+    if pre is not None and pendientes:
+        ejemplos = []
+        vistos = set()
+        for it in pendientes:
+            cat = results.get(it["id"])
+            if cat not in ("ALTA", "MEDIA", "BAJA", "NULA"):
+                continue
+            if it["id"] in prediccion:
+                _stat_inc("pre_sombra_evaluados")
+                if prediccion[it["id"]] == cat:
+                    _stat_inc("pre_sombra_acuerdos")
+            k = (it.get("titulo", ""), it.get("descripcion", ""), _objetivo_texto(it))
+            if k not in vistos:
+                vistos.add(k)
+                ejemplos.append((feats[it["id"]], cat))
+        pre.entrenar(ejemplos)
+        _stat_inc("pre_entrenados", len(ejemplos))
+        _guardar_pre()
 
     # Arma salida en orden de entrada
     out = []
@@ -0,0 +1,53 @@
+# plazos_noticias.py
+import time
+
+# Plazos por etapa dentro de una corrida. El correo tiene que salir dentro de la ventana
+# (07:30 / 17:30 CL ±30 min): el plazo total se reparte entre descarga, clasificación y
+# entrega como límites ABSOLUTOS acumulados (time.monotonic), así lo que una etapa no usa
+# queda para las siguientes. Cada etapa consulta su límite y degrada en vez de esperar
+# (fuentes omitidas, ítems SIN CLASIFICAR, sin más reintentos SMTP); `vencer` deja constancia.
+
+ETAPAS = ("fetch", "clasificacion", "entrega")
+
+class PlanPlazos:
+    """
+    `total_s` segundos desde `inicio` (time.monotonic), repartidos según `fracciones`
+    ({etapa: fracción}, en el orden de ETAPAS). La última etapa siempre termina en el plazo total.
+    """
+
+    def __init__(self, total_s: float, fracciones: dict[str, float], inicio: float | None = None):
+        if total_s <= 0:
+            raise ValueError(f"plazo total inválido: {total_s!r}")
+        faltan = [e for e in ETAPAS if e not in fracciones]
+        if faltan:
+            raise ValueError(f"faltan fracciones de plazo para: {', '.join(faltan)}")
+        self.total_s = total_s
+        self.inicio = time.monotonic() if inicio is None else inicio
+        suma = sum(fracciones[e] for e in ETAPAS)
+        acumulado = 0.0
+        self.limites: dict[str, float] = {}
+        for e in ETAPAS:
+            acumulado += fracciones[e]
+            self.limites[e] = self.inicio + total_s * acumulado / suma
+        self.limites[ETAPAS[-1]] = self.inicio + total_s
+        self.vencidas: dict[str, list[str]] = {}  # etapa -> qué se degradó
+
+    def limite(self, etapa: str) -> float:
+        return self.limites[etapa]
+
+    def restante(self, etapa: str) -> float:
+        return max(0.0, self.limites[etapa] - time.monotonic())
+
+    def vencido(self, etapa: str) -> bool:
+        return time.monotonic() >= self.limites[etapa]
+
+    def vencer(self, etapa: str, nota: str) -> None:
+        """Registra que la etapa degradó por plazo (para el reporte de la corrida)."""
+        self.vencidas.setdefault(etapa, []).append(nota)
+
+    def resumen(self) -> dict:
+        return {
+            "total_s": round(self.total_s, 1),
+            "limites_s": {e: round(self.limites[e] - self.inicio, 1) for e in ETAPAS},
+            "vencidas": {e: list(n) for e, n in self.vencidas.items()},
+        }
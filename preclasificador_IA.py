@@ -0,0 +1,140 @@
+# preclasificador_IA.py
+import hashlib
+import math
+import os
+import re
+import struct
+import threading
+import unicodedata
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+# Pre-clasificador local: regresión logística multinomial (softmax) sobre n-gramas
+# hasheados del texto, cruzados con el objetivo (empresa / industria). Se entrena
+# online con las etiquetas que devuelve el LLM, así aprende falsos positivos típicos
+# ("Huachipato" en fútbol para CAP, "Santander" la región, "Paris" la ciudad...).
+
+CLASES = ("ALTA", "MEDIA", "BAJA", "NULA")
+_K = len(CLASES)
+_MAGIC = b"PCL1"
+_TOKEN_RE = re.compile(r"\w+")
+_MAX_TOKENS = 200
+
+def _normalizar(s: str) -> str:
+    s = unicodedata.normalize("NFKD", s or "").encode("ascii", "ignore").decode("ascii")
+    return s.lower()
+
+class PreClasificador:
+    """
+    Modelo lineal con pesos densos float32 de `dim` × 4 clases (hashing trick:
+    memoria y archivo de tamaño fijo). `n` = ejemplos vistos; `sucio` = hay ejemplos
+    entrenados que aún no están en disco. Thread-safe.
+    """
+
+    def __init__(self, dim: int = 1 << 18, lr: float = 2.0):
+        self.dim = dim
+        self.lr = lr
+        self.n = 0
+        self.w = array("f", bytes(4 * dim * _K))
+        self.b = [0.0] * _K
+        self.sucio = False
+        self._lock = threading.Lock()
+
+    # ---------- features ----------
+    def _h(self, s: str) -> int:
+        return int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") % self.dim
+
+    def features(self, titulo: str, descripcion: str, objetivo: str) -> List[int]:
+        """Unigramas y bigramas del texto, solos y cruzados con el objetivo, + sesgo del objetivo."""
+        toks = _TOKEN_RE.findall(_normalizar(f"{titulo} {descripcion}"))[:_MAX_TOKENS]
+        o = _normalizar(objetivo)
+        fs = {f"o={o}"}
+        prev = None
+        for t in toks:
+            fs.add(f"w={t}")
+            fs.add(f"o={o}|w={t}")
+            if prev is not None:
+                fs.add(f"b={prev}_{t}")
+                fs.add(f"o={o}|b={prev}_{t}")
+            prev = t
+        return [self._h(f) for f in fs]
+
+    # ---------- modelo ----------
+    def _probas(self, feats: List[int]) -> List[float]:
+        x = 1.0 / math.sqrt(len(feats)) if feats else 0.0
+        z = list(self.b)
+        w = self.w
+        for f in feats:
+            base = f * _K
+            for k in range(_K):
+                z[k] += w[base + k] * x
+        m = max(z)
+        e = [math.exp(v - m) for v in z]
+        tot = sum(e)
+        return [v / tot for v in e]
+
+    def predecir(self, feats: List[int]) -> Tuple[str, float]:
+        """(clase más probable, probabilidad)."""
+        p = self._probas(feats)
+        k = max(range(_K), key=p.__getitem__)
+        return CLASES[k], p[k]
+
+    def entrenar(self, ejemplos: List[Tuple[List[int], str]]) -> None:
+        """Un paso de SGD por ejemplo (feats, clase). Clases fuera de CLASES se ignoran."""
+        with self._lock:
+            for feats, clase in ejemplos:
+                if clase not in CLASES or not feats:
+                    continue
+                y = CLASES.index(clase)
+                p = self._probas(feats)
+                x = 1.0 / math.sqrt(len(feats))
+                for k in range(_K):
+                    g = self.lr * (p[k] - (1.0 if k == y else 0.0))
+                    self.b[k] -= g
+                    gx = g * x
+                    for f in feats:
+                        self.w[f * _K + k] -= gx
+                self.n += 1
+                self.sucio = True
+
+    # ---------- persistencia ----------
+    def guardar(self, path: str) -> None:
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        tmp = path + ".tmp"
+        with self._lock, open(tmp, "wb") as fh:
+            fh.write(_MAGIC + struct.pack("<II4d", self.dim, self.n, *self.b))
+            self.w.tofile(fh)
+            self.sucio = False
+        os.replace(tmp, path)  # escritura atómica
+
+    @classmethod
+    def cargar(cls, path: str) -> Optional["PreClasificador"]:
+        """
+        Modelo guardado o None si no existe / no es compatible. El modelo es opcional: un
+        archivo ilegible (permisos, directorio, cabecera o largo inválidos) se avisa y se
+        parte de cero, nunca tumba la clasificación.
+        """
+        try:
+            with open(path, "rb") as fh:
+                if fh.read(4) != _MAGIC:
+                    raise ValueError("cabecera desconocida")
+                dim, n, *b = struct.unpack("<II4d", fh.read(struct.calcsize("<II4d")))
+                if dim <= 0 or os.fstat(fh.fileno()).st_size != 4 + struct.calcsize("<II4d") + 4 * dim * _K:
+                    raise ValueError(f"largo no calza con dim={dim}")
+                m = cls(dim=dim)
+                m.w = array("f")
+                m.w.fromfile(fh, dim * _K)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, EOFError, struct.error) as e:
+            print(f"[WARN] Pre-clasificador ilegible ({path}: {e}); se parte de un modelo vacío.", flush=True)
+            return None
+        m.n, m.b = n, list(b)
+        return m
+
+def resumen_sombra(stats: Dict[str, int]) -> Dict[str, float]:
+    """Acuerdo entre predicciones confiables del modelo local y la etiqueta del LLM."""
+    ev = stats.get("pre_sombra_evaluados", 0)
+    return {"evaluados": ev, "acuerdo": round(stats.get("pre_sombra_acuerdos", 0) / ev, 4) if ev else None}
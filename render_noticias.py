@@ -0,0 +1,214 @@
+# render_noticias.py
+import csv
+import html
+import io
+from dataclasses import dataclass, field
+
+# Render del correo por secciones (ALTA primero) con presupuesto de bytes.
+# Gmail recorta el HTML sobre ~102 KB ("[Mensaje recortado]") y el destinatario no ve
+# la cola, incluida la sección de errores. Por eso:
+# - Los estilos repetidos van en un único <style> con clases (no inline en cada <li>).
+# - La cabecera y la sección de errores se reservan antes de pintar filas.
+# - Las filas se emiten completas mientras quede espacio para el resto en formato
+#   compacto (una línea); después compactas; después solo se cuentan ("+N más"),
+#   sin renderizarlas, y el reporte completo va adjunto en HTML y CSV.
+
+SECCIONES = ("ALTA", "MEDIA", "BAJA", "SIN CLASIFICAR")
+GMAIL_CLIP_BYTES = 102_000
+ERRORES_MAX = 40  # líneas de error en el cuerpo (el resto se resume)
+FRACCION_COMPLETAS = 0.5  # las filas completas siempre pueden usar hasta esta parte del presupuesto
+
+_CSS = (
+    "<style>"
+    "ul.l{list-style:none;padding:0;margin:0 0 8px 0}"
+    "li.n{border-top:1px solid #eee;padding:18px 0 20px 0;margin:0}"
+    "li.k{border-top:1px solid #eee;padding:6px 0;margin:0;font-size:13px}"
+    "li.n:first-child,li.k:first-child{border-top:0}"
+    ".e{font-size:16px;font-weight:700;margin:0 0 8px 0}"
+    ".r{margin:0 0 6px 0}"
+    ".r b{font-weight:600}"
+    "a{color:#1155cc;text-decoration:none}"
+    ".m{color:#666}"
+    "h3.s{font-size:15px;margin:20px 0 4px 0;padding:4px 0;border-bottom:2px solid #ddd}"
+    "p.mas{color:#555;font-style:italic;margin:6px 0 12px 0}"
+    "ul.err{padding-left:18px;margin:0}ul.err li{margin:4px 0}"
+    "</style>"
+)
+_APERTURA = (
+    "<html><head><meta charset='utf-8'>" + _CSS + "</head><body style='margin:0;padding:0;'>"
+    "<div style='background:#fafafa;padding:16px;font-family:Arial,Helvetica,sans-serif;color:#111;'>"
+    "<div style='max-width:860px;margin:0 auto;background:#ffffff;border:1px solid #eaeaea;border-radius:8px;padding:20px;'>"
+)
+_CIERRE = "</div></div></body></html>"
+_MAS_HTML = "<p class='mas'>+{n} más en {sec} (ver adjunto)</p>"
+_MAS_RESERVA = len(_MAS_HTML.format(n=9_999_999, sec="SIN CLASIFICAR").encode("utf-8"))
+
+@dataclass(slots=True)
+class Fila:
+    """Un grupo ya formateado para mostrar (textos finales, sin escapar)."""
+    categoria: str  # mejor categoría del grupo (define la sección)
+    etiquetas: str  # "Empresa (ALTA); Industria (MEDIA)"
+    titulo: str
+    url: str
+    fuente: str
+    fecha: str
+    descripcion: str
+
+@dataclass(slots=True)
+class Digest:
+    texto: str
+    html: str
+    adjuntos: list[tuple[str, bytes, str]] = field(default_factory=list)  # (nombre, contenido, mime)
+    stats: dict[str, int] = field(default_factory=dict)
+
+def _b(s: str) -> int:
+    return len(s.encode("utf-8"))
+
+def _fila_html(f: Fila) -> str:
+    return (
+        f"<li class='n'><div class='e'>Empresa/Industria: {html.escape(f.etiquetas)}</div>"
+        f"<div class='r'><b>Título:</b> <a href='{html.escape(f.url)}' target='_blank' rel='noopener noreferrer'>"
+        f"{html.escape(f.titulo)}</a></div>"
+        f"<div class='r'><b>Fuente:</b> {html.escape(f.fuente)}</div>"
+        f"<div class='r'><b>Fecha:</b> {html.escape(f.fecha)}</div>"
+        f"<div class='r'><b>Descripción:</b> {html.escape(f.descripcion)}.</div></li>"
+    )
+
+def _fila_compacta_html(f: Fila) -> str:
+    return (
+        f"<li class='k'><b>{html.escape(f.etiquetas)}</b> · "
+        f"<a href='{html.escape(f.url)}' target='_blank' rel='noopener noreferrer'>{html.escape(f.titulo)}</a> "
+        f"<span class='m'>({html.escape(f.fuente)} · {html.escape(f.fecha)})</span></li>"
+    )
+
+def _fila_texto(f: Fila) -> str:
+    return (f"Empresa/Industria: {f.etiquetas}\nTítulo: {f.titulo}\nFuente: {f.fuente}\n"
+            f"Fecha: {f.fecha}\nDescripción: {f.descripcion}.\n")
+
+def _fila_compacta_texto(f: Fila) -> str:
+    return f"- {f.etiquetas} · {f.titulo} ({f.fuente} · {f.fecha}) {f.url}"
+
+def _estimar_compacta(f: Fila) -> int:
+    """Cota barata (sin escapar ni codificar) del tamaño de la fila compacta."""
+    return 150 + len(f.etiquetas) + len(f.titulo) + len(f.url) + len(f.fuente) + len(f.fecha)
+
+def _por_seccion(filas: list[Fila]) -> dict[str, list[Fila]]:
+    out: dict[str, list[Fila]] = {s: [] for s in SECCIONES}
+    for f in filas:
+        out.get(f.categoria, out["SIN CLASIFICAR"]).append(f)
+    return out
+
+def _errores(errores: list[tuple[str, str]], tope: int | None) -> tuple[str, list[str]]:
+    """Sección de errores (HTML, líneas de texto); con `tope`, el resto se resume."""
+    if not errores:
+        return "", []
+    visibles = errores if tope is None else errores[:tope]
+    resto = len(errores) - len(visibles)
+    partes = ["<hr style='border:none;border-top:1px solid #eee;margin:20px 0;'>"
+              "<h3 style='font-size:16px;margin:0 0 10px 0;'>⚠️ Errores durante la corrida</h3><ul class='err'>"]
+    partes += [f"<li>{html.escape(base)}: {html.escape(msg)}</li>" for base, msg in visibles]
+    if resto:
+        partes.append(f"<li>… y {resto} errores más</li>")
+    partes.append("</ul>")
+    texto = ["", "⚠️ Errores durante la corrida"] + [f"- {base}: {msg}" for base, msg in visibles]
+    if resto:
+        texto.append(f"- … y {resto} errores más")
+    return "".join(partes), texto
+
+def _html_completo(titulo: str, secciones: dict[str, list[Fila]], errores: list[tuple[str, str]]) -> str:
+    partes = [_APERTURA, f"<h2 style='margin:0 0 16px 0;font-size:18px;line-height:1.3;font-weight:700;'>{html.escape(titulo)}</h2>"]
+    for sec in SECCIONES:
+        if secciones[sec]:
+            partes.append(f"<h3 class='s'>{sec} ({len(secciones[sec])})</h3><ul class='l'>")
+            partes.extend(_fila_html(f) for f in secciones[sec])
+            partes.append("</ul>")
+    partes.append(_errores(errores, None)[0])
+    partes.append(_CIERRE)
+    return "".join(partes)
+
+def _csv(secciones: dict[str, list[Fila]]) -> bytes:
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(["categoria", "empresa_industria", "titulo", "fuente", "fecha", "url", "descripcion"])
+    for sec in SECCIONES:
+        for f in secciones[sec]:
+            w.writerow([f.categoria, f.etiquetas, f.titulo, f.fuente, f.fecha, f.url, f.descripcion])
+    return buf.getvalue().encode("utf-8-sig")  # BOM: Excel abre bien los acentos
+
+def render_digest(filas: list[Fila], titulo: str, errores: list[tuple[str, str]],
+                  presupuesto: int = GMAIL_CLIP_BYTES) -> Digest:
+    """
+    Arma (texto, html, adjuntos) con el HTML acotado a `presupuesto` bytes. Cada fila se
+    renderiza a lo más una vez para el cuerpo; las que no caben solo se cuentan.
+    `filas` llega en el orden de presentación dentro de cada sección (fecha desc).
+    """
+    secciones = _por_seccion(filas)
+    con_filas = [s for s in SECCIONES if secciones[s]]
+    err_html, err_texto = _errores(errores, ERRORES_MAX)
+
+    cabecera = [_APERTURA, f"<h2 style='margin:0 0 16px 0;font-size:18px;line-height:1.3;font-weight:700;'>{html.escape(titulo)}</h2>"]
+    if con_filas:
+        conteo = " · ".join(f"{s}: {len(secciones[s])}" for s in con_filas)
+        cabecera.append(f"<p class='m' style='margin:0 0 8px 0;'>{html.escape(conteo)}</p>")
+    else:
+        cabecera.append("<p class='m'>Sin noticias relevantes en la ventana.</p>")
+    partes = cabecera
+    texto_lines: list[str] = [titulo, ""]
+    # Reserva: cierre, errores y un "+N más" por sección (aunque no se usen todos)
+    disponible = presupuesto - _b("".join(cabecera)) - _b(err_html) - _b(_CIERRE) - _MAS_RESERVA * len(con_filas)
+
+    # Una fila va completa si después aún caben, compactas, todas las que faltan
+    # (o si las completas no llegan a FRACCION_COMPLETAS del presupuesto).
+    pendiente = sum(_estimar_compacta(f) for s in con_filas for f in secciones[s])
+    usado = 0
+    modo = "completa"  # → "compacta" → "omitida" (nunca vuelve atrás)
+    stats = {"completas": 0, "compactas": 0, "omitidas": 0}
+    for sec in con_filas:
+        abre, cierra = f"<h3 class='s'>{sec} ({len(secciones[sec])})</h3><ul class='l'>", "</ul>"
+        mostradas = 0
+        if modo != "omitida" and usado + _b(abre) + _b(cierra) <= disponible:
+            usado += _b(abre) + _b(cierra)
+            partes.append(abre)
+            texto_lines += [f"===== {sec} ({len(secciones[sec])}) =====", ""]
+            for f in secciones[sec]:
+                pendiente -= _estimar_compacta(f)
+                if modo == "completa":
+                    h = _fila_html(f)
+                    tope = max(disponible - pendiente, disponible * FRACCION_COMPLETAS)
+                    if usado + _b(h) <= tope:
+                        partes.append(h)
+                        texto_lines.append(_fila_texto(f))
+                        usado += _b(h)
+                        mostradas += 1
+                        stats["completas"] += 1
+                        continue
+                    modo = "compacta"
+                h = _fila_compacta_html(f)
+                if usado + _b(h) > disponible:
+                    modo = "omitida"
+                    break
+                partes.append(h)
+                texto_lines.append(_fila_compacta_texto(f))
+                usado += _b(h)
+                mostradas += 1
+                stats["compactas"] += 1
+            partes.append(cierra)
+        else:
+            modo = "omitida"
+        resto = len(secciones[sec]) - mostradas
+        if resto:
+            partes.append(_MAS_HTML.format(n=resto, sec=sec))
+            texto_lines += [f"+{resto} más en {sec} (ver adjunto)", ""]
+            stats["omitidas"] += resto
+
+    partes.append(err_html)
+    partes.append(_CIERRE)
+    texto_lines += err_texto
+    cuerpo = "".join(partes)
+    stats["bytes_html"] = _b(cuerpo)
+
+    adjuntos: list[tuple[str, bytes, str]] = []
+    if stats["omitidas"]:
+        adjuntos.append(("reporte_completo.html", _html_completo(titulo, secciones, errores).encode("utf-8"), "text/html"))
+        adjuntos.append(("reporte_completo.csv", _csv(secciones), "text/csv"))
+    return Digest(texto="\n".join(texto_lines).rstrip() + "\n", html=cuerpo, adjuntos=adjuntos, stats=stats)
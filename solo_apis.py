@@ -2,19 +2,50 @@
 import re
 import html
 import unicodedata
-from urllib.parse import urlparse
+from urllib.parse import urlparse, parse_qsl, urlencode
 from zoneinfo import ZoneInfo
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from email.mime.base import MIMEBase
+from email import encoders
 from collections import defaultdict
+from itertools import islice
+from array import array
+from dataclasses import dataclass, field, replace
+from typing import Iterable, Iterator
 from datetime import datetime, timedelta, timezone
 import sys
 import os
+import io
+import math
+import json
+import time
+import queue
+import threading
+import signal
+import argparse
+import cProfile
+import pstats
+import tracemalloc
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:  # el ranking de relevancia cae a Python puro
+    np = None
 
 # ===== IA: módulo externo =====
 # Debe existir filtro_IA.py con classify_batch(inputs) -> [{"id": ..., "categoria": ...}, ...]
-from filtro_IA import classify_batch
+from filtro_IA import classify_batch, IA_STATS, IA_LOTES
+from duplicados_noticias import IndiceDuplicados
+from preclasificador_IA import resumen_sombra
+from render_noticias import Fila, render_digest
+from entrega_correo import EntregaCorreo
+from plazos_noticias import PlanPlazos
+from suscripciones_noticias import IndiceGrupos, Suscripcion, cargar_suscripciones
+from watchlist_noticias import TrieMatcher, Watchlist, cargar_watchlist, validar, huella, cargar_artefacto, guardar_artefacto
 
 # ===================== CONFIGURACIÓN =====================
 # <- newsapi.ai / Event Registry
@@ -37,10 +68,73 @@ DOMAIN_DISPLAY = {
 
 # Límite por empresa y ventana
 DOMAIN_LIMIT = 100
+
+# Ranking de relevancia por (empresa, artículo): solo los TOP_K más relevantes por empresa
+# pasan a clasificación (en vez de los primeros en orden DF → LT → EMOL)
+RANKING_RELEVANCIA = os.getenv("RANKING_RELEVANCIA", "1").strip() != "0"
+RANKING_TOP_K = int(os.getenv("RANKING_TOP_K", "30"))
+RANKING_PESOS = {"tf": 1.0, "titulo": 0.5, "posicion": 0.25, "recencia": 0.5}
+RANKING_VIDA_MEDIA_H = 12.0  # decaimiento exponencial de la recencia
 HOURS_BACK: float = 24.0  # será sobrescrito dinámicamente en run_once()
 
 # Cantidad máxima a pedirle a ER por fuente
 ER_MAX_ITEMS_RAW = 1000  # ↑ techo alto para no cortar recall
+ER_PAGINA = 100  # artículos por página de QueryArticlesIter (su articleBatchSize por defecto)
+ER_BODY_LEN = 600  # largo del cuerpo que pedimos a ER (recortado en el servidor) y que usamos
+
+# Pushdown de keywords: en vez de bajar todo el medio, se le piden a ER solo los artículos que
+# mencionan algún alias (QueryItems.OR por tandas de ER_PUSHDOWN_TERMINOS). El costo escala con
+# la watchlist y no con el volumen del medio. Sin almacén incremental (guarda el medio completo).
+ER_PUSHDOWN = os.getenv("ER_PUSHDOWN", "0").strip() == "1"
+ER_PUSHDOWN_TERMINOS = int(os.getenv("ER_PUSHDOWN_TERMINOS", "15"))
+
+# Descarga concurrente por host (un cliente ER por worker, workers acotados)
+ER_FETCH_CONCURRENTE = os.getenv("ER_FETCH_CONCURRENTE", "1").strip() != "0"
+ER_MAX_WORKERS = int(os.getenv("ER_MAX_WORKERS", "4"))
+ER_REINTENTOS = int(os.getenv("ER_REINTENTOS", "2"))  # reintentos del SDK por request (5 s entre cada uno)
+ER_HOST_TIMEOUT_S = float(os.getenv("ER_HOST_TIMEOUT_S", "600"))  # por host; cabe en la ventana ±30 min
+ER_HOST_TIMEOUT_GRACE_S = 30.0
+
+# Almacén local de artículos (SQLite). Vacío = desactivado.
+ARTICLE_STORE_PATH = os.getenv("ARTICLE_STORE_PATH", ".news-cache/articulos.sqlite").strip()
+ARTICLE_STORE_RETENTION_DAYS = float(os.getenv("ARTICLE_STORE_RETENTION_DAYS", "7"))
+ER_HWM_SOLAPE_MIN = 30  # re-pedimos un poco antes del HWM por latencia de indexación de ER
+ALMACEN_TANDA = 200     # artículos por escritura al almacén
+
+# Pipeline streaming (fetch → match → clasificación solapados). Por defecto: etapas con barrera.
+PIPELINE_STREAMING = os.getenv("PIPELINE_STREAMING", "0").strip() == "1"
+PIPELINE_QUEUE_SIZE = 500   # artículos en tránsito entre fetch y matcher
+PIPELINE_BATCH = 60         # ítems por lote despachado a la IA
+PIPELINE_MAX_INFLIGHT = 4   # lotes de IA en vuelo a la vez
+
+# Casi-duplicados (misma nota en DF / LT / EMOL o cable repetido): se clasifica
+# un representante por cluster y el digest los muestra como una sola noticia
+DEDUP_CASI_DUPLICADOS = os.getenv("DEDUP_CASI_DUPLICADOS", "1").strip() != "0"
+DUP_UMBRAL = float(os.getenv("DUP_UMBRAL", "0.7"))  # similitud Jaccard estimada mínima
+
+# Modo daemon (--daemon): agenda propia en vez del cron de 5 min de GitHub Actions
+DAEMON_SLOTS_CL = ((7, 30, "am"), (17, 30, "pm"))  # horarios de envío (hora Chile) y su etiqueta
+DAEMON_TOLERANCIA_MIN = 30   # misma ventana ±30 min que el gate del workflow
+DAEMON_POLL_S = 60
+DAEMON_REINTENTO_S = 300     # espera tras una corrida fallida dentro de la ventana
+SENT_MARKER_PATH = os.getenv("SENT_MARKER_PATH", ".news-cache/ventanas_enviadas.json").strip()
+SENT_MARKER_MAX = 60         # claves de ventana que se conservan en el marcador
+
+# Plazo de la corrida: el correo tiene que salir antes del cierre de la ventana. El plazo se
+# reparte entre descarga, clasificación y entrega (fracciones acumuladas; lo que una etapa no
+# usa pasa a la siguiente). Al agotarse una etapa se degrada: hosts omitidos, ítems
+# SIN CLASIFICAR, sin más reintentos SMTP; y se envía lo que haya.
+RUN_PLAZO_MAX_S = float(os.getenv("RUN_PLAZO_MAX_S", "1500"))  # tope (y plazo fuera de ventana); 0 = sin plazos
+RUN_PLAZO_MARGEN_S = 120.0  # holgura antes del cierre de la ventana
+RUN_PLAZO_MIN_S = 180.0     # piso si la corrida parte al borde de la ventana
+RUN_PLAZO_FRACCIONES = {"fetch": 0.5, "clasificacion": 0.3, "entrega": 0.2}
+
+# Reporte de la corrida (JSON con tiempos por etapa, conteos y errores; vacío = desactivado)
+RUN_REPORT_PATH = os.getenv("RUN_REPORT_PATH", ".news-cache/run_report.json").strip()
+# Perfilado opcional de run_once completo
+RUN_PROFILE = os.getenv("RUN_PROFILE", "0").strip() == "1"          # cProfile → .pstats + top en el reporte
+RUN_PROFILE_PATH = os.getenv("RUN_PROFILE_PATH", ".news-cache/run_profile.pstats").strip()
+RUN_TRACEMALLOC = os.getenv("RUN_TRACEMALLOC", "0").strip() == "1"  # peak de memoria + top asignaciones
 
 # Depuración
 DEBUG_SUMMARY = True
@@ -55,200 +149,72 @@ DESTINATARIO2 = os.getenv("DESTINATARIO2", "").strip()  # ← segundo destinatar
 APP_PASSWORD  = os.getenv("APP_PASSWORD", "").strip()   # Gmail: Contraseña de aplicación
 
 RECIPIENTS = [e for e in [DESTINATARIO, DESTINATARIO2] if e]
+# Suscripciones por destinatario: JSON inline o ruta a un archivo JSON (vacío = todos reciben todo)
+# [{"email": "...", "empresas": ["CAP", ...] | "*", "industrias": ["Mineria", ...] | "*", "min_categoria": "MEDIA"}]
+SUSCRIPCIONES = os.getenv("SUSCRIPCIONES", "").strip()
+# Servidor SMTP (por defecto Gmail SSL; SMTP_SEGURIDAD=ninguna + localhost para un servidor de prueba)
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com").strip()
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+SMTP_SEGURIDAD = os.getenv("SMTP_SEGURIDAD", "ssl").strip().lower()  # ssl | starttls | ninguna
+SMTP_REINTENTOS = int(os.getenv("SMTP_REINTENTOS", "4"))
+SMTP_BACKOFF_S = float(os.getenv("SMTP_BACKOFF_S", "2"))
+# Spool de mensajes renderizados (vacío = sin spool); lo más viejo que MAIL_SPOOL_MAX_H no se reenvía
+MAIL_SPOOL_DIR = os.getenv("MAIL_SPOOL_DIR", ".news-cache/spool").strip()
+MAIL_SPOOL_MAX_H = float(os.getenv("MAIL_SPOOL_MAX_H", "1"))
+# Tope del HTML del correo: Gmail recorta sobre ~102 KB; lo que no cabe va adjunto (HTML + CSV)
+MAIL_MAX_BYTES = int(os.getenv("MAIL_MAX_BYTES", "100000"))
+# Se validan al enviar (MotorNoticias.verificar_correo), no al importar el módulo
+
+# ===================== WATCHLIST (empresas, alias, industrias) =====================
+# Vive en watchlist.json (editable sin tocar código). Los matchers compilados se cachean
+# en MATCHER_CACHE_DIR con nombre = huella del contenido (vacío = sin caché en disco).
+WATCHLIST_PATH = os.getenv("WATCHLIST_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "watchlist.json")).strip()
+MATCHER_CACHE_DIR = os.getenv("MATCHER_CACHE_DIR", ".news-cache/matchers").strip()
+
+_WATCHLIST = cargar_watchlist(WATCHLIST_PATH)
+empresas = _WATCHLIST.empresas
+EMPRESA_ALIASES = _WATCHLIST.aliases
 
-if not REMITENTE or not APP_PASSWORD or not RECIPIENTS:
-    print("Faltan REMITENTE, APP_PASSWORD o DESTINATARIO/DESTINATARIO2. Configúralos como Secrets en GitHub.")
-    sys.exit(1)
-
-# ===================== EMPRESAS (PEGA TU LISTA) =====================
-# Pega aquí tu lista real de empresas:
-empresas = [
-    "Clínica Indisa S.A.", "PAZ Corp S.A.", "SAAM S.A.", "Socovesa S.A.", "Watts S.A.",
-    "Hortifrut S.A.", "Empresas Iansa S.A.", "Embonor S.A.", "Inversiones Lipigas S.A.",
-    "Cristalerías de Chile S.A.", "Multi X S.A.", "Besalco S.A.", "Empresas Gasco S.A.",
-    "Salmones Camanchaca S.A.", "Blumar S.A.", "Compañía Pesquera Camanchaca S.A.",
-    "Enlasa Energía Llaima S.A.", "Tricot S.A.", "Puerto Ventanas S.A.", "Cintac S.A.",
-    "Forus S.A.", "Ingevec S.A.", "Moller y Pérez-Cotapos S.A.", "SalfaCorp S.A.",
-    "SMU S.A.", "ZOFRI S.A.", "Hites S.A.", "Grupo Security S.A.", "SONDA S.A.",
-    "Clínica Las Condes S.A.", "Ripley Corp S.A.", "Inmobiliaria Manquehue S.A.",
-    "Empresas La Polar S.A.", "Masisa S.A.", "Enjoy S.A.", "Embotelladora Andina S.A.",
-    "Compañía de Cervecerías Unidas S.A.", "Viña Concha y Toro S.A.", "Cencosud Shopping S.A.",
-    "Parque Arauco S.A.", "Mallplaza S.A.", "CAP S.A.", "Enaex S.A.",
-    "Inversiones La Construcción S.A.", "Sigdo Koppers S.A.", "Banco Santander Chile",
-    "Banco de Chile", "Banco de Crédito e Inversiones", "Itaú Corpbanca",
-    "Aguas Andinas S.A.", "Engie Energía Chile S.A.", "Colbún S.A.", "Enel Chile S.A.",
-    "Enel Américas S.A.", "Empresas Copec S.A.", "Empresas CMPC S.A.",
-    "LATAM Airlines Group S.A.", "Sociedad Química y Minera de Chile S.A.", "Quiñenco S.A.",
-    "Compañía Sudamericana de Vapores S.A.", "Cencosud S.A.", "S.A.C.I. Falabella"
-]
-# ----------------- ALIAS (PEGA TUS ALIAS) --------------------
-EMPRESA_ALIASES = {
-    "Clínica Indisa S.A.": ["Clínica Indisa", "Clinica Indisa", "INDISA", "Instituto de Diagnóstico", "Instituto de Diagnostico",
-                            "Clínica Indisa S.A.", "Clinica Indisa S.A."],
-    "PAZ Corp S.A.": ["PAZ Corp", "PAZ", "PAZCorp", "Paz Corp S.A."],
-    "SAAM S.A.": ["SAAM", "Sociedad Matriz SAAM", "Sociedad Matriz SAAM S.A.", "SM SAAM", "SMSAAM"],
-    "Socovesa S.A.": ["Socovesa", "Empresa Constructora Socovesa", "Inmobiliaria Socovesa", "Constructora Socovesa"],
-    "Watts S.A.": ["Watts", "Watt's", "WATTS"],
-    "Hortifrut S.A.": ["Hortifrut", "HF", "HFRUT"],
-    "Empresas Iansa S.A.": ["Iansa", "Empresas Iansa", "EISA"],
-    "Embonor S.A.": ["Embonor", "Embonor-B", "Embonor Serie B"],
-    "Inversiones Lipigas S.A.": ["Lipigas", "Inversiones Lipigas", "LipiAndes"],
-    "Cristalerías de Chile S.A.": ["Cristalerías de Chile", "Cristalerias de Chile", "CristalChile", "Cristales", "Cristalerías", "Cristalerias"],
-    "Multi X S.A.": ["Multi X", "Multiexport Foods", "Multiexport", "MULTI X", "Multiexport S.A."],
-    "Besalco S.A.": ["Besalco"],
-    "Empresas Gasco S.A.": ["Gasco", "Empresas Gasco", "Gasco GLP", "Gasco GLP S.A."],
-    "Salmones Camanchaca S.A.": ["Salmones Camanchaca", "Salmocam"],
-    "Blumar S.A.": ["Blumar", "Blumar Seafoods", "Blumar Seafoods S.A."],
-    "Compañía Pesquera Camanchaca S.A.": ["Compañía Pesquera Camanchaca", "Compania Pesquera Camanchaca", "Camanchaca", "Pesquera Camanchaca", "Pesquera Camanchaca S.A."],
-    "Enlasa Energía Llaima S.A.": ["Enlasa", "ENLASA", "Energía Llaima", "Energia Llaima", "Llaima"],  # ⚠
-    "Tricot S.A.": ["Tricot", "Tricot S.A."],
-    "Puerto Ventanas S.A.": ["Puerto Ventanas", "PVSA", "Ventanas"],
-    "Cintac S.A.": ["Cintac", "Cintac S.A."],
-    "Forus S.A.": ["Forus", "Forus Chile"],
-    "Ingevec S.A.": ["Ingevec", "Constructora Ingevec"],
-    "Moller y Pérez-Cotapos S.A.": ["Moller y Pérez-Cotapos", "Moller & Pérez-Cotapos", "Moller y Perez-Cotapos", "Moller & Perez-Cotapos", "MPC",
-                                    "Moller Pérez-Cotapos", "Moller Perez Cotapos"],
-    "SalfaCorp S.A.": ["SalfaCorp", "Salfa", "Salfa Corp"],
-    "SMU S.A.": ["SMU", "Unimarc (grupo SMU)", "Unimarc", "Alvi", "Mayorista 10"],  # ⚠
-    "ZOFRI S.A.": ["ZOFRI", "Zona Franca de Iquique"],
-    "Hites S.A.": ["Hites", "Banco Hites"],
-    "Grupo Security S.A.": ["Grupo Security", "Security", "Banco Security", "Inversiones Security", "Vida Security", "Valores Security"],
-    "SONDA S.A.": ["SONDA"],
-    "Clínica Las Condes S.A.": ["Clínica Las Condes", "Clinica Las Condes", "CLC", "Clínica Las Condes S.A."],
-    "Ripley Corp S.A.": ["Ripley", "Empresas Ripley", "Ripley Corp", "Banco Ripley"],  # ⚠
-    "Inmobiliaria Manquehue S.A.": ["Manquehue", "Inmobiliaria Manquehue", "Manquehue S.A."],
-    "Empresas La Polar S.A.": ["La Polar", "Empresas La Polar", "LaPolar", "La Polar S.A."],
-    "Masisa S.A.": ["Masisa"],
-    "Enjoy S.A.": ["Enjoy", "Enjoy Casinos"],
-    "Embotelladora Andina S.A.": ["Andina", "Coca-Cola Andina", "Andina B", "Andina A", "Coca Cola Andina", "Andina S.A."],
-    "Compañía de Cervecerías Unidas S.A.": ["CCU", "Compañía de Cervecerías Unidas", "Compania de Cervecerias Unidas", "Cervecerías Unidas", "Cervecerias Unidas",
-                                            "Compañía Cervecerías Unidas", "Compania Cervecerias Unidas"],
-    "Viña Concha y Toro S.A.": ["Concha y Toro", "Viña Concha y Toro", "VCT", "Viña Concha y Toro S.A.", "Concha y Toro S.A."],
-    "Cencosud Shopping S.A.": ["Cencosud Shopping", "Cencosud Malls", "Centros Comerciales Sudamericanos", "Cencomalls", "Cencosud Malls S.A."],
-    "Parque Arauco S.A.": ["Parque Arauco", "PARAUCO", "Parauco", "Grupo Parque Arauco"],
-    "Mallplaza S.A.": ["Mallplaza", "Mall Plaza", "Plaza S.A.", "Mall Plaza S.A.", "Grupo Mallplaza"],
-    "CAP S.A.": ["CAP", "Compañía de Acero del Pacífico", "Compania de Acero del Pacifico",
-                 "Huachipato", "Siderúrgica Huachipato", "CMP", "Compañía Minera del Pacífico", "Compania Minera del Pacifico"],  # ⚠ Huachipato (deporte)
-    "Enaex S.A.": ["Enaex", "ENAEX", "Prillex", "Prillex América"],
-    "Inversiones La Construcción S.A.": ["Inversiones La Construcción", "Inversiones La Construccion", "ILC", "Grupo ILC"],
-    "Sigdo Koppers S.A.": ["Sigdo Koppers", "SK", "SKC", "SKBergé", "SK Bergé"],
-    "Banco Santander Chile": ["Banco Santander", "Santander Chile", "Santander", "Santander Chile S.A."],
-    "Banco de Chile": ["Banco de Chile", "Bco. de Chile", "Bco de Chile", "Banchile", "Banco Edwards", "Edwards",
-                       "Banchile Inversiones", "Banchile AGF", "Banchile Corredores"],  # ⚠
-    "Banco de Crédito e Inversiones": ["Banco de Crédito e Inversiones", "Banco de Credito e Inversiones", "Banco BCI", "BCI", "Bci", "Banco Bci",
-                                       "Bci Seguros", "Bci Corredor de Bolsa"],  # ⚠
-    "Itaú Corpbanca": ["Itaú Chile", "Itau Chile", "Banco Itaú", "Banco Itau", "Itaú Corpbanca", "Itau Corpbanca",
-                       "Itaú", "Itau", "CorpBanca", "ItaúCorp", "ItauCorp", "Itaú Corpbanca S.A."],  # ⚠ Itaú genérico
-    "Aguas Andinas S.A.": ["Aguas Andinas", "Aguas Andinas S.A."],
-    "Engie Energía Chile S.A.": ["ENGIE Energía Chile", "ENGIE Energia Chile", "ENGIE Chile", "EECL", "E-CL"],
-    "Colbún S.A.": ["Colbún", "Colbun", "Colbún S.A.", "Colbun S.A."],
-    "Enel Chile S.A.": ["Enel Chile", "Enel-Chile", "Enel", "Enel Distribución", "Enel Generación"],  # ⚠
-    "Enel Américas S.A.": ["Enel Américas", "Enel Americas", "ENELAM", "Enel Américas S.A."],
-    "Empresas Copec S.A.": ["Empresas Copec", "Copec", "Copec S.A.", "Abastible", "Terpel", "Arauco"],  # ⚠ Arauco (confusión con Parque Arauco)
-    "Empresas CMPC S.A.": ["CMPC", "Empresas CMPC", "La Papelera", "Softys", "Forestal Mininco"],
-    "LATAM Airlines Group S.A.": ["LATAM", "LATAM Airlines", "LATAM Airlines Group", "LAN Airlines", "LAN Chile", "LAN"],
-    "Sociedad Química y Minera de Chile S.A.": ["Sociedad Química y Minera de Chile", "Sociedad Quimica y Minera de Chile", "SQM", "Soquimich",
-                                               "SQM Salar", "SQM Nitratos y Yodo", "SQM Lithium"],
-    "Quiñenco S.A.": ["Quiñenco", "Quinenco", "Grupo Quiñenco"],
-    "Compañía Sudamericana de Vapores S.A.": ["Compañía Sudamericana de Vapores", "Compania Sudamericana de Vapores", "CSAV", "CSAV S.A."],
-    "Cencosud S.A.": ["Cencosud", "Grupo Cencosud", "Jumbo", "Santa Isabel", "Paris", "Easy"],  # ⚠ marcas
-    "S.A.C.I. Falabella": ["Falabella", "SACI Falabella", "S.A.C.I. Falabella", "Grupo Falabella",
-                           "Sodimac", "Homecenter", "Tottus", "Banco Falabella"],  # ⚠ marcas
-}
-
-# ===================== INDUSTRIAS (PEGA TUS LISTAS) =====================
 INDUSTRIA_MUST_MATCH = False
-INDUSTRIA_KEYWORDS = {
-    "Bancaria": [
-        "hecho esencial cmf","resultados trimestrales","resultados 2t25","utilidad neta",
-        "roe","margen de interes","nim","provisiones","cartera vencida","morosidad 90 dias",
-        "colocaciones","aumento de capital","dividendo","colocacion de bonos","bono subordinado",
-        "bono verde","emision 144a","rating fitch","rating moodys","standard and poors",
-        "fusion bancaria","adquisicion banco","portabilidad financiera","basilea iii",
-        "indice de capital","sancion cmf","ciberataque bancario","plan estrategico banco"
-    ],
-    "Energia": [
-        "licitacion de suministro","adjudicacion suministro","ppa","precio nudo","precio spot",
-        "coordinador electrico nacional","cen","declaracion de indisponibilidad","mantenimiento programado",
-        "curtailment","congestion","bess","almacenamiento de baterias","linea 220 kv","linea 500 kv",
-        "subestacion","puesta en servicio","entrada en operacion","hidrogeno verde",
-        "parque solar","parque eolico","central hidroelectrica","descarbonizacion","cierre termo",
-        "tarifa de distribucion","vad","netbilling","plan de expansion de transmision","eia ingresado",
-        "rca aprobada","resolucion sea"
-    ],
-    "Mineria": [
-        "eia ingresado","rca aprobada","sernageomin","cochilco","estudio de prefactibilidad",
-        "estudio de factibilidad","capex minero","plan minero","produccion de cobre","produccion de litio",
-        "catodos","concentrado","contrato offtake","oferta vinculante","planta desaladora","relaves",
-        "expansion de mina","suspension de faena","accidente fatal","huelga minera","negociacion colectiva",
-        "royalty minero","plan de cierre","permisos sectoriales","inicio de construccion",
-        "comisionamiento","mou con codelco","joint venture minero","ppa para faena"
-    ],
-    "Retail": [
-        "resultados 2t25","resultados trimestrales","ventas mismas tiendas","same store sales","sss",
-        "ebitda retail","margen bruto","inventarios","apertura de tienda","cierre de tienda",
-        "reorganizacion judicial","centro de distribucion","omnicanalidad","ecommerce","marketplace",
-        "programa de fidelizacion","cyberday","black friday","ticket promedio","trafico en tiendas",
-        "capex de aperturas","guidance de ventas","acuerdo con proveedor"
-    ],
-    "Inmobiliario": [
-        "preventas","venta en verde","permiso de edificacion","recepcion final","multifamily",
-        "build to rent","btr","arriendo residencial","vacancia residencial","absorcion","stock de viviendas",
-        "uf m2","tasacion","paralizacion de proyecto","financiamiento hipotecario","alza tasas hipotecarias",
-        "subsidio ds19","costo de construccion","plan maestro","cambio de uso de suelo","loteo",
-        "plan regulador","joint venture inmobiliario"
-    ],
-    "Construccion": [
-        "licitacion mop","adjudicacion mop","contrato epc","estado de pago","reajuste polinomico",
-        "modificacion contractual","termino anticipado de contrato","avance fisico","inicio de obras",
-        "paralizacion de obras","arbitraje de obra","recepcion provisoria","recepcion definitiva",
-        "accidente laboral","insolvencia constructora","liquidacion","consorcio constructor",
-        "oferta economica","garantia de fiel cumplimiento"
-    ],
-    "Salud": [
-        "superintendencia de salud","isapres fallo suprema","tabla de factores","copagos",
-        "convenio con fonasa","habilitacion sanitaria","apertura de clinica","expansion hospitalaria",
-        "licitacion servicios de salud","adquisicion de clinica","compra de prestador","camas criticas",
-        "capex clinico","acreditacion en salud","contrato con aseguradoras","telemedicina convenio",
-        "sancion superintendencia de salud","ciberataque a clinica","brecha de datos pacientes"
-    ],
-    "Tecnologia": [
-        "ciberataque","ransomware","filtracion de datos","data center","region de datos","cloud publica",
-        "contrato cloud","hiperescalador","hiperscaler","ia generativa","modelo de lenguaje",
-        "semiconductores","centro de desarrollo","subtel licitacion 5g","bloques de espectro",
-        "autorizacion subtel","fintech licencia cmf","proveedor de servicios de pago",
-        "open banking","sandbox regulatorio","levantamiento de capital","ronda serie a","ronda serie b",
-        "alianza tecnologica","despliegue de fibra optica"
-    ],
-    "Infraestructura": [
-        "concesion vial","concesion aeroportuaria","concesion portuaria","licitacion de concesion",
-        "adjudicacion de concesion","oferta economica vpi","vpi","inicio de obras","avance de obras",
-        "recepcion provisoria","recepcion definitiva","tarifa de peaje","alza de peajes",
-        "mop direccion de concesiones","contrato de concesion","modificacion de contrato",
-        "obras adicionales","puente","tunel","ferrocarril","efe","linea de metro","embalse",
-        "obra hidraulica"
-    ],
-    "Malls": [
-        "gla","superficie arrendable","ocupacion de malls","vacancia de malls","ventas de arrendatarios",
-        "tenant sales","renta variable","canon de arriendo","arriendo variable","tenant mix",
-        "apertura de tienda ancla","tienda ancla","expansion de mall","remodelacion de mall",
-        "footfall","trafico peatonal","noi","ingreso operacional neto","cap rate","revaluacion ifrs",
-        "parque comercial","strip center","centro comercial abierto"
-    ]
-}
-
-NEGATIVOS_POR_INDUSTRIA = {
-    "Bancaria": ["banco de sangre","banco de alimentos"],
-    "Mineria": ["mineria de datos","minecraft"],
-    "Tecnologia": ["videojuego","rumor de lanzamiento"],
-    "Malls": ["mal"]  # errores ortográficos frecuentes
-}
+INDUSTRIA_KEYWORDS = _WATCHLIST.industria_keywords
+NEGATIVOS_POR_INDUSTRIA = _WATCHLIST.negativos
 
 # ----------------- HELPERS -----------------
 def _normalize_domain(host: str) -> str:
     host = (host or "").lower()
     return host[4:] if host.startswith("www.") else host
 
+# Variantes de una misma nota: amp./m./www., /amp o .amp al final, ?outputType=amp, tracking
+_URL_PREFIJOS_HOST = ("www.", "amp.", "m.")
+_URL_AMP_PATH_RE = re.compile(r"(?:/amp|\.amp)/?$", re.IGNORECASE)
+_URL_PARAMS_DESCARTE = {"amp", "outputtype", "output", "fbclid", "gclid", "mc_cid", "mc_eid",
+                        "ref", "ref_src", "cmpid", "origin", "source"}
+
+def _url_key(url: str) -> str:
+    """
+    Clave canónica de URL (dedup, agrupación y clave del almacén): sin esquema, host en
+    minúsculas sin www./amp./m. ni puerto por defecto, sin sufijo AMP ni '/' final, sin
+    fragmento y sin parámetros de tracking/AMP (el resto de la query, ordenada).
+    """
+    try:
+        u = urlparse((url or "").strip())
+        host = (u.hostname or "").lower()
+        puerto = u.port
+    except Exception:
+        return url or ""
+    for pref in _URL_PREFIJOS_HOST:
+        if host.startswith(pref):
+            host = host[len(pref):]
+    if puerto and puerto not in (80, 443):
+        host = f"{host}:{puerto}"
+    path = _URL_AMP_PATH_RE.sub("", u.path).rstrip("/") or "/"
+    params = sorted(
+        (k, v) for k, v in parse_qsl(u.query, keep_blank_values=True)
+        if not (k.lower() in _URL_PARAMS_DESCARTE or k.lower().startswith("utm_"))
+    )
+    q = f"?{urlencode(params)}" if params else ""
+    return f"{host}{path}{q}"
+
 def _host_ok(url: str) -> bool:
     try:
         host = urlparse(url).netloc.lower()
@@ -260,16 +226,22 @@ def _host_ok(url: str) -> bool:
 def strip_html(text: str) -> str:
     return html.unescape(re.sub(r"<[^>]+>", "", text or "")).strip()
 
-def _iso_to_cl_no_tz(ts: str) -> str:
+def _as_dt(ts: str | datetime) -> datetime:
+    """Acepta ISO (con 'Z') o un datetime ya parseado."""
+    if isinstance(ts, datetime):
+        return ts
+    return datetime.fromisoformat((ts or "").replace("Z", "+00:00"))
+
+def _iso_to_cl_no_tz(ts: str | datetime) -> str:
     try:
-        dt = datetime.fromisoformat((ts or "").replace("Z", "+00:00"))
+        dt = _as_dt(ts)
         return dt.astimezone(CL_TZ).strftime("%Y-%m-%d %H:%M:%S")
     except Exception:
         return ts or ""
 
-def _hours_ago_label(ts: str) -> str:
+def _hours_ago_label(ts: str | datetime) -> str:
     try:
-        dt = datetime.fromisoformat((ts or "").replace("Z", "+00:00")).astimezone(CL_TZ)
+        dt = _as_dt(ts).astimezone(CL_TZ)
         now_cl = datetime.now(CL_TZ)
         delta = now_cl - dt
         hours = int(round(delta.total_seconds() / 3600.0))
@@ -279,7 +251,7 @@ def _hours_ago_label(ts: str) -> str:
     except Exception:
         return "hace ? hrs"
 
-def _fecha_mas_relativa(ts: str) -> str:
+def _fecha_mas_relativa(ts: str | datetime) -> str:
     base = _iso_to_cl_no_tz(ts)
     rel = _hours_ago_label(ts)
     return f"{base} ({rel})"
@@ -302,6 +274,42 @@ def normalizar_texto(s: str) -> str:
     s = unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode("ascii")
     return s.lower()
 
+@dataclass(slots=True)
+class Articulo:
+    """
+    Registro de artículo armado UNA vez al descargar (fetch) y compartido por
+    matching, detección de industrias, agrupación y render.
+    """
+    title: str
+    description: str          # cuerpo recortado tal cual llega (puede traer HTML)
+    url: str
+    host: str                 # dominio base canónico (sin "www.")
+    published: datetime | None  # UTC
+    publishedAt: str          # ISO "YYYY-MM-DDTHH:MM:SSZ" (compatibilidad)
+    texto_norm: str           # normalizar_texto(title + " " + description)
+    desc_limpia: str          # strip_html(description)
+    industrias: dict[str, list[str]] | None = None  # memo de detectar_industrias_detalle
+    empresas: frozenset[str] | None = None  # memo de empresas_en_articulo
+    url_key: str = ""         # _url_key(url): clave canónica usada en dedup, agrupación y almacén
+    rep: "Articulo | None" = None  # representante de su cluster de casi-duplicados (None = él mismo)
+
+    @classmethod
+    def crear(cls, title: str, description: str, url: str, host: str,
+              published: datetime | None, publishedAt: str, url_key: str | None = None) -> "Articulo":
+        title = title or ""
+        description = description or ""
+        return cls(
+            title=title,
+            description=description,
+            url=url,
+            host=host,
+            published=published,
+            publishedAt=publishedAt or "",
+            texto_norm=normalizar_texto(title + " " + description),
+            desc_limpia=strip_html(description),
+            url_key=url_key if url_key is not None else _url_key(url),
+        )
+
 def contiene_empresa(titulo: str, descripcion: str, empresa: str, aliases: list[str]) -> bool:
     texto_norm = normalizar_texto((titulo or "") + " " + (descripcion or ""))
     patrones = [empresa] + (aliases or [])
@@ -313,28 +321,128 @@ def contiene_empresa(titulo: str, descripcion: str, empresa: str, aliases: list[
             return True
     return False
 
+# ===== Matcher multi-patrón (una pasada por artículo; TrieMatcher en watchlist_noticias) =====
+_ALIAS_MATCHER: TrieMatcher | None = None
+
+def _watchlist_actual() -> Watchlist:
+    """La watchlist en uso (los módulos-lista pueden haberse modificado en proceso, p. ej. el bench)."""
+    return Watchlist(list(empresas), dict(EMPRESA_ALIASES), dict(INDUSTRIA_KEYWORDS), dict(NEGATIVOS_POR_INDUSTRIA))
+
+def _compilar_matchers(w: Watchlist) -> tuple[TrieMatcher, TrieMatcher, TrieMatcher]:
+    problemas = validar(w, normalizar_texto)
+    if problemas:
+        raise ValueError("Watchlist inválida:\n  - " + "\n  - ".join(problemas))
+    alias = TrieMatcher({
+        empresa: [normalizar_texto(p) for p in [empresa] + (w.aliases.get(empresa, []) or [])]
+        for empresa in w.empresas
+    })
+    keywords = TrieMatcher({
+        industria: [(k or "").strip().lower() for k in keys]
+        for industria, keys in (w.industria_keywords or {}).items()
+    })
+    negativos = TrieMatcher({
+        industria: list(negs or [])
+        for industria, negs in (w.negativos or {}).items()
+    })
+    return alias, keywords, negativos
+
+def _cargar_matchers() -> None:
+    """Carga el artefacto de la huella actual o compila (y guarda) si la watchlist cambió."""
+    global _ALIAS_MATCHER, _INDUSTRIA_MATCHERS
+    w = _watchlist_actual()
+    h = huella(w)
+    matchers = cargar_artefacto(MATCHER_CACHE_DIR, h)
+    if matchers is None or len(matchers) != 3:
+        t0 = time.perf_counter()
+        matchers = _compilar_matchers(w)
+        RUN_STATS["counts"]["matchers_compilados"] += 1
+        print(f"🧩 Matchers compilados ({len(w.empresas)} empresas, {len(w.industria_keywords)} industrias) "
+              f"en {time.perf_counter() - t0:.2f}s", flush=True)
+        try:
+            guardar_artefacto(MATCHER_CACHE_DIR, h, matchers)
+        except Exception as e:
+            print(f"[WARN] No se pudo guardar el artefacto de matchers: {e}", flush=True)
+    alias, keywords, negativos = matchers
+    _ALIAS_MATCHER, _INDUSTRIA_MATCHERS = alias, (keywords, negativos)
+
+def _alias_matcher() -> TrieMatcher:
+    """Matcher de empresas (desde `empresas` + EMPRESA_ALIASES), del artefacto o compilado una vez."""
+    if _ALIAS_MATCHER is None:
+        _cargar_matchers()
+    return _ALIAS_MATCHER
+
+def _terminos_pushdown() -> list[list[str]]:
+    """
+    Nombres y alias para el pushdown a ER, en tandas de ER_PUSHDOWN_TERMINOS. Sin repetidos
+    (mayúsculas/espacios) y sin los que contienen otro término como palabras completas
+    ("CAP S.A." sobra si ya está "CAP"): ER ya los trae con el más corto. El matcher local
+    se vuelve a aplicar sobre lo que llega, así que la precisión no cambia.
+    """
+    terminos: dict[str, str] = {}
+    for e in empresas:
+        for p in [e] + (EMPRESA_ALIASES.get(e, []) or []):
+            k = " ".join((p or "").lower().split())
+            if k and k not in terminos:
+                terminos[k] = " ".join(p.split())
+    utiles = []
+    for k, original in terminos.items():
+        toks = k.split()
+        cubierto = any(
+            " ".join(toks[i:j]) in terminos
+            for i in range(len(toks)) for j in range(i + 1, len(toks) + 1) if j - i < len(toks)
+        )
+        if not cubierto:
+            utiles.append(original)
+    n = max(1, ER_PUSHDOWN_TERMINOS)
+    return [utiles[i:i + n] for i in range(0, len(utiles), n)]
+
+def empresas_en_texto(titulo: str, descripcion: str) -> set[str]:
+    """Todas las empresas cuyo nombre/alias aparece en el texto (mismo criterio que contiene_empresa)."""
+    texto_norm = normalizar_texto((titulo or "") + " " + (descripcion or ""))
+    return set(_alias_matcher().buscar(texto_norm))
+
+def empresas_en_articulo(art: Articulo) -> set[str]:
+    """Como empresas_en_texto, usando el texto normalizado una sola vez al descargar (memoizado)."""
+    if art.empresas is None:
+        art.empresas = frozenset(_alias_matcher().buscar(art.texto_norm))
+    return set(art.empresas)
+
+# ===== Industrias: keywords y negativos compilados en un solo matcher =====
+_INDUSTRIA_MATCHERS: tuple[TrieMatcher, TrieMatcher] | None = None
+
+def _industria_matchers() -> tuple[TrieMatcher, TrieMatcher]:
+    """(keywords, negativos) desde INDUSTRIA_KEYWORDS / NEGATIVOS_POR_INDUSTRIA, del artefacto o compilados una vez."""
+    if _INDUSTRIA_MATCHERS is None:
+        _cargar_matchers()
+    return _INDUSTRIA_MATCHERS
+
+def _detectar_industrias_norm(t: str) -> dict[str, list[str]]:
+    """
+    { industria: [keywords que dispararon] } en el orden de INDUSTRIA_KEYWORDS,
+    descartando industrias con algún negativo presente. Una sola pasada por matcher.
+    """
+    kw_matcher, neg_matcher = _industria_matchers()
+    hits = kw_matcher.buscar(t)
+    if not hits:
+        return {}
+    negs = neg_matcher.buscar(t)
+    return {ind: hits[ind] for ind in kw_matcher.labels if ind in hits and ind not in negs}
+
 def detectar_industrias(titulo: str, descripcion: str) -> list[str]:
     """
     Devuelve lista de industrias (keys de INDUSTRIA_KEYWORDS) que matchean
     con titulo/descripcion, aplicando filtros negativos por industria.
     """
-    t = normalizar_texto((titulo or "") + " " + (descripcion or ""))
-    hits = []
-    for industria, keys in (INDUSTRIA_KEYWORDS or {}).items():
-        match = False
-        for k in keys:
-            k = (k or "").strip().lower()
-            if not k:
-                continue
-            if re.search(rf"\b{re.escape(k)}\b", t):
-                match = True
-                break
-        if match:
-            negs = (NEGATIVOS_POR_INDUSTRIA or {}).get(industria, [])
-            if any(re.search(rf"\b{re.escape(n)}\b", t) for n in negs):
-                continue
-            hits.append(industria)
-    return hits
+    return list(_detectar_industrias_norm(normalizar_texto((titulo or "") + " " + (descripcion or ""))))
+
+def detectar_industrias_detalle(art: Articulo) -> dict[str, list[str]]:
+    """
+    Igual que detectar_industrias pero con las keywords que dispararon cada industria.
+    Se memoiza en el propio artículo: se calcula una vez aunque matcheen varias empresas.
+    """
+    if art.industrias is None:
+        art.industrias = _detectar_industrias_norm(art.texto_norm)
+    return art.industrias
 
 # ===== Helpers para consolidación y formato de clasificación =====
 CAT_RANK = {"ALTA": 3, "MEDIA": 2, "BAJA": 1, "SIN CLASIFICAR": 0}
@@ -345,6 +453,8 @@ def _merge_cat(prev: str | None, new: str | None) -> str:
     n = (new or "SIN CLASIFICAR").upper()
     return n if CAT_RANK.get(n, -1) >= CAT_RANK.get(p, -1) else p
 
+_DT_MIN = datetime.min.replace(tzinfo=timezone.utc)
+
 def _iso_to_dt(ts: str):
     try:
         return datetime.fromisoformat((ts or "").replace("Z", "+00:00"))
@@ -366,8 +476,10 @@ def _format_tags(empresas: dict[str, str], industrias: dict[str, str]) -> str:
 def _group_and_collapse_by_url(noticias: list[dict], klass_map: dict[str, str]) -> list[dict]:
     """
     1) Elimina ítems NULA.
-    2) Agrupa por URL consolidando empresas e industrias con su mejor categoría.
-    Devuelve lista de grupos con campos: titulo, descripcion, fuente, fecha, url, empresas{}, industrias{}.
+    2) Agrupa por URL canónica (_url_key) consolidando empresas e industrias con su mejor
+       categoría (los casi-duplicados se agrupan bajo la URL de su representante).
+    Devuelve lista de grupos con campos: titulo, descripcion, fuente, fecha, dt, url, empresas{}, industrias{},
+    tambien_en[].
     """
     groups: dict[str, dict] = {}
 
@@ -380,28 +492,45 @@ def _group_and_collapse_by_url(noticias: list[dict], klass_map: dict[str, str])
         if not url:
             continue
 
-        g = groups.get(url)
+        art: Articulo | None = n.get("articulo")
+        if art is not None and art.rep is not None:
+            # Casi-duplicado: se agrupa bajo la URL de su representante y se muestra ese texto
+            hermano, art = art, art.rep
+            url = art.url
+            n = {**n, "titulo": art.title, "fuente": DOMAIN_DISPLAY.get(art.host, art.host),
+                 "fecha": art.publishedAt, "descripcion": art.description}
+            fuente_hermano = DOMAIN_DISPLAY.get(hermano.host, hermano.host)
+        else:
+            fuente_hermano = None
+        clave = art.url_key if art is not None else _url_key(url)
+        g = groups.get(clave)
         if not g:
             g = {
                 "url": url,
                 "titulo": n.get("titulo", "") or "",
-                "descripcion": strip_html(n.get("descripcion", "") or ""),
+                "descripcion": art.desc_limpia if art else strip_html(n.get("descripcion", "") or ""),
                 "fuente": n.get("fuente", "") or "",
                 "fecha": n.get("fecha", "") or "",
+                "dt": art.published if art else _iso_to_dt(n.get("fecha", "") or ""),
                 "empresas": {},    # { nombre_empresa: categoria_mejor }
                 "industrias": {},  # { nombre_industria: categoria_mejor }
+                "tambien_en": [],  # otras fuentes con la misma nota (casi-duplicados)
             }
-            groups[url] = g
+            groups[clave] = g
         else:
             # Rellenar campos vacíos con información disponible
             if not g["titulo"] and n.get("titulo"):
                 g["titulo"] = n["titulo"]
             if not g["descripcion"] and n.get("descripcion"):
-                g["descripcion"] = strip_html(n["descripcion"])
+                g["descripcion"] = art.desc_limpia if art else strip_html(n["descripcion"])
             if not g["fuente"] and n.get("fuente"):
                 g["fuente"] = n["fuente"]
             if not g["fecha"] and n.get("fecha"):
                 g["fecha"] = n["fecha"]
+                g["dt"] = art.published if art else _iso_to_dt(n["fecha"])
+
+        if fuente_hermano and fuente_hermano != g["fuente"] and fuente_hermano not in g["tambien_en"]:
+            g["tambien_en"].append(fuente_hermano)
 
         # Consolidar empresas/industrias con la mejor categoría
         if n.get("tipo") == "empresa":
@@ -415,12 +544,98 @@ def _group_and_collapse_by_url(noticias: list[dict], klass_map: dict[str, str])
 
     # A lista y ordenar por fecha desc
     out = list(groups.values())
-    out.sort(key=lambda x: (_iso_to_dt(x.get("fecha") or "") or datetime.min), reverse=True)
+    out.sort(key=lambda x: x.get("dt") or _DT_MIN, reverse=True)
     return out
 
 # --------- Sesión, cachés y stats ----------
-RUN_STATS = {"counts": defaultdict(int), "errors": defaultdict(set)}
-_ER_ARTICLES_CACHE_BY_HOST: dict[str, list] = {}  # cache separado por fuente
+RUN_STATS = {"counts": defaultdict(int), "errors": defaultdict(set), "timings": defaultdict(float)}
+_TIMINGS_LOCK = threading.Lock()
+_ER_ARTICLES_CACHE_BY_HOST: dict[str, list[Articulo]] = {}  # cache separado por fuente
+_ALMACEN = None
+_ALMACEN_LOCK = threading.Lock()
+_PLAZOS: PlanPlazos | None = None  # plan de la corrida en curso (lo arma preparar_corrida)
+
+def _limite(etapa: str) -> float | None:
+    """Límite (time.monotonic) de la etapa en la corrida en curso; None = sin plazos."""
+    return _PLAZOS.limite(etapa) if _PLAZOS is not None else None
+
+def _vencido(etapa: str) -> bool:
+    return _PLAZOS is not None and _PLAZOS.vencido(etapa)
+
+def _antes(*limites: float | None) -> float | None:
+    """El más próximo de los límites dados (None = sin límite)."""
+    dados = [l for l in limites if l is not None]
+    return min(dados) if dados else None
+
+def _degradar(etapa: str, clave: str, nota: str) -> None:
+    """Deja en RUN_STATS["errors"][clave] (y en el plan) lo que se recortó por plazo."""
+    RUN_STATS["errors"][clave].add(nota)
+    if _PLAZOS is not None:
+        _PLAZOS.vencer(etapa, f"{clave}: {nota}")
+
+def _almacen_articulos():
+    """Almacén SQLite compartido (lazy). None si está desactivado o no se pudo abrir."""
+    global _ALMACEN
+    if not ARTICLE_STORE_PATH:
+        return None
+    with _ALMACEN_LOCK:
+        if _ALMACEN is None:
+            try:
+                from almacen_noticias import AlmacenArticulos
+                _ALMACEN = AlmacenArticulos(ARTICLE_STORE_PATH)
+                _ALMACEN.purgar(datetime.now(timezone.utc) - timedelta(days=ARTICLE_STORE_RETENTION_DAYS))
+            except Exception as e:
+                RUN_STATS["errors"]["almacen"].add(f"No se pudo abrir {ARTICLE_STORE_PATH}: {e}")
+                return None
+        return _ALMACEN
+
+_INDICE_DUP: IndiceDuplicados | None = None  # por corrida (se reinicia en preparar_corrida)
+
+def _registrar_casi_duplicado(a: Articulo) -> None:
+    """Indexa el artículo en el LSH de casi-duplicados y le asigna su representante."""
+    global _INDICE_DUP
+    if not DEDUP_CASI_DUPLICADOS:
+        return
+    if _INDICE_DUP is None:
+        _INDICE_DUP = IndiceDuplicados(umbral=DUP_UMBRAL)
+    r = _INDICE_DUP.agregar(id(a), a.texto_norm, a)  # el registro vive toda la corrida
+    a.rep = r if r is not a else None
+
+def _agrupar_casi_duplicados(domain_buckets: dict[str, list[Articulo]]) -> None:
+    """
+    Casi-duplicados sobre el corpus descargado, antes del matching: todos los artículos
+    (no solo los que nombran una empresa) en orden DF → LT → EMOL, así el representante
+    es estable y un hermano puede tener como representante una nota sin match.
+    """
+    if not DEDUP_CASI_DUPLICADOS:
+        return
+    for base_domain in ["df.cl", "latercera.com", "emol.com"]:
+        for a in domain_buckets.get(base_domain, []) or []:
+            if a.url and _host_ok(a.url):
+                _registrar_casi_duplicado(a)
+    _cerrar_casi_duplicados()
+
+def _cerrar_casi_duplicados() -> None:
+    """Propaga uniones tardías (A~C llegó después de B~C) y deja los conteos en RUN_STATS."""
+    if _INDICE_DUP is None:
+        return
+    clusters = _INDICE_DUP.clusters()
+    for miembros in clusters:
+        for a in miembros[1:]:
+            a.rep = miembros[0]
+    RUN_STATS["counts"]["casi_duplicados_clusters"] = len(clusters)
+    RUN_STATS["counts"]["casi_duplicados_hermanos"] = sum(len(m) - 1 for m in clusters)
+
+@contextmanager
+def _cronometro(etapa: str):
+    """Suma el tiempo de pared del bloque en RUN_STATS["timings"][etapa] (segundos)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        with _TIMINGS_LOCK:
+            RUN_STATS["timings"][etapa] += dt
 
 # ============== Ventana dinámica según hora Chile ==============
 def _compute_hours_back(now_cl: datetime | None = None) -> float:
@@ -453,34 +668,86 @@ def _parse_er_dt_to_iso(dt_str: str) -> str:
     except Exception:
         return dt_str or ""
 
-def _parse_er_dt_to_utc_datetime(dt_str: str):
-    try:
-        iso = _parse_er_dt_to_iso(dt_str)
-        dt = datetime.fromisoformat(iso.replace("Z", "+00:00"))
-        return dt.astimezone(timezone.utc)
-    except Exception:
-        return None
+def _parse_er_dt(dt_str: str) -> tuple[str, datetime | None]:
+    """(ISO con Z, datetime UTC o None): se parsea UNA vez por artículo y se reutiliza."""
+    iso = _parse_er_dt_to_iso(dt_str)
+    return iso, _iso_to_dt(iso)
 
-def _fetch_er_articles_for_host(host: str) -> list:
+def _por_paginas(it: Iterable, n: int) -> Iterator[list]:
+    """Agrupa el iterador de ER en páginas de `n` sin pedir la siguiente antes de tiempo."""
+    it = iter(it)
+    while pagina := list(islice(it, n)):
+        yield pagina
+
+_ER_LOCAL = threading.local()          # un cliente EventRegistry (y su sesión HTTP) por hilo
+_ER_SOURCE_URIS: dict[str, str] = {}  # sourceUri resueltos, válidos mientras viva el proceso
+
+def _er_cliente():
+    """
+    Cliente EventRegistry del hilo actual (lazy). El SDK toma un lock por cliente durante
+    todo el request (pausa mínima y reintentos incluidos): compartirlo entre workers los
+    serializa. Reintentos finitos para que un host caído no retenga el worker, y el
+    timeout HTTP de cada intento acotado al plazo del hilo (_ER_LOCAL.plazo): pasado el
+    plazo el intento falla de inmediato, así que lo más que se excede es la pausa fija
+    del SDK entre reintentos. Lanza ImportError si falta el paquete.
     """
-    Descarga artículos de un host (df.cl, latercera.com, emol.com) vía Event Registry
-    SOLO UNA VEZ y cachea.
+    er = getattr(_ER_LOCAL, "cliente", None)
+    if er is None:
+        from eventregistry import EventRegistry
+        er = _ER_LOCAL.cliente = EventRegistry(apiKey=ER_API_KEY, repeatFailedRequestCount=ER_REINTENTOS)
+        sesion = getattr(er, "_reqSession", None)
+        if sesion is not None:
+            sesion.request = _request_con_plazo(sesion.request)
+    return er
+
+def _request_con_plazo(request):
+    """Envuelve Session.request: timeout = min(el del SDK, lo que queda de _ER_LOCAL.plazo)."""
+    def con_plazo(*args, **kw):
+        plazo = getattr(_ER_LOCAL, "plazo", None)
+        if plazo is not None:
+            queda = plazo - time.monotonic()
+            if queda <= 0:
+                raise TimeoutError("plazo de descarga agotado")
+            kw["timeout"] = min(kw.get("timeout") or queda, queda)
+        return request(*args, **kw)
+    return con_plazo
+
+def _resolve_source_uri(er, base: str) -> str | None:
+    if base in _ER_SOURCE_URIS:
+        return _ER_SOURCE_URIS[base]
+    src_uri = er.getSourceUri(base)
+    if not src_uri:
+        # Intento con "www." si falla
+        src_uri = er.getSourceUri(f"www.{base}")
+    if src_uri:
+        _ER_SOURCE_URIS[base] = src_uri
+    return src_uri or None
+
+def _iter_er_articles_for_host(host: str, er=None, src_uri: str | None = None,
+                               deadline: float | None = None) -> Iterator[Articulo]:
+    """
+    Genera los artículos de un host (df.cl, latercera.com, emol.com) vía Event Registry
+    a medida que llegan, como registros Articulo (texto normalizado, fecha UTC, host
+    canónico y descripción limpia se calculan aquí, una sola vez). Con almacén local,
+    al final genera además los artículos de la ventana que ya estaban guardados.
+
+    Se pide a ER ordenado por fecha desc y el paginado se corta en la primera página
+    entera anterior a la ventana (páginas escaneadas vs útiles en RUN_STATS["counts"]).
+    `er` / `src_uri` permiten pasar un cliente (por omisión, el del hilo) y un sourceUri ya
+    resuelto (modo concurrente). `deadline` (time.monotonic) corta el paginado y
+    conserva lo ya descargado. Los errores quedan en RUN_STATS["errors"].
     """
     base = _normalize_domain(host)
-    if base in _ER_ARTICLES_CACHE_BY_HOST:
-        return _ER_ARTICLES_CACHE_BY_HOST[base]
 
     if not ER_API_KEY:
         RUN_STATS["errors"][base].add("Sin ER_API_KEY: fuente desactivada")
-        _ER_ARTICLES_CACHE_BY_HOST[base] = []
-        return _ER_ARTICLES_CACHE_BY_HOST[base]
+        return
 
     try:
-        from eventregistry import EventRegistry, QueryArticlesIter
+        from eventregistry import QueryArticlesIter, QueryItems, ReturnInfo, ArticleInfoFlags
     except ImportError:
         RUN_STATS["errors"][base].add("Falta package 'eventregistry' (pip install eventregistry)")
-        _ER_ARTICLES_CACHE_BY_HOST[base] = []
-        return _ER_ARTICLES_CACHE_BY_HOST[base]
+        return
 
     # Ventana local (Chile)
     end_dt_local = datetime.now(CL_TZ)
@@ -492,101 +759,532 @@ def _fetch_er_articles_for_host(host: str) -> list:
     start_cutoff_utc = start_dt_local.astimezone(timezone.utc)
     end_cutoff_utc = end_dt_local.astimezone(timezone.utc)
 
+    # Almacén local: si ya cubrimos el inicio de la ventana, solo pedimos lo posterior al HWM
+    store = None if ER_PUSHDOWN else _almacen_articulos()
+    cobertura = None
+    if store is not None:
+        try:
+            cobertura = store.cobertura(base)
+        except Exception as e:
+            RUN_STATS["errors"][base].add(f"Almacén local falló: {e}")
+    incremental = bool(cobertura and cobertura[0] <= start_cutoff_utc)
+    fetch_cutoff_utc = start_cutoff_utc
+    if incremental:
+        fetch_cutoff_utc = max(start_cutoff_utc, cobertura[1] - timedelta(minutes=ER_HWM_SOLAPE_MIN))
+        dateStart = fetch_cutoff_utc.astimezone(CL_TZ).strftime("%Y-%m-%d")
+
+    por_guardar: list[Articulo] = []  # se persisten por tandas para no retener todo el corpus
+    n_raw = n_kept = n_variantes = n_paginas = n_paginas_utiles = n_fuera = n_bytes = 0
+    entregados: set[str] = set()      # url_key ya generados (para no repetir los del almacén)
+    max_pub: datetime | None = None
+    completo = True  # False si se cortó el paginado (timeout / tope de items / error)
+    consultas: list = []
+    plazo_previo = getattr(_ER_LOCAL, "plazo", None)
+
     try:
-        er = EventRegistry(apiKey=ER_API_KEY)
-        src_uri = er.getSourceUri(base)
-        if not src_uri:
-            # Intento con "www." si falla
-            src_uri = er.getSourceUri(f"www.{base}")
+        _ER_LOCAL.plazo = deadline
+        if er is None:
+            er = _er_cliente()
+        if src_uri is None:
+            src_uri = _resolve_source_uri(er, base)
         if not src_uri:
             RUN_STATS["errors"][base].add(f"Event Registry no encontró sourceUri para {base}")
-            _ER_ARTICLES_CACHE_BY_HOST[base] = []
-            return _ER_ARTICLES_CACHE_BY_HOST[base]
+            return
 
+        # Solo los campos que usamos y el cuerpo recortado en el servidor
+        return_info = ReturnInfo(articleInfo=ArticleInfoFlags(
+            bodyLen=ER_BODY_LEN, eventUri=False, authors=False, image=False, sentiment=False,
+        ))
         # Para maximizar recall, no fijamos lang
-        q = QueryArticlesIter(
-            sourceUri=src_uri,
-            # lang="spa",
-            dateStart=dateStart,
-            dateEnd=dateEnd,
-        )
+        if ER_PUSHDOWN:
+            tandas = _terminos_pushdown()
+            consultas = [QueryArticlesIter(keywords=QueryItems.OR(t), keywordsLoc="body,title", sourceUri=src_uri,
+                                           dateStart=dateStart, dateEnd=dateEnd) for t in tandas]
+        else:
+            consultas = [QueryArticlesIter(sourceUri=src_uri, dateStart=dateStart, dateEnd=dateEnd)]
 
-        collected, seen = [], set()
-        OLD_STREAK_BREAK = 10_000
-        old_streak = 0
-        seen_in_window = False
-
-        for art in q.execQuery(er, maxItems=ER_MAX_ITEMS_RAW):
-            dt_utc = _parse_er_dt_to_utc_datetime(art.get("dateTime"))
-            if dt_utc is not None:
-                if dt_utc < start_cutoff_utc:
-                    if seen_in_window:
-                        old_streak += 1
-                        if old_streak >= OLD_STREAK_BREAK:
-                            break
-                    continue
-                else:
-                    old_streak = 0
-                    seen_in_window = True
-                    if dt_utc > end_cutoff_utc:
-                        continue
+        seen: dict[str, str] = {}  # url canónica -> primera URL cruda vista (une las tandas del pushdown)
+        cortado = False
 
-            url = art.get("url")
-            if not url or url in seen:
-                continue
+        # Orden por fecha desc: dateStart es un día calendario completo, así que la cola de
+        # cada consulta queda fuera de la ventana. Se corta en la primera página cuyos
+        # artículos son TODOS anteriores al corte (tolera desorden menor dentro de una página).
+        for q in consultas:
+            if cortado:
+                break
+            n_q = paginas_q = 0
+            llego_al_corte = False
+            for pagina in _por_paginas(q.execQuery(er, sortBy="date", sortByAsc=False, maxItems=ER_MAX_ITEMS_RAW,
+                                                   returnInfo=return_info), ER_PAGINA):
+                paginas_q += 1
+                vieja = True
+                for art in pagina:
+                    n_raw += 1
+                    n_q += 1
+                    n_bytes += len(((art.get("title") or "") + (art.get("body") or "") + (art.get("url") or "")).encode("utf-8"))
+                    if deadline is not None and time.monotonic() > deadline:
+                        if _vencido("fetch"):
+                            _degradar("fetch", base, "Plazo de descarga de la corrida agotado: se usan solo los artículos ya descargados")
+                        else:
+                            RUN_STATS["errors"][base].add(
+                                f"Timeout de fuente ({ER_HOST_TIMEOUT_S:.0f}s): se usan solo los artículos ya descargados"
+                            )
+                        completo = False
+                        cortado = True
+                        break
 
-            try:
-                url_host = _normalize_domain(urlparse(url).netloc.lower())
-            except Exception:
-                continue
+                    published_at, dt_utc = _parse_er_dt(art.get("dateTime") or "")
+                    if dt_utc is not None:
+                        if dt_utc < fetch_cutoff_utc:
+                            n_fuera += 1
+                            continue
+                        vieja = False
+                        if dt_utc > end_cutoff_utc:
+                            n_fuera += 1
+                            continue
+                    else:
+                        vieja = False  # sin fecha: no prueba que la página esté fuera de la ventana
+
+                    url = art.get("url")
+                    if not url:
+                        continue
+                    clave = _url_key(url)
+                    if clave in seen:
+                        if seen[clave] != url:
+                            n_variantes += 1  # amp/www/query/fragmento de una nota ya vista
+                        continue
 
-            # filtro estricto por host efectivo
-            if not (url_host == base or url_host.endswith("." + base)):
-                continue
+                    try:
+                        url_host = _normalize_domain(urlparse(url).netloc.lower())
+                    except Exception:
+                        continue
 
-            seen.add(url)
-            collected.append({
-                "title": art.get("title") or "",
-                "description": (art.get("body") or "")[:600],
-                "publishedAt": _parse_er_dt_to_iso(art.get("dateTime") or ""),
-                "url": url,
-            })
+                    # filtro estricto por host efectivo
+                    if not (url_host == base or url_host.endswith("." + base)):
+                        continue
 
-        # Ordenar por fecha desc
-        def key_dt(x):
-            try:
-                return datetime.fromisoformat((x.get("publishedAt") or "").replace("Z", "+00:00"))
-            except Exception:
-                return datetime.min
-
-        collected.sort(key=key_dt, reverse=True)
-        _ER_ARTICLES_CACHE_BY_HOST[base] = collected
-        if DEBUG_SUMMARY:
-            print(f"[DEBUG] EventRegistry {base}: artículos cacheados = {len(collected)}", flush=True)
-        return _ER_ARTICLES_CACHE_BY_HOST[base]
+                    seen[clave] = url
+                    body = (art.get("body") or "")[:ER_BODY_LEN]
+                    a = Articulo.crear(
+                        title=art.get("title") or "",
+                        description=body,
+                        url=url,
+                        host=base,
+                        published=dt_utc,
+                        publishedAt=published_at,
+                        url_key=clave,
+                    )
+                    if dt_utc is not None and (max_pub is None or dt_utc > max_pub):
+                        max_pub = dt_utc
+                    if store is not None:
+                        entregados.add(clave)
+                        por_guardar.append(a)
+                        if len(por_guardar) >= ALMACEN_TANDA:
+                            if not _guardar_almacen(store, base, por_guardar):
+                                store = None
+                            por_guardar = []
+                    n_kept += 1
+                    yield a
+
+                if cortado:
+                    break
+                if vieja:
+                    llego_al_corte = True
+                    break
+                n_paginas_utiles += 1
+
+            n_paginas += max(1, paginas_q)
+            if n_q >= ER_MAX_ITEMS_RAW and not llego_al_corte:
+                completo = False
 
     except Exception as e:
         RUN_STATS["errors"][base].add(f"Event Registry falló: {e}")
-        _ER_ARTICLES_CACHE_BY_HOST[base] = []
+        completo = False
+    finally:
+        _ER_LOCAL.plazo = plazo_previo
+        # Escaneados vs conservados: páginas útiles = con algún artículo dentro de la ventana
+        RUN_STATS["counts"][f"er_items_{base}"] = n_raw
+        RUN_STATS["counts"][f"er_fuera_ventana_{base}"] = n_fuera
+        RUN_STATS["counts"][f"er_paginas_{base}"] = n_paginas
+        RUN_STATS["counts"][f"er_paginas_utiles_{base}"] = n_paginas_utiles
+        RUN_STATS["counts"][f"er_consultas_{base}"] = len(consultas)
+        RUN_STATS["counts"][f"er_bytes_{base}"] = n_bytes
+        RUN_STATS["counts"][f"er_conservados_{base}"] = n_kept
+        RUN_STATS["counts"][f"url_variantes_{base}"] = n_variantes
+
+    if store is not None:
+        yield from _cerrar_almacen(store, base, por_guardar, start_cutoff_utc, end_cutoff_utc,
+                                   cobertura if incremental else None, completo, max_pub, entregados)
+
+def _fetch_er_articles_for_host(host: str, er=None, src_uri: str | None = None,
+                                deadline: float | None = None) -> list[Articulo]:
+    """
+    Descarga artículos de un host SOLO UNA VEZ y cachea (más nuevos primero).
+    Ver _iter_er_articles_for_host para el detalle del fetch.
+    """
+    base = _normalize_domain(host)
+    if base in _ER_ARTICLES_CACHE_BY_HOST:
         return _ER_ARTICLES_CACHE_BY_HOST[base]
 
-def _er_articles_all_sources() -> dict[str, list]:
+    with _cronometro(f"fetch_{base}"):
+        collected = list(_iter_er_articles_for_host(base, er, src_uri, deadline))
+
+    # Ordenar por fecha desc
+    def key_dt(x: Articulo):
+        return x.published or _DT_MIN
+
+    collected.sort(key=key_dt, reverse=True)
+    _ER_ARTICLES_CACHE_BY_HOST[base] = collected
+    if DEBUG_SUMMARY:
+        c = RUN_STATS["counts"]
+        print(f"[DEBUG] EventRegistry {base}: artículos cacheados = {len(collected)} "
+              f"(páginas escaneadas {c[f'er_paginas_{base}']}, útiles {c[f'er_paginas_utiles_{base}']}; "
+              f"fuera de ventana {c[f'er_fuera_ventana_{base}']})", flush=True)
+    return _ER_ARTICLES_CACHE_BY_HOST[base]
+
+def _guardar_almacen(store, base: str, arts: list[Articulo]) -> bool:
+    try:
+        store.guardar(base, [
+            {"url_key": a.url_key, "url": a.url, "title": a.title,
+             "description": a.description, "published": a.published}
+            for a in arts
+        ])
+        return True
+    except Exception as e:
+        RUN_STATS["errors"][base].add(f"Almacén local falló: {e}")
+        return False
+
+def _cerrar_almacen(store, base: str, por_guardar: list[Articulo], start_cutoff_utc: datetime,
+                    end_cutoff_utc: datetime, cobertura_previa: tuple[datetime, datetime] | None,
+                    completo: bool, max_pub: datetime | None, entregados: set[str]) -> list[Articulo]:
+    """
+    Persiste la última tanda, avanza la cobertura/HWM del host (solo si el paginado
+    fue completo) y devuelve los artículos de la ventana que vienen solo del almacén.
+    """
+    if not _guardar_almacen(store, base, por_guardar):
+        return []
+    try:
+        if completo:
+            # Esta corrida bajó desde max(start_cutoff, hwm - solape): la cobertura previa solo
+            # se extiende si su HWM alcanza el inicio de la ventana; si no, quedaría un hueco
+            # (hwm, start_cutoff) sin descargar y la cobertura parte de nuevo en start_cutoff.
+            contigua = bool(cobertura_previa and cobertura_previa[1] >= start_cutoff_utc)
+            pubs = [d for d in (max_pub, cobertura_previa[1] if contigua else None) if d]
+            if pubs:
+                desde = cobertura_previa[0] if contigua else start_cutoff_utc
+                store.actualizar_cobertura(base, desde, max(pubs))
+        filas = store.ventana(base, start_cutoff_utc, end_cutoff_utc)
+    except Exception as e:
+        RUN_STATS["errors"][base].add(f"Almacén local falló: {e}")
+        return []
+
+    out = []
+    for f in filas:
+        # Se recalcula la clave: filas guardadas con una canonicalización anterior colapsan igual
+        clave = _url_key(f["url"])
+        if clave in entregados:
+            continue
+        entregados.add(clave)
+        out.append(Articulo.crear(
+            title=f["title"], description=f["description"], url=f["url"], host=base,
+            published=f["published"], publishedAt=f["publishedAt"], url_key=clave,
+        ))
+    RUN_STATS["counts"][f"almacen_{base}"] = len(out)
+    return out
+
+def _er_cliente_y_uris(bases: list[str]):
+    """
+    sourceUri de cada host resueltos por adelantado con el cliente del hilo que llama.
+    Devuelve (er, {base: uri|None}) o None si el paquete no está instalado; los workers
+    usan su propio cliente (_er_cliente) y solo reutilizan los uris.
+    """
+    try:
+        import eventregistry  # noqa: F401
+    except ImportError:
+        return None
+
+    uris: dict[str, str | None] = {}
+    _ER_LOCAL.plazo = _limite("fetch")
+    try:
+        er = _er_cliente()
+        for base in bases:
+            uris[base] = _resolve_source_uri(er, base)
+    except Exception as e:
+        for base in bases:
+            RUN_STATS["errors"][base].add(f"Event Registry falló: {e}")
+        return None, {base: None for base in bases}
+    finally:
+        _ER_LOCAL.plazo = None
+
+    for base in bases:
+        if not uris.get(base):
+            RUN_STATS["errors"][base].add(f"Event Registry no encontró sourceUri para {base}")
+    return er, uris
+
+def _er_fetch_concurrent(bases: list[str]) -> None:
+    """
+    Descarga en paralelo (workers acotados) los hosts indicados, dejando el resultado
+    en _ER_ARTICLES_CACHE_BY_HOST. Cada worker usa su propio cliente EventRegistry y los
+    sourceUri se resuelven antes de lanzarlos. Cada host tiene su propio
+    timeout: si no termina, se registra el error y el resto sigue sin esperarlo.
+    Con el plazo de descarga de la corrida agotado, los hosts que faltan se omiten.
+    """
+    cliente = _er_cliente_y_uris(bases)
+    if cliente is None:
+        return  # el camino secuencial registra el error por host
+    _, uris = cliente
+
+    pendientes = []
+    for base in bases:
+        if uris.get(base):
+            pendientes.append(base)
+        else:
+            _ER_ARTICLES_CACHE_BY_HOST[base] = []
+    if not pendientes:
+        return
+
+    # Hilos daemon: un host colgado no debe bloquear la salida del proceso
+    cola: queue.Queue[str] = queue.Queue()
+    for base in pendientes:
+        cola.put(base)
+    inicio: dict[str, float] = {}  # host -> arranque; lo escriben los workers y lo recorre el monitor
+    inicio_lock = threading.Lock()
+
+    def _worker():
+        while True:
+            try:
+                base = cola.get_nowait()
+            except queue.Empty:
+                return
+            if _vencido("fetch"):
+                _degradar("fetch", base, "Plazo de descarga de la corrida agotado: fuente omitida")
+                _ER_ARTICLES_CACHE_BY_HOST[base] = []
+                continue
+            t0 = time.monotonic()
+            with inicio_lock:
+                inicio[base] = t0
+            _fetch_er_articles_for_host(base, None, uris[base], _antes(t0 + ER_HOST_TIMEOUT_S, _limite("fetch")))
+
+    hilos = [threading.Thread(target=_worker, name=f"er-fetch-{i}", daemon=True)
+             for i in range(max(1, min(ER_MAX_WORKERS, len(pendientes))))]
+    for h in hilos:
+        h.start()
+
+    # Cada host tiene su propio plazo (+ margen para que el corte cooperativo cierre el paginado)
+    limite = ER_HOST_TIMEOUT_S + ER_HOST_TIMEOUT_GRACE_S
+    limite_corrida = _limite("fetch")
+    while any(h.is_alive() for h in hilos):
+        ahora = time.monotonic()
+        with inicio_lock:
+            arrancados = list(inicio.items())
+        activos = [t0 for b, t0 in arrancados if b not in _ER_ARTICLES_CACHE_BY_HOST]
+        if cola.empty() and activos and all(ahora - t0 > limite for t0 in activos):
+            break
+        if limite_corrida is not None and ahora > limite_corrida + ER_HOST_TIMEOUT_GRACE_S:
+            break
+        for h in hilos:
+            h.join(timeout=0.2)
+
+    for base in pendientes:
+        if base not in _ER_ARTICLES_CACHE_BY_HOST:
+            if _vencido("fetch"):
+                _degradar("fetch", base, "Plazo de descarga de la corrida agotado: fuente omitida")
+            else:
+                RUN_STATS["errors"][base].add(f"Timeout de fuente ({ER_HOST_TIMEOUT_S:.0f}s): fuente omitida")
+            _ER_ARTICLES_CACHE_BY_HOST[base] = []
+
+def _er_articles_all_sources() -> dict[str, list[Articulo]]:
     """
     Devuelve { base_domain: [articles...] } cacheados para todas las fuentes ER_SOURCES.
+    Con ER_FETCH_CONCURRENTE los hosts se descargan en paralelo.
     """
-    out = {}
-    for host in ER_SOURCES:
-        base = _normalize_domain(host)
-        arts = _fetch_er_articles_for_host(base)
-        out[base] = arts
+    bases = [_normalize_domain(h) for h in ER_SOURCES]
+    pendientes = [b for b in bases if b not in _ER_ARTICLES_CACHE_BY_HOST]
+    with _cronometro("fetch"):
+        if ER_FETCH_CONCURRENTE and ER_API_KEY and len(pendientes) > 1:
+            _er_fetch_concurrent(pendientes)
+
+        out = {}
+        for base in bases:
+            if base not in _ER_ARTICLES_CACHE_BY_HOST and _vencido("fetch"):
+                _degradar("fetch", base, "Plazo de descarga de la corrida agotado: fuente omitida")
+                _ER_ARTICLES_CACHE_BY_HOST[base] = []
+            arts = _fetch_er_articles_for_host(base, deadline=_limite("fetch"))  # ya cacheado si corrió en paralelo
+            out[base] = arts
     return out
 
 # ===================== ORQUESTACIÓN =====================
+def _items_para_match(company_idx: int, empresa: str, a: Articulo, item_seq: int,
+                      limite: int | None = None) -> tuple[list[dict], int]:
+    """
+    Ítems de un match (empresa, artículo):
+      - Siempre 1 ítem de tipo "empresa".
+      - Además, 1 ítem de tipo "industria" POR CADA industria detectada.
+    `item_seq` es el contador por empresa (arma los id); se corta al llegar a `limite`
+    (por omisión DOMAIN_LIMIT).
+    """
+    limite = DOMAIN_LIMIT if limite is None else limite
+    out: list[dict] = []
+
+    # Detección de industrias (memoizada por artículo)
+    inds = detectar_industrias_detalle(a)
+
+    # Si se exige match de industria global y no hay industrias, descartar
+    if INDUSTRIA_MUST_MATCH and not inds:
+        return out, item_seq
+
+    # Campos comunes base
+    base_item = {
+        "empresa_id": company_idx,
+        "empresa": empresa,
+        "titulo": a.title,
+        "fuente": DOMAIN_DISPLAY.get(a.host, a.host),
+        "fecha": a.publishedAt,
+        "url": a.url,
+        "descripcion": a.description,
+        "articulo": a,
+    }
+
+    # 1) ÍTEM EMPRESA
+    item_seq += 1
+    out.append({
+        **base_item,
+        "id": f"{company_idx}-{item_seq}-E",
+        "industrias": [],
+        "es_empresa": True,
+        "es_industria": False,
+        "tipo": "empresa",
+    })
+    if item_seq >= limite:
+        return out, item_seq
+
+    # 2) ÍTEMS INDUSTRIA, UNO POR CADA INDUSTRIA DETECTADA
+    for ind in (inds or []):
+        item_seq += 1
+        out.append({
+            **base_item,
+            "id": f"{company_idx}-{item_seq}-I",
+            "industrias": [ind],
+            "industria": ind,
+            "industria_keywords": inds[ind],
+            "es_empresa": False,
+            "es_industria": True,
+            "tipo": "industria",
+        })
+        if item_seq >= limite:
+            break
+    return out, item_seq
+
+# ===================== RANKING DE RELEVANCIA =====================
+class _MatrizMenciones:
+    """
+    Menciones artículo × empresa en formato COO, armadas durante el matching. Los rasgos
+    por artículo (fila) se guardan una vez: largo del título normalizado, largo del texto
+    y publicación. Por par solo se agregan fila, columna, tf (ocurrencias de alias) y la
+    posición de la primera mención; el puntaje se calcula después sobre los arreglos.
+    """
+
+    def __init__(self):
+        self.filas, self.cols, self.tf, self.p0 = array("l"), array("l"), array("l"), array("l")
+        self.largo_titulo, self.largo_texto = array("l"), array("l")
+        self.publicado = array("d")  # epoch UTC; nan = sin fecha
+        self.articulos: list[tuple[str, Articulo]] = []  # fila -> (fuente, artículo)
+        self.empresas: list[str] = []                   # columna -> empresa
+        self._col: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.filas)
+
+    def agregar(self, base: str, a: Articulo, menciones: dict[str, list[int]]) -> None:
+        fila = len(self.articulos)
+        self.articulos.append((base, a))
+        self.largo_titulo.append(len(normalizar_texto(a.title)))
+        self.largo_texto.append(max(1, len(a.texto_norm)))
+        self.publicado.append(a.published.timestamp() if a.published else math.nan)
+        for empresa, pos in menciones.items():
+            c = self._col.get(empresa)
+            if c is None:
+                c = self._col[empresa] = len(self.empresas)
+                self.empresas.append(empresa)
+            self.filas.append(fila)
+            self.cols.append(c)
+            self.tf.append(len(pos))
+            self.p0.append(pos[0])
+
+# El peso log-tf se normaliza por columna (empresa) contra el máximo del corpus: el
+# artículo que más nombra a la empresa vale 1 y el resto en proporción. El idf es
+# constante dentro de una columna y el ranking es por empresa, así que no cambia el orden.
+def _puntajes_numpy(m: _MatrizMenciones, ahora_ts: float):
+    filas, cols = np.asarray(m.filas), np.asarray(m.cols)
+    p0 = np.asarray(m.p0)
+    w = 1.0 + np.log(np.asarray(m.tf, dtype=float))
+    tope = np.zeros(len(m.empresas))
+    np.maximum.at(tope, cols, w)
+    publicado = np.asarray(m.publicado)
+    edad = np.where(np.isnan(publicado), HOURS_BACK, np.maximum(0.0, (ahora_ts - publicado) / 3600))
+    P = RANKING_PESOS
+    return (P["tf"] * (w / tope[cols])
+            + P["titulo"] * (p0 < np.asarray(m.largo_titulo)[filas])
+            + P["posicion"] * (1.0 - p0 / np.asarray(m.largo_texto)[filas])
+            + P["recencia"] * np.exp(-edad[filas] / RANKING_VIDA_MEDIA_H))
+
+def _puntajes_python(m: _MatrizMenciones, ahora_ts: float) -> list[float]:
+    """Misma fórmula que _puntajes_numpy, sin NumPy."""
+    w = [1.0 + math.log(t) for t in m.tf]
+    tope = [0.0] * len(m.empresas)
+    for c, x in zip(m.cols, w):
+        tope[c] = max(tope[c], x)
+    edad = [HOURS_BACK if math.isnan(t) else max(0.0, (ahora_ts - t) / 3600) for t in m.publicado]
+    P = RANKING_PESOS
+    return [
+        P["tf"] * (x / tope[c])
+        + P["titulo"] * (1.0 if p < m.largo_titulo[f] else 0.0)
+        + P["posicion"] * (1.0 - p / m.largo_texto[f])
+        + P["recencia"] * math.exp(-edad[f] / RANKING_VIDA_MEDIA_H)
+        for f, c, x, p in zip(m.filas, m.cols, w, m.p0)
+    ]
+
+def _rankear_matches(m: _MatrizMenciones, ahora: datetime | None = None) -> dict[str, list[tuple[str, Articulo]]]:
+    """
+    Puntaje de relevancia de cada par (empresa, artículo) calculado de una vez sobre todo
+    el corpus (log-tf de menciones por empresa + mención en título + posición + recencia)
+    y, por empresa, los RANKING_TOP_K mejores en orden de puntaje (empates: orden DF → LT → EMOL).
+    """
+    ahora_ts = (ahora or datetime.now(timezone.utc)).timestamp()
+    cols = m.cols
+    if np is not None:
+        score = _puntajes_numpy(m, ahora_ts)
+        # Orden (empresa, -puntaje) estable y rango dentro de cada empresa
+        c_arr = np.asarray(cols)
+        orden = np.lexsort((-score, c_arr))
+        c_ord = c_arr[orden]
+        inicio = np.flatnonzero(np.r_[True, c_ord[1:] != c_ord[:-1]])
+        rango = np.arange(len(orden)) - np.repeat(inicio, np.diff(np.r_[inicio, len(orden)]))
+        elegidos = orden[rango < RANKING_TOP_K].tolist()
+    else:
+        score = _puntajes_python(m, ahora_ts)
+        orden = sorted(range(len(score)), key=lambda i: (cols[i], -score[i]))
+        cuenta: dict[int, int] = defaultdict(int)
+        elegidos = []
+        for i in orden:
+            if cuenta[cols[i]] < RANKING_TOP_K:
+                cuenta[cols[i]] += 1
+                elegidos.append(i)
+
+    out: dict[str, list[tuple[str, Articulo]]] = defaultdict(list)
+    for i in elegidos:
+        out[m.empresas[cols[i]]].append(m.articulos[m.filas[i]])
+    RUN_STATS["counts"]["ranking_pares"] = len(m)
+    RUN_STATS["counts"]["ranking_descartados"] = len(m) - len(elegidos)
+    return out
+
 def obtener_noticias() -> list[dict]:
     """
     Flujo:
       1) Descarga/caché Event Registry por cada host (DF, LT, EMOL)
-      2) Para cada empresa, filtra y genera ítems:
+      2) Escanea cada artículo UNA vez con el matcher de alias (todas las empresas a la vez)
+         y, con RANKING_RELEVANCIA, deja los RANKING_TOP_K artículos más relevantes por empresa
+      3) Para cada empresa, genera ítems:
          - Siempre 1 ítem de tipo "empresa" cuando hay match de empresa.
          - Además, 1 ítem de tipo "industria" POR CADA industria detectada.
     """
@@ -594,85 +1292,47 @@ def obtener_noticias() -> list[dict]:
 
     # 1) ER por fuente
     domain_buckets = _er_articles_all_sources()
-
-    # 2) Filtrar por empresa y asignar IDs (empresa + múltiples industria)
-    print(f"→ Filtrando noticias para {len(empresas)} empresas...", flush=True)
-    for company_idx, empresa in enumerate(empresas, start=1):
-        aliases = EMPRESA_ALIASES.get(empresa, [])
-        item_seq = 0  # contador por empresa para respetar DOMAIN_LIMIT
-
+    with _cronometro("casi_duplicados"):
+        _agrupar_casi_duplicados(domain_buckets)
+
+    with _cronometro("matching"):
+        # 2) Una sola pasada por artículo: qué empresas menciona (matcher multi-patrón)
+        matches_por_empresa: dict[str, list[tuple[str, dict]]] = defaultdict(list)
+        menciones_corpus = _MatrizMenciones()
+        matcher = _alias_matcher()
         # Recorremos DF, LT y EMOL en ese orden
         for base_domain in ["df.cl", "latercera.com", "emol.com"]:
             arts = domain_buckets.get(base_domain, []) or []
-            display = DOMAIN_DISPLAY.get(base_domain, base_domain)
-
             for a in arts:
-                url = a.get("url") or ""
-                if not url or not _host_ok(url):
+                if not a.url or not _host_ok(a.url):
                     continue
-
-                title = a.get("title") or ""
-                desc = a.get("description") or ""
-
-                # Match por empresa
-                match_emp = contiene_empresa(title, desc, empresa, aliases)
-                if not match_emp:
+                menciones = matcher.posiciones(a.texto_norm)
+                a.empresas = frozenset(menciones)
+                if not menciones:
                     continue
+                if RANKING_RELEVANCIA:
+                    menciones_corpus.agregar(base_domain, a, menciones)
+                else:
+                    for empresa in menciones:
+                        matches_por_empresa[empresa].append((base_domain, a))
 
-                # Detección de industrias
-                inds = detectar_industrias(title, desc)
+    if RANKING_RELEVANCIA and len(menciones_corpus):
+        with _cronometro("ranking"):
+            matches_por_empresa = _rankear_matches(menciones_corpus)
 
-                # Si se exige match de industria global y no hay industrias, descartar
-                if INDUSTRIA_MUST_MATCH and not inds:
-                    continue
+    with _cronometro("matching"):
 
-                # Campos comunes base
-                base_item = {
-                    "empresa_id": company_idx,
-                    "empresa": empresa,
-                    "titulo": title,
-                    "fuente": display,
-                    "fecha": a.get("publishedAt") or "",
-                    "url": url,
-                    "descripcion": desc,
-                }
-
-                # 1) ÍTEM EMPRESA
-                item_seq += 1
-                noticia_emp = {
-                    **base_item,
-                    "id": f"{company_idx}-{item_seq}-E",
-                    "industrias": [],
-                    "es_empresa": True,
-                    "es_industria": False,
-                    "tipo": "empresa",
-                }
-                all_news.append(noticia_emp)
-                if item_seq >= DOMAIN_LIMIT:
-                    break
-
-                # 2) ÍTEMS INDUSTRIA, UNO POR CADA INDUSTRIA DETECTADA
-                for ind in (inds or []):
-                    item_seq += 1
-                    noticia_ind = {
-                        **base_item,
-                        "id": f"{company_idx}-{item_seq}-I",
-                        "industrias": [ind],
-                        "industria": ind,
-                        "es_empresa": False,
-                        "es_industria": True,
-                        "tipo": "industria",
-                    }
-                    all_news.append(noticia_ind)
-                    if item_seq >= DOMAIN_LIMIT:
-                        break
+        # 3) Por empresa, generar ítems (empresa + múltiples industria) respetando DOMAIN_LIMIT
+        print(f"→ Filtrando noticias para {len(empresas)} empresas...", flush=True)
+        for company_idx, empresa in enumerate(empresas, start=1):
+            item_seq = 0  # contador por empresa para respetar DOMAIN_LIMIT
 
+            for _, a in matches_por_empresa.get(empresa, []):
+                items, item_seq = _items_para_match(company_idx, empresa, a, item_seq)
+                all_news.extend(items)
                 if item_seq >= DOMAIN_LIMIT:
                     break
 
-            if item_seq >= DOMAIN_LIMIT:
-                break
-
     if DEBUG_SUMMARY:
         by_src = defaultdict(int)
         for n in all_news:
@@ -682,38 +1342,238 @@ def obtener_noticias() -> list[dict]:
     return all_news
 
 # ===================== COMPILAR REPORTE =====================
-def compilar_reporte():
-    print("📡 Descargando y filtrando noticias...", flush=True)
-    noticias = obtener_noticias()
-    print(f"✔ Noticias filtradas: {len(noticias)}", flush=True)
-
-    # 1) Preparar inputs para IA
-    ai_inputs = [
-        {
-            "id": n["id"],
-            "titulo": n.get("titulo", ""),
-            "descripcion": strip_html(n.get("descripcion", "")),
-            "empresa": n.get("empresa", ""),
-            "industrias": n.get("industrias", []) or [],
-            "es_empresa": n.get("es_empresa", False),
-            "es_industria": n.get("es_industria", False),
-            "tipo": n.get("tipo", "empresa"),
-        }
-        for n in noticias
-    ]
-
-    # 2) Llamada a IA (respeta el switch en filtro_IA.py)
-    print("🤖 Clasificando con IA...", flush=True)
+def _articulo_para_ia(n: dict) -> Articulo | None:
+    """
+    Artículo cuyo texto se clasifica para el ítem. Un casi-duplicado viaja con el texto de
+    su representante (filtro_IA agrupa por texto: cada (cluster, objetivo) se clasifica una
+    sola vez y se copia a los hermanos) solo si ese texto también nombra al objetivo; si no,
+    la categoría del representante no dice nada del hermano y se clasifica con su texto.
+    """
+    a: Articulo | None = n.get("articulo")
+    if a is None or a.rep is None:
+        return a
+    if n.get("tipo") == "industria":
+        ind = n.get("industria") or (n.get("industrias", [None]) or [None])[0]
+        en_rep = ind in detectar_industrias_detalle(a.rep)
+    else:
+        en_rep = n.get("empresa", "") in empresas_en_articulo(a.rep)
+    return a.rep if en_rep else a
+
+def _ai_input(n: dict) -> dict:
+    a = _articulo_para_ia(n)
+    return {
+        "id": n["id"],
+        "titulo": a.title if a is not None else n.get("titulo", ""),
+        "descripcion": a.desc_limpia if a is not None else strip_html(n.get("descripcion", "")),
+        "empresa": n.get("empresa", ""),
+        "industrias": n.get("industrias", []) or [],
+        "es_empresa": n.get("es_empresa", False),
+        "es_industria": n.get("es_industria", False),
+        "tipo": n.get("tipo", "empresa"),
+    }
+
+def _clasificar(noticias: list[dict]) -> dict[str, str]:
+    """
+    classify_batch sobre los ítems; ante falla total, todos 'SIN CLASIFICAR'. Lo que no
+    alcanza a clasificarse antes del plazo de clasificación también queda 'SIN CLASIFICAR'.
+    """
+    ai_inputs = [_ai_input(n) for n in noticias]
     try:
-        ai_results = classify_batch(ai_inputs)  # [{"id": ..., "categoria": ...}, ...]
+        ai_results = classify_batch(ai_inputs, deadline=_limite("clasificacion"))  # [{"id": ..., "categoria": ...}, ...]
     except Exception as e:
         print(f"[WARN] Falla en classify_batch: {e}. Se marcarán como 'SIN CLASIFICAR'.", flush=True)
         ai_results = [{"id": x["id"], "categoria": "SIN CLASIFICAR"} for x in ai_inputs]
-    klass_map = {r["id"]: (r.get("categoria") or "SIN CLASIFICAR").upper() for r in ai_results}
+    return {r["id"]: (r.get("categoria") or "SIN CLASIFICAR").upper() for r in ai_results}
+
+def _pipeline_streaming() -> tuple[list[dict], dict[str, str]]:
+    """
+    Modo streaming: los artículos que entrega execQuery pasan directo al matcher y
+    los ítems resultantes llenan lotes de clasificación que se despachan apenas se
+    completan. Fetch e IA se solapan; la memoria queda acotada por las colas
+    (no se retiene el corpus, solo los artículos con match).
+
+    Con RANKING_RELEVANCIA se despachan al llegar los primeros RANKING_TOP_K pares de
+    cada empresa; al terminar la descarga se rankea todo lo visto igual que en
+    obtener_noticias, se despachan los pares del top-K que faltaban y la salida queda
+    en ese orden (a lo más 2 × RANKING_TOP_K pares por empresa van a la IA). Sin ranking,
+    DOMAIN_LIMIT se aplica en orden de llegada. Un ítem cuyo (texto, objetivo) ya se
+    despachó por un casi-duplicado no se reenvía: copia la categoría.
+    """
+    bases = [_normalize_domain(h) for h in ER_SOURCES]
+    cola: queue.Queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    FIN = object()
+
+    uris, resuelto = {}, False
+    if ER_API_KEY:
+        cliente = _er_cliente_y_uris(bases)
+        if cliente is not None:
+            (_, uris), resuelto = cliente, True
+
+    def _productor(base: str):
+        # Cada productor usa el cliente ER de su hilo: el SDK serializa los requests por cliente
+        try:
+            if resuelto and not uris.get(base):
+                return  # error ya registrado al resolver el sourceUri
+            deadline = _antes(time.monotonic() + ER_HOST_TIMEOUT_S, _limite("fetch"))
+            with _cronometro(f"fetch_{base}"):
+                for a in _iter_er_articles_for_host(base, None, uris.get(base), deadline):
+                    cola.put(a)
+        finally:
+            cola.put(FIN)
+
+    for base in bases:
+        threading.Thread(target=_productor, args=(base,), name=f"er-stream-{base}", daemon=True).start()
+
+    empresa_idx = {e: i for i, e in enumerate(empresas, start=1)}
+    matcher = _alias_matcher()
+    item_seq: dict[str, int] = defaultdict(int)
+    n_pares: dict[str, int] = defaultdict(int)
+    por_par: dict[tuple[str, int], list[dict]] = {}  # (empresa, id(artículo)) -> ítems ya despachados
+    menciones_corpus = _MatrizMenciones()
+    noticias: list[dict] = []
+    lote: list[dict] = []
+    enviado: dict[tuple, str] = {}  # (texto que va a la IA, objetivo) -> id del ítem despachado
+    copias: dict[str, str] = {}     # id -> id del ítem con el mismo (texto, objetivo)
+    en_vuelo = threading.BoundedSemaphore(PIPELINE_MAX_INFLIGHT)
+    futuros = []
+    pool = ThreadPoolExecutor(max_workers=PIPELINE_MAX_INFLIGHT, thread_name_prefix="ia-stream")
+
+    def _despachar(items: list[dict]):
+        en_vuelo.acquire()  # backpressure: si la IA va atrasada, el consumo de artículos espera
+        f = pool.submit(_clasificar, items)
+        f.add_done_callback(lambda _: en_vuelo.release())
+        futuros.append(f)
+
+    def _encolar(items: list[dict]):
+        nonlocal lote
+        for it in items:
+            objetivo = it.get("industria") if it.get("tipo") == "industria" else it.get("empresa")
+            clave = (id(_articulo_para_ia(it)), it.get("tipo"), objetivo)
+            if clave in enviado:
+                copias[it["id"]] = enviado[clave]
+                continue
+            enviado[clave] = it["id"]
+            lote.append(it)
+        if len(lote) >= PIPELINE_BATCH:
+            _despachar(lote)
+            lote = []
+
+    vivos = len(bases)
+    while vivos:
+        a = cola.get()
+        if a is FIN:
+            vivos -= 1
+            continue
+        if not a.url or not _host_ok(a.url):
+            continue
+        _registrar_casi_duplicado(a)  # al llegar, antes del matching: representante = el primero del cluster
+        menciones = matcher.posiciones(a.texto_norm)
+        a.empresas = frozenset(menciones)
+        if not menciones:
+            continue
+        if RANKING_RELEVANCIA:
+            menciones_corpus.agregar(a.host, a, menciones)
+        for empresa in menciones:
+            if item_seq[empresa] >= DOMAIN_LIMIT or (RANKING_RELEVANCIA and n_pares[empresa] >= RANKING_TOP_K):
+                continue
+            n_pares[empresa] += 1
+            items, item_seq[empresa] = _items_para_match(empresa_idx[empresa], empresa, a, item_seq[empresa])
+            por_par[(empresa, id(a))] = items
+            if not RANKING_RELEVANCIA:
+                noticias.extend(items)
+            _encolar(items)
+
+    if RANKING_RELEVANCIA and len(menciones_corpus):
+        # Mismo top-K que obtener_noticias; lo ya despachado se reutiliza, lo demás se despacha ahora
+        with _cronometro("ranking"):
+            ranking = _rankear_matches(menciones_corpus)
+        tarde = 0
+        for empresa in empresas:
+            n_items = 0
+            for _, a in ranking.get(empresa, []):
+                if n_items >= DOMAIN_LIMIT:
+                    break
+                items = por_par.get((empresa, id(a)))
+                if items is None:
+                    items, item_seq[empresa] = _items_para_match(
+                        empresa_idx[empresa], empresa, a, item_seq[empresa],
+                        limite=item_seq[empresa] + DOMAIN_LIMIT - n_items,
+                    )
+                    tarde += 1
+                    _encolar(items)
+                items = items[:DOMAIN_LIMIT - n_items]
+                n_items += len(items)
+                noticias.extend(items)
+        RUN_STATS["counts"]["stream_pares_tardios"] = tarde
+    if lote:
+        _despachar(lote)
+
+    klass_map: dict[str, str] = {}
+    for f in futuros:
+        klass_map.update(f.result())
+    pool.shutdown(wait=True)
+    for copia, fuente in copias.items():
+        klass_map[copia] = klass_map.get(fuente, "SIN CLASIFICAR")
+    RUN_STATS["counts"]["stream_items_copiados"] = len(copias)
+    _cerrar_casi_duplicados()
+    return noticias, klass_map
+
+@dataclass(slots=True)
+class Envio:
+    """Un mensaje renderizado y sus destinatarios."""
+    destinatarios: list[str]
+    texto: str
+    html: str
+    adjuntos: list[tuple[str, bytes, str]] = field(default_factory=list)
+
+def _fila_grupo(g: dict) -> Fila:
+    etiquetas = {**g.get("industrias", {}), **g.get("empresas", {})}
+    fuente_txt = g.get("fuente", "")
+    if g.get("tambien_en"):
+        fuente_txt += f" (también en: {', '.join(g['tambien_en'])})"
+    return Fila(
+        categoria=max(etiquetas.values(), key=lambda c: CAT_RANK.get(c, -1), default="SIN CLASIFICAR"),
+        etiquetas=_format_tags(g.get("empresas", {}), g.get("industrias", {})),
+        titulo=g.get("titulo", ""),
+        url=g.get("url", ""),
+        fuente=fuente_txt,
+        fecha=_fecha_mas_relativa(g.get("dt") or g.get("fecha", "")) if g.get("fecha") else "(sin fecha)",
+        descripcion=(g.get("descripcion") or "").rstrip(" ."),
+    )
+
+def compilar_reporte(destinatarios: list[str] | None = None,
+                     suscripciones: list[Suscripcion] | None = None) -> list[Envio]:
+    """
+    Una descarga y una clasificación para todos; después un mensaje por suscriptor y
+    uno con el reporte completo para los destinatarios sin suscripción.
+    """
+    if PIPELINE_STREAMING:
+        print("📡🤖 Pipeline streaming: descarga, filtro y clasificación en paralelo...", flush=True)
+        with _cronometro("pipeline_streaming"):
+            noticias, klass_map = _pipeline_streaming()
+        print(f"✔ Noticias filtradas y clasificadas: {len(noticias)}", flush=True)
+    else:
+        print("📡 Descargando y filtrando noticias...", flush=True)
+        noticias = obtener_noticias()
+        print(f"✔ Noticias filtradas: {len(noticias)}", flush=True)
+
+        # Llamada a IA (respeta el switch en filtro_IA.py)
+        print("🤖 Clasificando con IA...", flush=True)
+        with _cronometro("clasificacion"):
+            klass_map = _clasificar(noticias)
+    for k, v in IA_STATS.items():
+        RUN_STATS["counts"][f"ia_{k}"] = v
+    if IA_STATS.get("plazo_sin_clasificar"):
+        _degradar("clasificacion", "clasificacion",
+                  f"Plazo de clasificación agotado: {IA_STATS['plazo_sin_clasificar']} ítems quedan SIN CLASIFICAR")
     print("✔ Clasificación lista.", flush=True)
 
     # 3) Eliminar NULA y agrupar por URL consolidando etiquetas
-    grupos = _group_and_collapse_by_url(noticias, klass_map)
+    with _cronometro("agrupacion"):
+        grupos = _group_and_collapse_by_url(noticias, klass_map)
+    RUN_STATS["counts"]["items"] = len(noticias)
+    RUN_STATS["counts"]["grupos"] = len(grupos)
+    t_render = time.perf_counter()
 
     if DEBUG_SUMMARY:
         by_src = defaultdict(int)
@@ -721,103 +1581,455 @@ def compilar_reporte():
             by_src[g["fuente"]] += 1
         print("[DEBUG] Conteo por fuente (agrupado por URL):", dict(by_src), flush=True)
 
-    # ===== HTML con estética mejorada (inline CSS para compatibilidad en email) =====
-    html_parts = []
-    html_parts.append("<html><body style='margin:0;padding:0;'>")
-    html_parts.append(
-        "<div style='background:#fafafa;padding:16px;font-family:Arial,Helvetica,sans-serif;color:#111;'>"
-        "<div style='max-width:860px;margin:0 auto;background:#ffffff;border:1px solid #eaeaea;border-radius:8px;padding:20px;'>"
-    )
-
+    # ===== Render por secciones con presupuesto de bytes (recorte de Gmail) =====
+    filas = [_fila_grupo(g) for g in grupos]
+    errores = [(base, msg) for base, errs in sorted(RUN_STATS["errors"].items()) for msg in sorted(errs)]
     titulo_encabezado = f"Reporte de Noticias (últimas {HOURS_BACK:.1f} hrs) { _fecha_larga_cl() }"
-    html_parts.append(
-        f"<h2 style='margin:0 0 16px 0;font-size:18px;line-height:1.3;font-weight:700;'>{html.escape(titulo_encabezado)}</h2>"
-    )
-
-    html_parts.append("<ul style='list-style:none;padding:0;margin:0;'>")
-
-    # Texto plano
-    texto_lines = []
-
-    for idx, g in enumerate(grupos, start=1):
-        fecha_mostrar = _fecha_mas_relativa(g.get("fecha", "")) if g.get("fecha") else "(sin fecha)"
-        desc_clean = (g.get("descripcion") or "").rstrip(" .")
-
-        # Empresa/Industria consolidado con categorías
-        ei_value = _format_tags(g.get("empresas", {}), g.get("industrias", {}))
-
-        # ---------- TEXTO PLANO ----------
-        if idx > 1:
-            texto_lines.append("")  # línea en blanco extra entre noticias
-        texto_lines.append(f"Empresa/Industria: {ei_value}")
-        texto_lines.append(f"Título: {g.get('titulo', '')}")
-        texto_lines.append(f"Fuente: {g.get('fuente', '')}")
-        texto_lines.append(f"Fecha: {fecha_mostrar}")
-        texto_lines.append(f"Descripción: {desc_clean}.")
-
-        # ---------- HTML ----------
-        li_border = "border-top:1px solid #eee;" if idx > 1 else ""
-        html_parts.append(
-            f"<li style='{li_border}padding:18px 0 20px 0;margin:0;'>"
-            f"<div style='font-size:16px;font-weight:700;margin:0 0 8px 0;'>"
-            f"Empresa/Industria: {html.escape(ei_value)}</div>"
-            f"<div style='margin:0 0 6px 0;'>"
-            f"<span style='font-weight:600;'>Título:</span> "
-            f"<a href='{html.escape(g.get('url',''))}' target='_blank' rel='noopener noreferrer' style='color:#1155cc;text-decoration:none;'>"
-            f"{html.escape(g.get('titulo',''))}</a></div>"
-            f"<div style='margin:0 0 4px 0;'><span style='font-weight:600;'>Fuente:</span> {html.escape(g.get('fuente',''))}</div>"
-            f"<div style='margin:0 0 6px 0;'><span style='font-weight:600;'>Fecha:</span> {html.escape(fecha_mostrar)}</div>"
-            f"<div style='margin:0 0 8px 0;'><span style='font-weight:600;'>Descripción:</span> {html.escape(desc_clean)}.</div>"
-            f"</li>"
-        )
-
-    html_parts.append("</ul>")
-
-    # Errores, si los hay
-    errores_existentes = {b: e for b, e in RUN_STATS["errors"].items() if e}
-    if errores_existentes:
-        html_parts.append(
-            "<hr style='border:none;border-top:1px solid #eee;margin:20px 0;'>"
-            "<h3 style='font-size:16px;margin:0 0 10px 0;'>⚠️ Errores durante la corrida</h3>"
-            "<ul style='padding-left:18px;margin:0;'>"
-        )
-        for base, errs in sorted(errores_existentes.items()):
-            for msg in sorted(errs):
-                html_parts.append(f"<li style='margin:4px 0;'>{html.escape(base)}: {html.escape(msg)}</li>")
-        html_parts.append("</ul>")
-
-    html_parts.append("</div></div></body></html>")
 
-    return "\n".join(texto_lines), "".join(html_parts)
+    def _render(para: list[str], filas_envio: list[Fila]) -> Envio:
+        digest = render_digest(filas_envio, titulo_encabezado, errores, MAIL_MAX_BYTES)
+        if digest.adjuntos:
+            print(f"✂️ Correo sobre {MAIL_MAX_BYTES} bytes: {digest.stats['omitidas']} noticias solo en el adjunto.", flush=True)
+        for k, v in digest.stats.items():
+            RUN_STATS["counts"][f"render_{k}"] += v
+        return Envio(para, digest.texto, digest.html, digest.adjuntos)
+
+    # Sin suscripción = reporte completo (un solo mensaje para todos ellos)
+    suscripciones = suscripciones or []
+    con_suscripcion = {s.email.lower() for s in suscripciones}
+    generales = [d for d in (destinatarios or []) if d.lower() not in con_suscripcion]
+    envios = []
+    if generales or not suscripciones:
+        envios.append(_render(generales, filas))
+    if suscripciones:
+        # Índice invertido entidad → grupos, armado una vez; cada suscriptor lee solo sus listas
+        indice = IndiceGrupos(grupos)
+        for sus in suscripciones:
+            sel = indice.seleccionar(sus)
+            propias = [filas[i] if filas[i].categoria == cat else replace(filas[i], categoria=cat) for i, cat in sel]
+            RUN_STATS["counts"]["suscripcion_grupos"] += len(propias)
+            envios.append(_render([sus.email], propias))
+    RUN_STATS["counts"]["envios"] = len(envios)
+
+    RUN_STATS["timings"]["render"] += time.perf_counter() - t_render
+    return envios
 
 # ===================== ENVIAR MAIL =====================
-def enviar_mail(texto, cuerpo_html, remitente, destinatarios: list[str], password):
-    msg = MIMEMultipart("alternative")
+def _armar_mensaje(texto, cuerpo_html, remitente, destinatarios: list[str],
+                   adjuntos: list[tuple[str, bytes, str]] | None = None) -> MIMEMultipart:
+    cuerpo = MIMEMultipart("alternative")
+    cuerpo.attach(MIMEText(texto, "plain", "utf-8"))
+    cuerpo.attach(MIMEText(cuerpo_html, "html", "utf-8"))
+    if adjuntos:
+        # mixed = [alternative (texto/html), adjunto, adjunto, ...]
+        msg = MIMEMultipart("mixed")
+        msg.attach(cuerpo)
+        for nombre, contenido, mime in adjuntos:
+            parte = MIMEBase(*mime.split("/", 1))
+            parte.set_payload(contenido)
+            encoders.encode_base64(parte)
+            parte.add_header("Content-Disposition", "attachment", filename=nombre)
+            msg.attach(parte)
+    else:
+        msg = cuerpo
     msg["Subject"] = _subject_for_today("Reporte de Noticias")
     msg["From"] = remitente
     msg["To"] = ", ".join(destinatarios)
-    msg.attach(MIMEText(texto, "plain", "utf-8"))
-    msg.attach(MIMEText(cuerpo_html, "html", "utf-8"))
+    return msg
 
-    # SMTP seguro (SSL 465). Si prefieres STARTTLS: usa puerto 587 y server.starttls()
-    with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-        server.login(remitente, password)
-        server.sendmail(remitente, destinatarios, msg.as_string())
+def _nueva_entrega(remitente: str, password: str) -> EntregaCorreo:
+    return EntregaCorreo(SMTP_HOST, SMTP_PORT, remitente, password, seguridad=SMTP_SEGURIDAD,
+                         reintentos=SMTP_REINTENTOS, backoff_s=SMTP_BACKOFF_S, spool_dir=MAIL_SPOOL_DIR)
+
+def enviar_mail(texto, cuerpo_html, remitente, destinatarios: list[str], password,
+                adjuntos: list[tuple[str, bytes, str]] | None = None, entrega: EntregaCorreo | None = None,
+                deadline: float | None = None, ventana: str = ""):
+    """
+    Envía el reporte; sin `entrega` abre (y cierra) una conexión solo para este mensaje.
+    `deadline` (time.monotonic): no se reintenta más allá (el mensaje queda en el spool).
+    `ventana`: una sola entrada de spool por ventana y destinatarios.
+    """
+    msg = _armar_mensaje(texto, cuerpo_html, remitente, destinatarios, adjuntos)
+    if entrega is None:
+        with _nueva_entrega(remitente, password) as e:
+            e.enviar(remitente, destinatarios, msg.as_string(), deadline, ventana)
+    else:
+        entrega.enviar(remitente, destinatarios, msg.as_string(), deadline, ventana)
     print("📨 Correo enviado con éxito", flush=True)
 
-# ===================== MAIN =====================
-def run_once():
-    # Ajusta la ventana según hora de Chile
-    global HOURS_BACK
-    HOURS_BACK = _compute_hours_back(datetime.now(CL_TZ))
-    print(f"⏱️ Ventana dinámica seleccionada: últimas {HOURS_BACK:.1f} horas (CLT).", flush=True)
+# ===================== REPORTE DE LA CORRIDA =====================
+def _resumen_lotes_ia(lotes: list[dict]) -> dict:
+    """Latencia por request a OpenAI: n, p50, p95, máx y suma (segundos)."""
+    if not lotes:
+        return {"n": 0}
+    segs = sorted(l["segundos"] for l in lotes)
+    pct = lambda p: segs[min(len(segs) - 1, int(p * len(segs)))]
+    return {"n": len(segs), "p50_s": pct(0.5), "p95_s": pct(0.95), "max_s": segs[-1],
+            "total_s": round(sum(segs), 3)}
+
+def _tasa_colapso_url() -> float:
+    """Fracción de URLs descargadas que eran variantes (amp/www/query/...) de una nota ya vista."""
+    c = RUN_STATS["counts"]
+    variantes = sum(v for k, v in c.items() if k.startswith("url_variantes_"))
+    conservados = sum(v for k, v in c.items() if k.startswith("er_conservados_"))
+    total = variantes + conservados
+    return round(variantes / total, 4) if total else 0.0
+
+def _volcar_perfil(perfil: cProfile.Profile) -> dict:
+    """Guarda el .pstats (si hay ruta) y devuelve el top por tiempo acumulado."""
+    out: dict = {}
+    if RUN_PROFILE_PATH:
+        try:
+            d = os.path.dirname(RUN_PROFILE_PATH)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            perfil.dump_stats(RUN_PROFILE_PATH)
+            out["archivo"] = RUN_PROFILE_PATH
+        except Exception as e:
+            print(f"[WARN] No se pudo guardar el perfil: {e}", flush=True)
+    buf = io.StringIO()
+    pstats.Stats(perfil, stream=buf).sort_stats("cumulative").print_stats(25)
+    out["top_acumulado"] = [l for l in buf.getvalue().splitlines() if l.strip()]
+    return out
+
+def _volcar_tracemalloc() -> dict:
+    actual, peak = tracemalloc.get_traced_memory()
+    top = tracemalloc.take_snapshot().statistics("lineno")[:15]
+    tracemalloc.stop()
+    return {"actual_mb": round(actual / 1e6, 2), "peak_mb": round(peak / 1e6, 2),
+            "top_asignaciones": [str(st) for st in top]}
+
+def _escribir_reporte_corrida(extra: dict) -> None:
+    """JSON de la corrida: tiempos por etapa, conteos (ER, IA, ítems), lotes de IA y errores."""
+    tiempos = {k: round(v, 3) for k, v in sorted(RUN_STATS["timings"].items())}
+    if DEBUG_SUMMARY:
+        print("[DEBUG] Tiempos por etapa (s):", tiempos, flush=True)
+    if not RUN_REPORT_PATH:
+        return
+    reporte = {
+        **extra,
+        "hours_back": HOURS_BACK,
+        "modo": "streaming" if PIPELINE_STREAMING else "lotes",
+        "tiempos_s": tiempos,
+        "conteos": dict(sorted(RUN_STATS["counts"].items())),
+        "tasa_colapso_url": _tasa_colapso_url(),
+        "ia_lotes": {**_resumen_lotes_ia(IA_LOTES), "detalle": list(IA_LOTES)},
+        "preclasificador_sombra": resumen_sombra(IA_STATS),
+        "errores": {b: sorted(e) for b, e in sorted(RUN_STATS["errors"].items()) if e},
+    }
+    try:
+        d = os.path.dirname(RUN_REPORT_PATH)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        with open(RUN_REPORT_PATH, "w", encoding="utf-8") as fh:
+            json.dump(reporte, fh, ensure_ascii=False, indent=2)
+    except Exception as e:
+        print(f"[WARN] No se pudo escribir el reporte de la corrida: {e}", flush=True)
+
+# ===================== MOTOR =====================
+class FaltaConfiguracion(RuntimeError):
+    """Falta una credencial o dato de configuración que la etapa necesita."""
 
-    # Limpia cachés por si corres muchas veces seguidas
-    _ER_ARTICLES_CACHE_BY_HOST.clear()
+def _cargar_suscripciones() -> list[Suscripcion]:
+    """
+    SUSCRIPCIONES validadas. Una empresa se puede nombrar por su nombre o por cualquiera de
+    sus alias ("CAP" → "CAP S.A."); avisa de nombres que no están en `empresas` / INDUSTRIA_KEYWORDS.
+    """
+    try:
+        subs = cargar_suscripciones(SUSCRIPCIONES)
+    except (OSError, ValueError) as e:
+        raise FaltaConfiguracion(f"SUSCRIPCIONES inválidas: {e}") from e
+    clave = lambda s: " ".join(normalizar_texto(s).split())
+    canon = {"empresas": {}, "industrias": {clave(i): clave(i) for i in INDUSTRIA_KEYWORDS}}
+    for e in empresas:
+        for nombre in [e] + EMPRESA_ALIASES.get(e, []):
+            canon["empresas"].setdefault(clave(nombre), clave(e))
+    out = []
+    for sus in subs:
+        resueltas = {}
+        for campo in ("empresas", "industrias"):
+            resueltas[campo] = set()
+            for nombre in sorted(getattr(sus, campo)):
+                if nombre == "*" or nombre in canon[campo]:
+                    resueltas[campo].add(canon[campo].get(nombre, nombre))
+                else:
+                    print(f"[WARN] Suscripción de {sus.email}: '{nombre}' no está en {campo}; no recibirá nada por ella.", flush=True)
+        out.append(replace(sus, empresas=frozenset(resueltas["empresas"]), industrias=frozenset(resueltas["industrias"])))
+    return out
+
+class MotorNoticias:
+    """
+    Pipeline completo como objeto importable (importar solo_apis no tiene efectos):
+    matchers compilados una vez, clientes ER/OpenAI perezosos y reutilizados entre
+    corridas, y credenciales verificadas por la etapa que las usa
+    (ER al descargar, OpenAI al clasificar, correo al enviar).
+    """
+
+    def __init__(self, remitente: str | None = None, destinatarios: list[str] | None = None,
+                 password: str | None = None, suscripciones: list[Suscripcion] | None = None):
+        self.remitente = REMITENTE if remitente is None else remitente
+        self.destinatarios = list(RECIPIENTS if destinatarios is None else destinatarios)
+        self.password = APP_PASSWORD if password is None else password
+        self.suscripciones = _cargar_suscripciones() if suscripciones is None else list(suscripciones)
+        self.corridas = 0
+        self.ventana = ""  # clave 'YYYY-MM-DD-am|pm' de la corrida en curso (nombra el spool)
+        self._entrega: EntregaCorreo | None = None
+
+    def calentar(self) -> None:
+        """Carga (o compila) los matchers de alias e industrias (idempotente)."""
+        try:
+            _alias_matcher()
+            _industria_matchers()
+        except ValueError as e:
+            raise FaltaConfiguracion(f"{WATCHLIST_PATH}: {e}") from e
+
+    def verificar_correo(self) -> None:
+        if not self.remitente or not self.password or not (self.destinatarios or self.suscripciones):
+            raise FaltaConfiguracion(
+                "Faltan REMITENTE, APP_PASSWORD o DESTINATARIO/DESTINATARIO2/SUSCRIPCIONES. Configúralos como Secrets en GitHub."
+            )
+
+    def entrega(self) -> EntregaCorreo:
+        """Componente SMTP del motor: una conexión autenticada reutilizada entre mensajes y corridas."""
+        if self._entrega is None:
+            self._entrega = _nueva_entrega(self.remitente, self.password)
+        return self._entrega
+
+    def pendientes(self, ventana: str) -> list[str]:
+        """Mensajes de `ventana` que siguen en el spool (renderizados, sin entregar)."""
+        return self.entrega().pendientes(ventana)
+
+    def reenviar_pendientes(self) -> list[str]:
+        """Reenvía los reportes que quedaron en el spool (sin recalcular). Devuelve las rutas entregadas."""
+        self.verificar_correo()
+        entregados = self.entrega().reenviar_pendientes(MAIL_SPOOL_MAX_H * 3600)
+        if entregados:
+            print(f"📨 {len(entregados)} correo(s) reenviado(s) desde el spool", flush=True)
+        return entregados
+
+    def cerrar(self) -> None:
+        if self._entrega is not None:
+            self._entrega.cerrar()
+
+    def preparar_corrida(self, ahora_cl: datetime | None = None) -> None:
+        """Ventana dinámica según hora de Chile, plazos por etapa y estado por corrida en limpio."""
+        global HOURS_BACK, _INDICE_DUP, _PLAZOS
+        ahora_cl = ahora_cl or datetime.now(CL_TZ)
+        HOURS_BACK = _compute_hours_back(ahora_cl)
+        # Fuera de horario (corrida manual) la ventana es la del día y media jornada, como en el workflow
+        self.ventana = _ventana_actual(ahora_cl) or f"{ahora_cl:%Y-%m-%d}-{'am' if ahora_cl.hour < 12 else 'pm'}"
+        print(f"⏱️ Ventana dinámica seleccionada: últimas {HOURS_BACK:.1f} horas (CLT).", flush=True)
+        _PLAZOS = PlanPlazos(_plazo_corrida_s(ahora_cl), RUN_PLAZO_FRACCIONES) if RUN_PLAZO_MAX_S > 0 else None
+        if _PLAZOS is not None:
+            lim = _PLAZOS.resumen()["limites_s"]
+            print(f"⏳ Plazo de la corrida: {_PLAZOS.total_s:.0f}s (descarga hasta +{lim['fetch']:.0f}s, "
+                  f"clasificación hasta +{lim['clasificacion']:.0f}s).", flush=True)
+
+        # Limpia cachés por corrida (los clientes, matchers y almacenes persistentes se conservan)
+        _ER_ARTICLES_CACHE_BY_HOST.clear()
+        _INDICE_DUP = None
+        IA_STATS.clear()
+        IA_LOTES.clear()
+        RUN_STATS["counts"].clear()
+        RUN_STATS["timings"].clear()
+        RUN_STATS["errors"].clear()
+        if self._entrega is not None:
+            self._entrega.stats.clear()
+
+    def compilar(self) -> list[Envio]:
+        self.calentar()
+        return compilar_reporte(self.destinatarios, self.suscripciones)
+
+    def enviar(self, envios: list[Envio]) -> None:
+        """Envía todos los mensajes por la misma conexión; si alguno falla, sigue con el resto y al final levanta."""
+        self.verificar_correo()
+        entrega = self.entrega()
+        fallas = []
+        with _cronometro("smtp"):
+            for env in envios:
+                if not env.destinatarios:
+                    continue
+                try:
+                    enviar_mail(env.texto, env.html, self.remitente, env.destinatarios, self.password,
+                                env.adjuntos, entrega=entrega, deadline=_limite("entrega"), ventana=self.ventana)
+                except Exception as e:
+                    RUN_STATS["errors"]["smtp"].add(f"{', '.join(env.destinatarios)}: {type(e).__name__}: {e}")
+                    fallas.append(e)
+        for k, v in entrega.stats.items():
+            RUN_STATS["counts"][f"smtp_{k}"] = v
+        if entrega.stats.get("sin_plazo"):
+            _degradar("entrega", "smtp", f"Plazo de entrega agotado: {entrega.stats['sin_plazo']} mensaje(s) quedan en el spool")
+        if fallas:
+            raise fallas[0]
+
+    def correr(self, enviar: bool = True, ahora_cl: datetime | None = None) -> list[Envio]:
+        """Una corrida completa (instrumentada). Devuelve los mensajes renderizados."""
+        global _PLAZOS
+        if enviar:
+            self.verificar_correo()  # sin destinatarios no gastamos cuota de ER ni de OpenAI
+        self.preparar_corrida(ahora_cl)
+
+        extra = {"inicio": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")}
+        # cProfile solo ve el hilo principal; los fetch/IA en hilos aparecen como esperas
+        perfil = cProfile.Profile() if RUN_PROFILE else None
+        if RUN_TRACEMALLOC:
+            tracemalloc.start()
+        t0 = time.perf_counter()
+        if perfil:
+            perfil.enable()
+        try:
+            envios = self.compilar()
+            if enviar:
+                self.enviar(envios)
+        finally:
+            if perfil:
+                perfil.disable()
+            RUN_STATS["timings"]["total"] = time.perf_counter() - t0
+            if perfil:
+                extra["perfil"] = _volcar_perfil(perfil)
+            if RUN_TRACEMALLOC:
+                extra["memoria"] = _volcar_tracemalloc()
+            if _PLAZOS is not None:
+                extra["plazos"] = _PLAZOS.resumen()
+            _escribir_reporte_corrida(extra)
+            _PLAZOS = None
+        self.corridas += 1
+        return envios
+
+_MOTOR: MotorNoticias | None = None
+
+def motor() -> MotorNoticias:
+    """Motor por defecto del proceso (configurado desde el entorno)."""
+    global _MOTOR
+    if _MOTOR is None:
+        _MOTOR = MotorNoticias()
+    return _MOTOR
+
+# ===================== DAEMON =====================
+def _ventana_actual(ahora_cl: datetime) -> str | None:
+    """Clave 'YYYY-MM-DD-am|pm' si `ahora_cl` cae en algún horario ±tolerancia; si no, None."""
+    for h, m, tag in DAEMON_SLOTS_CL:
+        objetivo = ahora_cl.replace(hour=h, minute=m, second=0, microsecond=0)
+        if abs((ahora_cl - objetivo).total_seconds()) <= DAEMON_TOLERANCIA_MIN * 60:
+            return f"{objetivo:%Y-%m-%d}-{tag}"
+    return None
+
+def _plazo_corrida_s(ahora_cl: datetime) -> float:
+    """
+    Segundos para la corrida: hasta el cierre de la ventana en curso menos RUN_PLAZO_MARGEN_S,
+    con tope RUN_PLAZO_MAX_S (también el plazo fuera de ventana, p. ej. manual) y piso RUN_PLAZO_MIN_S.
+    """
+    plazo = RUN_PLAZO_MAX_S
+    for h, m, _ in DAEMON_SLOTS_CL:
+        objetivo = ahora_cl.replace(hour=h, minute=m, second=0, microsecond=0)
+        if abs((ahora_cl - objetivo).total_seconds()) <= DAEMON_TOLERANCIA_MIN * 60:
+            cierre = objetivo + timedelta(minutes=DAEMON_TOLERANCIA_MIN)
+            plazo = min(plazo, (cierre - ahora_cl).total_seconds() - RUN_PLAZO_MARGEN_S)
+    return max(RUN_PLAZO_MIN_S, plazo)
+
+def _ventanas_enviadas() -> list[str]:
+    """Ventanas ya enviadas según el marcador en disco (sobrevive reinicios del daemon)."""
+    if not SENT_MARKER_PATH:
+        return []
+    try:
+        with open(SENT_MARKER_PATH, encoding="utf-8") as fh:
+            data = json.load(fh)
+        return [str(x) for x in data] if isinstance(data, list) else []
+    except FileNotFoundError:
+        return []
+    except Exception as e:
+        print(f"[WARN] Marcador de envíos ilegible ({SENT_MARKER_PATH}): {e}", flush=True)
+        return []
+
+def _marcar_ventana_enviada(clave: str) -> None:
+    if not SENT_MARKER_PATH:
+        return
+    claves = [c for c in _ventanas_enviadas() if c != clave] + [clave]
+    d = os.path.dirname(SENT_MARKER_PATH)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    tmp = SENT_MARKER_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(claves[-SENT_MARKER_MAX:], fh)
+    os.replace(tmp, SENT_MARKER_PATH)  # escritura atómica
+
+def correr_daemon(m: MotorNoticias | None = None) -> None:
+    """
+    Proceso de larga vida: despierta cada DAEMON_POLL_S y corre una vez por ventana
+    (07:30 / 17:30 CL ±30 min). Matchers, clientes ER/OpenAI y almacenes quedan
+    calientes entre corridas. SIGTERM/SIGINT terminan el ciclo limpiamente.
+    """
+    m = m or motor()
+    m.verificar_correo()
+    m.calentar()
+    parar = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: parar.set())
+
+    horarios = ", ".join(f"{h:02d}:{mi:02d}" for h, mi, _ in DAEMON_SLOTS_CL)
+    print(f"🕰️ Modo daemon: envíos a las {horarios} (CL) ±{DAEMON_TOLERANCIA_MIN} min.", flush=True)
+    while not parar.is_set():
+        ahora = datetime.now(CL_TZ)
+        clave = _ventana_actual(ahora)
+        espera = DAEMON_POLL_S
+        if clave and clave not in _ventanas_enviadas():
+            try:
+                # Si el envío de esta ventana falló, el reporte quedó en el spool: se reenvía sin
+                # recalcular. Mientras quede algo de la ventana en el spool no se vuelve a correr
+                # (cada corrida dejaría otra copia y al volver el SMTP llegarían todas).
+                habia = m.pendientes(clave)
+                entregados = set(m.reenviar_pendientes())
+                quedan = m.pendientes(clave)
+                if quedan:
+                    raise RuntimeError(f"{len(quedan)} mensaje(s) de la ventana siguen en el spool")
+                # La ventana solo queda enviada con una entrega confirmada: si el spool descartó
+                # algo de ella (ilegible, vencido, falla permanente) se vuelve a correr
+                if not habia or not entregados.issuperset(habia):
+                    m.correr(ahora_cl=ahora)
+            except FaltaConfiguracion:
+                raise
+            except Exception as e:
+                print(f"[WARN] Corrida de la ventana {clave} falló: {e}. Reintento en {DAEMON_REINTENTO_S}s.", flush=True)
+                espera = DAEMON_REINTENTO_S
+            else:
+                try:
+                    _marcar_ventana_enviada(clave)
+                except Exception as e:
+                    print(f"[WARN] No se pudo guardar el marcador de envíos: {e}", flush=True)
+                print(f"✔ Ventana {clave} enviada.", flush=True)
+        parar.wait(espera)
+    m.cerrar()
+    print("🛑 Daemon detenido.", flush=True)
 
-    texto, html_body = compilar_reporte()
-    enviar_mail(texto, html_body, REMITENTE, RECIPIENTS, APP_PASSWORD)
+# ===================== MAIN =====================
+def run_once():
+    try:
+        motor().correr()
+    finally:
+        motor().cerrar()
 
 if __name__ == "__main__":
-    # Ejecuta una corrida única. (El agendamiento real lo hace GitHub Actions)
-    run_once()
\ No newline at end of file
+    # Corrida única (el agendamiento lo hace GitHub Actions) o daemon con agenda propia
+    ap = argparse.ArgumentParser(description="Reporte de noticias por correo")
+    ap.add_argument("--daemon", action="store_true",
+                    help="proceso de larga vida que envía en cada ventana 07:30/17:30 CL (±30 min)")
+    ap.add_argument("--reenviar", action="store_true",
+                    help="solo reenvía los reportes que quedaron en el spool tras un envío fallido")
+    ap.add_argument("--compilar-watchlist", action="store_true",
+                    help="valida watchlist.json y deja el artefacto de matchers listo en MATCHER_CACHE_DIR")
+    args = ap.parse_args()
+    try:
+        if args.compilar_watchlist:
+            motor().calentar()
+            print(f"✔ Watchlist válida: {len(empresas)} empresas, {len(INDUSTRIA_KEYWORDS)} industrias "
+                  f"(huella {huella(_watchlist_actual())[:16]}).", flush=True)
+        elif args.daemon:
+            correr_daemon()
+        elif args.reenviar:
+            motor().reenviar_pendientes()
+            motor().cerrar()
+        else:
+            run_once()
+    except FaltaConfiguracion as e:
+        print(e)
+        sys.exit(1)
@@ -0,0 +1,102 @@
+# suscripciones_noticias.py
+import json
+import unicodedata
+from dataclasses import dataclass
+
+# Suscripciones por destinatario: cada analista recibe solo sus empresas / industrias
+# desde una categoría mínima. Los grupos de la corrida (salida de
+# _group_and_collapse_by_url) se indexan UNA vez en un índice invertido
+# (entidad → grupos con su categoría); cada destinatario se resuelve leyendo solo las
+# listas de sus entidades, así N destinatarios cuestan ~O(grupos + salida) y no N
+# re-filtrados completos.
+
+RANGO = {"ALTA": 3, "MEDIA": 2, "BAJA": 1, "SIN CLASIFICAR": 0}
+TODAS = "*"
+
+def _clave(s: str) -> str:
+    s = unicodedata.normalize("NFKD", s or "").encode("ascii", "ignore").decode("ascii")
+    return " ".join(s.lower().split())
+
+@dataclass(slots=True)
+class Suscripcion:
+    email: str
+    empresas: frozenset[str]    # claves normalizadas; {"*"} = todas
+    industrias: frozenset[str]
+    min_categoria: str = "SIN CLASIFICAR"
+
+    @classmethod
+    def desde_dict(cls, d: dict) -> "Suscripcion":
+        """
+        {"email": ..., "empresas": [...] | "*", "industrias": [...] | "*", "min_categoria": "MEDIA"}.
+        Sin "empresas" ni "industrias" = todas (solo filtra por categoría); si viene una sola,
+        la otra queda vacía.
+        """
+        email = (d.get("email") or "").strip()
+        if not email:
+            raise ValueError(f"suscripción sin email: {d!r}")
+        cat = (d.get("min_categoria") or "SIN CLASIFICAR").strip().upper()
+        if cat not in RANGO:
+            raise ValueError(f"min_categoria inválida para {email}: {cat!r} (usa {', '.join(RANGO)})")
+        sin_listas = "empresas" not in d and "industrias" not in d
+
+        def _lista(k: str) -> frozenset[str]:
+            v = TODAS if sin_listas else d.get(k, [])
+            if v == TODAS:
+                return frozenset({TODAS})
+            if isinstance(v, str):
+                v = [v]
+            return frozenset(c for c in map(_clave, v) if c)
+        return cls(email=email, empresas=_lista("empresas"), industrias=_lista("industrias"), min_categoria=cat)
+
+def cargar_suscripciones(fuente: str) -> list[Suscripcion]:
+    """`fuente`: JSON inline (lista) o ruta a un archivo JSON; vacío = sin suscripciones."""
+    fuente = (fuente or "").strip()
+    if not fuente:
+        return []
+    if fuente.startswith("["):
+        data = json.loads(fuente)
+    else:
+        with open(fuente, encoding="utf-8") as fh:
+            data = json.load(fh)
+    if not isinstance(data, list):
+        raise ValueError("las suscripciones deben ser una lista JSON")
+    subs = [Suscripcion.desde_dict(d) for d in data]
+    vistos: set[str] = set()
+    for s in subs:
+        if s.email.lower() in vistos:
+            raise ValueError(f"suscripción duplicada para {s.email}")
+        vistos.add(s.email.lower())
+    return subs
+
+class IndiceGrupos:
+    """
+    Índice invertido (tipo, entidad) → [(posición del grupo, rango de su categoría)].
+    Para "*" se indexa por tipo con el mejor rango del grupo en ese tipo.
+    """
+
+    def __init__(self, grupos: list[dict]):
+        self._post: dict[tuple[str, str], list[tuple[int, int]]] = {}
+        for i, g in enumerate(grupos):
+            for tipo, campo in (("empresa", "empresas"), ("industria", "industrias")):
+                ents = g.get(campo) or {}
+                if not ents:
+                    continue
+                mejor = 0
+                for nombre, cat in ents.items():
+                    r = RANGO.get(cat, 0)
+                    self._post.setdefault((tipo, _clave(nombre)), []).append((i, r))
+                    mejor = max(mejor, r)
+                self._post.setdefault((tipo, TODAS), []).append((i, mejor))
+
+    def seleccionar(self, s: Suscripcion) -> list[tuple[int, str]]:
+        """(posición, mejor categoría para este suscriptor) en el orden original de los grupos."""
+        minimo = RANGO[s.min_categoria]
+        mejor: dict[int, int] = {}
+        for tipo, ents in (("empresa", s.empresas), ("industria", s.industrias)):
+            claves = [TODAS] if TODAS in ents else ents
+            for e in claves:
+                for i, r in self._post.get((tipo, e), ()):
+                    if r >= minimo and r > mejor.get(i, -1):
+                        mejor[i] = r
+        nombres = {r: c for c, r in RANGO.items()}
+        return [(i, nombres[mejor[i]]) for i in sorted(mejor)]
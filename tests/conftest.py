@@ -0,0 +1,13 @@
+# tests/conftest.py
+import os
+import sys
+
+# Los módulos viven en la raíz del repo (sin paquete) y leen su configuración del entorno
+# al importarse: se fija antes de cualquier import para que los tests no escriban en
+# .news-cache ni salgan a la red.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+for _var in ("ARTICLE_STORE_PATH", "IA_CACHE_PATH", "IA_PRE_PATH", "MATCHER_CACHE_DIR", "MAIL_SPOOL_DIR",
+             "SENT_MARKER_PATH", "RUN_REPORT_PATH", "RUN_PROFILE_PATH", "ER_API_KEY", "OPENAI_API_KEY"):
+    os.environ[_var] = ""
+os.environ["IA_PRECLASIFICADOR"] = "0"
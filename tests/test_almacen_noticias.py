@@ -0,0 +1,80 @@
+# tests/test_almacen_noticias.py
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import solo_apis
+from almacen_noticias import AlmacenArticulos
+
+AHORA = datetime(2026, 10, 18, 12, 0, tzinfo=timezone.utc)
+INICIO = AHORA - timedelta(hours=6)  # inicio de la ventana de la corrida
+HOST = "df.cl"
+
+def _articulo(url: str, horas_atras: float) -> solo_apis.Articulo:
+    pub = AHORA - timedelta(hours=horas_atras)
+    return solo_apis.Articulo.crear(title=f"Nota {url}", description="cuerpo", url=url, host=HOST,
+                                    published=pub, publishedAt=pub.strftime("%Y-%m-%dT%H:%M:%SZ"))
+
+@pytest.fixture
+def store(tmp_path):
+    s = AlmacenArticulos(str(tmp_path / "articulos.sqlite"))
+    yield s
+    s.close()
+
+def _cerrar(store, nuevos, cobertura_previa, completo=True):
+    max_pub = max((a.published for a in nuevos), default=None)
+    entregados = {a.url_key for a in nuevos}
+    return solo_apis._cerrar_almacen(store, HOST, list(nuevos), INICIO, AHORA, cobertura_previa,
+                                     completo, max_pub, entregados)
+
+def test_guardar_y_ventana(store):
+    store.guardar(HOST, [
+        {"url_key": "a", "url": "https://df.cl/a", "title": "A", "description": "", "published": AHORA - timedelta(hours=1)},
+        {"url_key": "b", "url": "https://df.cl/b", "title": "B", "description": "", "published": AHORA - timedelta(hours=9)},
+        {"url_key": "c", "url": "https://df.cl/c", "title": "C", "description": "", "published": None},
+    ])
+    assert [f["title"] for f in store.ventana(HOST, INICIO, AHORA)] == ["A"]
+    assert store.ventana("emol.com", INICIO, AHORA) == []
+
+def test_purgar_ajusta_cobertura(store):
+    store.guardar(HOST, [{"url_key": "b", "url": "https://df.cl/b", "title": "B", "description": "",
+                          "published": AHORA - timedelta(hours=30)}])
+    store.actualizar_cobertura(HOST, AHORA - timedelta(hours=40), AHORA - timedelta(hours=2))
+    assert store.purgar(AHORA - timedelta(hours=24)) == 1
+    assert store.cobertura(HOST) == (AHORA - timedelta(hours=24), AHORA - timedelta(hours=2))
+
+def test_cobertura_contigua_se_extiende(store):
+    previa = (AHORA - timedelta(hours=30), AHORA - timedelta(hours=4))
+    store.actualizar_cobertura(HOST, *previa)
+    _cerrar(store, [_articulo("https://df.cl/nueva", 1)], previa)
+    assert store.cobertura(HOST) == (previa[0], AHORA - timedelta(hours=1))
+
+def test_cobertura_contigua_sin_nuevos_conserva_hwm(store):
+    previa = (AHORA - timedelta(hours=30), AHORA - timedelta(hours=4))
+    store.actualizar_cobertura(HOST, *previa)
+    _cerrar(store, [], previa)
+    assert store.cobertura(HOST) == previa
+
+def test_cobertura_con_hueco_parte_en_el_inicio_de_la_ventana(store):
+    # El HWM previo (hace 20 h) no alcanza el inicio de la ventana (hace 6 h): esta corrida
+    # no bajó (hwm, inicio), así que la cobertura no puede seguir declarando desde hace 30 h.
+    previa = (AHORA - timedelta(hours=30), AHORA - timedelta(hours=20))
+    store.actualizar_cobertura(HOST, *previa)
+    _cerrar(store, [_articulo("https://df.cl/nueva", 1)], previa)
+    assert store.cobertura(HOST) == (INICIO, AHORA - timedelta(hours=1))
+
+def test_paginado_incompleto_no_mueve_cobertura(store):
+    previa = (AHORA - timedelta(hours=30), AHORA - timedelta(hours=4))
+    store.actualizar_cobertura(HOST, *previa)
+    _cerrar(store, [_articulo("https://df.cl/nueva", 1)], previa, completo=False)
+    assert store.cobertura(HOST) == previa
+
+def test_devuelve_solo_lo_que_viene_del_almacen(store):
+    previa = (AHORA - timedelta(hours=30), AHORA - timedelta(hours=4))
+    store.actualizar_cobertura(HOST, *previa)
+    viejo = _articulo("https://df.cl/guardada", 5)
+    solo_apis._guardar_almacen(store, HOST, [viejo])
+    nuevo = _articulo("https://www.df.cl/nueva?utm_source=x", 1)
+    out = _cerrar(store, [nuevo], previa)
+    assert [a.url_key for a in out] == [viejo.url_key]
+    assert len(store.ventana(HOST, INICIO, AHORA)) == 2  # la nueva también quedó guardada
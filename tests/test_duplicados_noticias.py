@@ -0,0 +1,76 @@
+# tests/test_duplicados_noticias.py
+import random
+
+from duplicados_noticias import IndiceDuplicados
+
+# Las firmas usan hash() de str (con semilla por proceso): los textos se arman con un
+# vocabulario grande para que las similitudes queden lejos del umbral y el resultado no
+# dependa de la semilla.
+
+def _texto(rng: random.Random, n: int = 200) -> str:
+    return " ".join(f"w{rng.randrange(100_000)}" for _ in range(n))
+
+def _variante(texto: str, rng: random.Random, cambios: int = 1) -> str:
+    """La misma nota con un par de palabras cambiadas (otro medio, otro titular)."""
+    toks = texto.split()
+    for _ in range(cambios):
+        toks[rng.randrange(len(toks))] = "editado"
+    return " ".join(toks)
+
+def test_agrupa_casi_duplicados_y_el_primero_es_representante():
+    rng = random.Random(1)
+    base = _texto(rng)
+    idx = IndiceDuplicados()
+    assert idx.agregar("df", base, "df") == "df"
+    assert idx.agregar("lt", _variante(base, rng), "lt") == "df"
+    assert idx.agregar("emol", _variante(base, rng), "emol") == "df"
+    assert idx.representante("lt") == "df"
+    assert idx.clusters() == [["df", "lt", "emol"]]
+
+def test_textos_distintos_no_se_agrupan():
+    rng = random.Random(2)
+    idx = IndiceDuplicados()
+    for i in range(200):
+        assert idx.agregar(i, _texto(rng), i) == i
+    assert idx.clusters() == []
+
+def test_textos_cortos_no_se_agrupan():
+    idx = IndiceDuplicados()
+    idx.agregar("a", "Codelco sube producción", "a")
+    assert idx.agregar("b", "Codelco sube producción", "b") == "b"
+    assert idx.clusters() == []
+
+def test_agregar_es_idempotente_por_clave():
+    rng = random.Random(3)
+    base = _texto(rng)
+    idx = IndiceDuplicados()
+    idx.agregar("df", base, "df")
+    idx.agregar("lt", _variante(base, rng), "lt")
+    assert idx.agregar("lt", _texto(rng), "otro") == "df"
+    assert idx.clusters() == [["df", "lt"]]
+
+def test_representante_estable_al_unir_clusters():
+    # b comparte la mitad de su texto con a y la otra mitad con c (Jaccard ~0.5 con cada
+    # uno); a y c no se parecen. c llegó antes que b: al unir, todo queda bajo a.
+    rng = random.Random(4)
+    mitad1, mitad2 = _texto(rng, 100), _texto(rng, 100)
+    idx = IndiceDuplicados(umbral=0.25, bandas=64, filas=1)  # firma larga y LSH casi exhaustivo
+    idx.agregar("a", mitad1 + " " + _texto(rng, 3), "a")
+    idx.agregar("c", _texto(rng, 3) + " " + mitad2, "c")
+    assert idx.agregar("b", mitad1 + " " + mitad2, "b") == "a"
+    assert idx.representante("c") == "a"
+    assert idx.representante("desconocida") is None
+
+def test_hermano_usa_su_propio_texto_si_el_representante_no_nombra_al_objetivo():
+    import solo_apis
+
+    def articulo(url, texto):
+        return solo_apis.Articulo.crear(title=texto, description="", url=url, host="df.cl",
+                                        published=None, publishedAt="")
+    rep = articulo("https://df.cl/a", "CAP anuncia inversión en Huasco")
+    hermano = articulo("https://latercera.com/b", "CAP anuncia inversión en Huasco y Falabella abre tienda")
+    hermano.rep = rep
+    assert solo_apis._articulo_para_ia({"articulo": hermano, "tipo": "empresa", "empresa": "CAP S.A."}) is rep
+    assert solo_apis._articulo_para_ia({"articulo": hermano, "tipo": "empresa",
+                                        "empresa": "S.A.C.I. Falabella"}) is hermano
+    assert solo_apis._articulo_para_ia({"articulo": rep, "tipo": "empresa", "empresa": "CAP S.A."}) is rep
@@ -0,0 +1,147 @@
+# tests/test_entrega_correo.py
+import json
+import os
+import smtplib
+import socket
+import ssl
+
+import pytest
+
+from entrega_correo import EntregaCorreo, _transitoria
+
+@pytest.mark.parametrize("error, transitoria", [
+    (smtplib.SMTPServerDisconnected("cerrada"), True),
+    (smtplib.SMTPConnectError(421, b"ocupado"), True),
+    (smtplib.SMTPDataError(451, b"intente luego"), True),
+    (smtplib.SMTPDataError(554, b"rechazado"), False),
+    (smtplib.SMTPSenderRefused(550, b"remitente", "a@b.c"), False),
+    (smtplib.SMTPRecipientsRefused({"x@y.z": (450, b"buzon ocupado")}), True),
+    (smtplib.SMTPRecipientsRefused({"x@y.z": (450, b"ocupado"), "w@y.z": (550, b"no existe")}), False),
+    (smtplib.SMTPAuthenticationError(454, b"auth temporal"), False),
+    (smtplib.SMTPNotSupportedError("sin AUTH"), False),
+    (ssl.SSLCertVerificationError("certificado inválido"), False),
+    (ssl.SSLEOFError("EOF en TLS"), True),
+    (ConnectionRefusedError(), True),
+    (TimeoutError(), True),
+    (socket.gaierror("dns"), True),
+    (OSError(101, "Network is unreachable"), True),
+    (PermissionError(), False),
+    (ValueError("otra cosa"), False),
+])
+def test_transitoria(error, transitoria):
+    assert _transitoria(error) is transitoria
+
+class _SMTPFalso:
+    """Servidor de mentira: `fallas` se lanzan en orden en cada sendmail; después entrega."""
+
+    def __init__(self, fallas=()):
+        self.fallas = list(fallas)
+        self.enviados: list[tuple[str, list[str], bytes]] = []
+        self.rsets = 0
+
+    def sendmail(self, remitente, destinatarios, mensaje):
+        if self.fallas:
+            raise self.fallas.pop(0)
+        self.enviados.append((remitente, destinatarios, mensaje))
+
+    def noop(self):
+        return 250, b"ok"
+
+    def rset(self):
+        self.rsets += 1
+
+    def close(self):
+        pass
+
+    def quit(self):
+        pass
+
+@pytest.fixture
+def servidor(monkeypatch):
+    smtp = _SMTPFalso()
+    def conectar(self):
+        self.stats["conexiones"] += 1
+        return smtp
+    monkeypatch.setattr(EntregaCorreo, "_conectar", conectar)
+    return smtp
+
+@pytest.fixture
+def entrega(tmp_path, servidor):
+    return EntregaCorreo("localhost", 2525, seguridad="ninguna", reintentos=2, backoff_s=0,
+                         spool_dir=str(tmp_path / "spool"))
+
+def _spool(entrega):
+    return sorted(os.listdir(entrega.spool_dir)) if os.path.isdir(entrega.spool_dir) else []
+
+def test_envio_exitoso_no_deja_spool(entrega, servidor):
+    entrega.enviar("a@b.c", ["d@e.f"], "hola", ventana="2026-10-18-am")
+    assert len(servidor.enviados) == 1
+    assert _spool(entrega) == []
+
+def test_4xx_se_reintenta_con_la_misma_conexion(entrega, servidor):
+    servidor.fallas = [smtplib.SMTPDataError(451, b"intente luego")]
+    entrega.enviar("a@b.c", ["d@e.f"], "hola")
+    assert entrega.stats["intentos"] == 2 and entrega.stats["conexiones"] == 1
+    assert servidor.rsets == 1
+    assert len(servidor.enviados) == 1
+
+def test_falla_transitoria_queda_en_el_spool_de_su_ventana(entrega, servidor):
+    servidor.fallas = [smtplib.SMTPServerDisconnected("cerrada")] * 3
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        entrega.enviar("a@b.c", ["d@e.f"], "hola", ventana="2026-10-18-am")
+    assert entrega.stats["intentos"] == 3
+    assert entrega.pendientes("2026-10-18-am") == [os.path.join(entrega.spool_dir, _spool(entrega)[0])]
+    assert entrega.pendientes("2026-10-18-pm") == []
+
+def test_misma_ventana_reemplaza_la_entrada(entrega, servidor):
+    for texto in ("primera", "segunda"):
+        servidor.fallas = [smtplib.SMTPServerDisconnected("cerrada")] * 3
+        with pytest.raises(smtplib.SMTPServerDisconnected):
+            entrega.enviar("a@b.c", ["d@e.f", "g@h.i"], texto, ventana="2026-10-18-am")
+    # Mismos destinatarios (en otro orden) también son la misma entrada
+    servidor.fallas = [smtplib.SMTPServerDisconnected("cerrada")] * 3
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        entrega.enviar("a@b.c", ["G@h.i", "d@e.f"], "tercera", ventana="2026-10-18-am")
+    (nombre,) = _spool(entrega)
+    with open(os.path.join(entrega.spool_dir, nombre), encoding="utf-8") as fh:
+        assert json.load(fh)["mensaje"] == "tercera"
+
+def test_falla_permanente_no_se_reintenta_y_se_descarta(entrega, servidor):
+    servidor.fallas = [smtplib.SMTPDataError(554, b"rechazado")]
+    with pytest.raises(smtplib.SMTPDataError):
+        entrega.enviar("a@b.c", ["d@e.f"], "hola", ventana="2026-10-18-am")
+    assert entrega.stats["intentos"] == 1
+    assert entrega.stats["spool_descartados"] == 1
+    assert _spool(entrega) == []
+
+def test_reenviar_pendientes_devuelve_solo_lo_entregado(entrega, servidor):
+    os.makedirs(entrega.spool_dir)
+    servidor.fallas = [smtplib.SMTPServerDisconnected("cerrada")] * 3
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        entrega.enviar("a@b.c", ["d@e.f"], "am", ventana="2026-10-18-am")
+    (ok,) = entrega.pendientes()
+    ilegible = os.path.join(entrega.spool_dir, "2026-10-18-pm--000000000000.json")
+    with open(ilegible, "w", encoding="utf-8") as fh:
+        fh.write("{no es json")
+    assert entrega.reenviar_pendientes(max_edad_s=3600) == [ok]
+    assert _spool(entrega) == []
+    assert entrega.stats["spool_descartados"] == 1
+    assert [m for _, _, m in servidor.enviados] == [b"am"]
+
+def test_reenviar_pendientes_conserva_lo_que_vuelve_a_fallar(entrega, servidor):
+    servidor.fallas = [smtplib.SMTPServerDisconnected("cerrada")] * 6
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        entrega.enviar("a@b.c", ["d@e.f"], "am", ventana="2026-10-18-am")
+    assert entrega.reenviar_pendientes(max_edad_s=3600) == []
+    assert len(_spool(entrega)) == 1 and entrega.stats["spool_pendientes"] == 1
+
+def test_reenviar_pendientes_descarta_vencidos(entrega, servidor):
+    servidor.fallas = [smtplib.SMTPServerDisconnected("cerrada")] * 3
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        entrega.enviar("a@b.c", ["d@e.f"], "am", ventana="2026-10-18-am")
+    assert entrega.reenviar_pendientes(max_edad_s=-1) == []
+    assert _spool(entrega) == [] and servidor.enviados == []
+
+def test_seguridad_desconocida():
+    with pytest.raises(ValueError):
+        EntregaCorreo("localhost", 25, seguridad="tls")
@@ -0,0 +1,147 @@
+# tests/test_filtro_IA.py
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import filtro_IA
+
+class _ErrorAPI(Exception):
+    def __init__(self, msg: str, status_code: int, code: str | None = None):
+        super().__init__(msg)
+        self.status_code = status_code
+        self.code = code
+
+class _ClienteFalso:
+    """chat.completions.create que responde según `responder(objetivos)` y registra cada llamada."""
+
+    def __init__(self, responder):
+        self.responder = responder
+        self.llamadas: list[list[str]] = []
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, model=None, messages=None, **kw):
+        noticias = json.loads(messages[-1]["content"].split("\n", 1)[1])
+        ids = [o["id"] for n in noticias for o in n["objetivos"]]
+        self.llamadas.append(ids)
+        contenido = self.responder(ids)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=contenido))], usage=None)
+
+def _json(ids):
+    return json.dumps([{"id": i, "categoria": "MEDIA"} for i in ids])
+
+@pytest.fixture(autouse=True)
+def _sin_esperas(monkeypatch):
+    monkeypatch.setattr(filtro_IA, "VERBOSE", False)
+    monkeypatch.setattr(filtro_IA, "IA_MAX_RETRIES", 0)
+    monkeypatch.setattr(filtro_IA, "_RPM_BUCKET", filtro_IA._TokenBucket(0))
+    monkeypatch.setattr(filtro_IA, "_TPM_BUCKET", filtro_IA._TokenBucket(0))
+    monkeypatch.setattr(filtro_IA, "IA_STATS", {})
+    monkeypatch.setattr(filtro_IA, "IA_LOTES", [])
+
+def _lote(n_noticias: int, objetivos_por_noticia: int = 2) -> list[dict]:
+    items = [{"id": f"{i}-{j}", "titulo": f"Noticia {i}", "descripcion": "texto", "empresa": f"Empresa {j}",
+              "tipo": "empresa"}
+             for i in range(n_noticias) for j in range(objetivos_por_noticia)]
+    (lote,) = list(filtro_IA._chunk_grupos(filtro_IA._agrupar_por_noticia(items)))
+    return lote
+
+def _clasificar(cliente, lote):
+    return filtro_IA._classify_chunk(cliente, "modelo", lote, {}, None)
+
+def test_respuesta_ilegible_parte_el_lote_hasta_que_se_puede_leer():
+    cliente = _ClienteFalso(lambda ids: _json(ids) if len(ids) <= 2 else "esto no es JSON")
+    res = _clasificar(cliente, _lote(4))
+    assert res == {f"{i}-{j}": "MEDIA" for i in range(4) for j in range(2)}
+    assert len(cliente.llamadas[0]) == 8
+    assert filtro_IA.IA_STATS["lotes_divididos"] == 3  # 8 → 4+4 → 2+2+2+2
+
+def test_noticia_sola_se_parte_por_objetivos():
+    cliente = _ClienteFalso(lambda ids: _json(ids) if len(ids) == 1 else "[{")
+    res = _clasificar(cliente, _lote(1, objetivos_por_noticia=4))
+    assert set(res.values()) == {"MEDIA"} and len(res) == 4
+
+def test_objetivo_aislado_que_sigue_fallando_queda_sin_clasificar():
+    cliente = _ClienteFalso(lambda ids: "[{")
+    res = _clasificar(cliente, _lote(1, objetivos_por_noticia=1))
+    assert res == {"0-0": "SIN CLASIFICAR"}
+    assert len(cliente.llamadas) == 1
+
+def test_contexto_excedido_parte_el_lote():
+    def responder(ids):
+        if len(ids) > 4:
+            raise _ErrorAPI("This model's maximum context length is ...", 400, "context_length_exceeded")
+        return _json(ids)
+    cliente = _ClienteFalso(responder)
+    res = _clasificar(cliente, _lote(4))
+    assert set(res.values()) == {"MEDIA"} and len(res) == 8
+    assert [len(ids) for ids in cliente.llamadas] == [8, 4, 4]
+
+@pytest.mark.parametrize("error", [
+    _ErrorAPI("invalid api key", 401),
+    _ErrorAPI("model not found", 404),
+    _ErrorAPI("rate limit", 429),  # reintentos agotados (IA_MAX_RETRIES = 0)
+    _ErrorAPI("bad request", 400, "invalid_request_error"),
+])
+def test_otras_fallas_no_parten_el_lote(error):
+    def responder(ids):
+        raise error
+    cliente = _ClienteFalso(responder)
+    res = _clasificar(cliente, _lote(4))
+    assert set(res.values()) == {"SIN CLASIFICAR"} and len(res) == 8
+    assert len(cliente.llamadas) == 1
+    assert "lotes_divididos" not in filtro_IA.IA_STATS
+
+def test_objetivos_omitidos_se_reencolan():
+    respuestas = iter([lambda ids: _json(ids[:-1])])  # la primera respuesta omite el último objetivo
+    cliente = _ClienteFalso(lambda ids: next(respuestas, _json)(ids))
+    res = _clasificar(cliente, _lote(2))
+    assert res == {f"{i}-{j}": "MEDIA" for i in range(2) for j in range(2)}
+    assert cliente.llamadas == [["0-0", "0-1", "1-0", "1-1"], ["1-1"]]
+
+def test_reencolado_acotado():
+    cliente = _ClienteFalso(lambda ids: _json(ids[:-1]))  # siempre omite el último
+    res = _clasificar(cliente, _lote(2))
+    assert len(cliente.llamadas) == 1 + filtro_IA.IA_MAX_REQUEUE
+    assert "1-1" not in res  # classify_batch lo deja SIN CLASIFICAR
+
+# ---------- caché de clasificaciones ----------
+@pytest.fixture
+def cache(tmp_path):
+    return filtro_IA._CacheClasificaciones(str(tmp_path / "clasificaciones.sqlite"))
+
+def _envejecer(cache, clave: str, dias: float, campo: str = "creado"):
+    with cache._lock:
+        cache._conn.execute(f"UPDATE clasificaciones SET {campo} = {campo} - ? WHERE clave = ?", (dias * 86400, clave))
+        cache._conn.commit()
+
+def test_cache_expira_por_edad(cache):
+    cache.put_many({"a": "ALTA", "b": "NULA"})
+    _envejecer(cache, "a", 15)
+    assert cache.evict(ttl_days=14, max_entries=100) == 1
+    assert cache.get_many(["a", "b"]) == {"b": "NULA"}
+
+def test_cache_sobre_el_tope_borra_las_menos_usadas(cache):
+    cache.put_many({"a": "ALTA", "b": "MEDIA", "c": "BAJA"})
+    for clave, dias in (("a", 3), ("b", 1), ("c", 2)):
+        _envejecer(cache, clave, dias, campo="usado")
+    assert cache.evict(ttl_days=14, max_entries=2) == 1
+    assert cache.get_many(["a", "b", "c"]) == {"b": "MEDIA", "c": "BAJA"}
+
+def test_cache_evita_la_api_en_la_segunda_corrida(cache, monkeypatch):
+    cliente = _ClienteFalso(_json)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(filtro_IA, "IA_CACHE_PATH", "en-memoria")
+    monkeypatch.setattr(filtro_IA, "_CACHE", cache)
+    monkeypatch.setattr(filtro_IA, "_get_client", lambda api_key: cliente)
+    items = [{"id": f"{i}-E", "titulo": f"Noticia {i}", "descripcion": "texto", "empresa": "CAP S.A.", "tipo": "empresa"}
+             for i in range(3)]
+    assert {r["categoria"] for r in filtro_IA.classify_batch(items)} == {"MEDIA"}
+    # Otra corrida: ids distintos (son posicionales), mismo contenido → todo desde la caché
+    otra = [{**it, "id": f"x{it['id']}"} for it in items]
+    assert {r["categoria"] for r in filtro_IA.classify_batch(otra)} == {"MEDIA"}
+    assert len(cliente.llamadas) == 1
+    assert filtro_IA.IA_STATS["cache_hits"] == 3
+    # Cambia el objetivo: es otra clave
+    filtro_IA.classify_batch([{**items[0], "empresa": "Cencosud S.A."}])
+    assert len(cliente.llamadas) == 2
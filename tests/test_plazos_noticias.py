@@ -0,0 +1,64 @@
+# tests/test_plazos_noticias.py
+import time
+
+import pytest
+
+import filtro_IA
+import solo_apis
+from plazos_noticias import ETAPAS, PlanPlazos
+
+def test_limites_acumulados_y_el_ultimo_es_el_total():
+    p = PlanPlazos(100, {"fetch": 2, "clasificacion": 1, "entrega": 1}, inicio=1000.0)
+    assert p.limite("fetch") == 1050.0
+    assert p.limite("clasificacion") == 1075.0
+    assert p.limite("entrega") == 1100.0
+    assert p.resumen()["limites_s"] == {"fetch": 50.0, "clasificacion": 75.0, "entrega": 100.0}
+
+def test_vencido_y_restante():
+    ahora = time.monotonic()
+    p = PlanPlazos(10, {e: 1 for e in ETAPAS}, inicio=ahora - 5)
+    assert p.vencido("fetch") and p.restante("fetch") == 0.0
+    assert not p.vencido("entrega") and 0 < p.restante("entrega") <= 5
+    p.vencer("fetch", "emol.com omitida")
+    assert p.resumen()["vencidas"] == {"fetch": ["emol.com omitida"]}
+
+@pytest.mark.parametrize("total, fracciones", [
+    (0, {e: 1 for e in ETAPAS}),
+    (60, {"fetch": 1, "clasificacion": 1}),
+])
+def test_configuracion_invalida(total, fracciones):
+    with pytest.raises(ValueError):
+        PlanPlazos(total, fracciones)
+
+# ---------- etapas que respetan el plazo ----------
+def test_token_bucket_desiste_si_la_espera_no_cabe():
+    b = filtro_IA._TokenBucket(60)  # 1 por segundo
+    b.tokens = 0
+    t0 = time.monotonic()
+    assert b.acquire(5, timeout=0.5) is False
+    assert time.monotonic() - t0 < 0.1  # no durmió hasta el timeout
+    assert b.tokens < 1  # no descontó nada
+    assert filtro_IA._TokenBucket(0).acquire(1, timeout=0) is True  # sin límite
+
+def test_create_with_retry_no_espera_cupo_pasado_el_plazo(monkeypatch):
+    bucket = filtro_IA._TokenBucket(1)  # 1 request por minuto
+    bucket.tokens = 0
+    monkeypatch.setattr(filtro_IA, "_RPM_BUCKET", bucket)
+    monkeypatch.setattr(filtro_IA, "_TPM_BUCKET", filtro_IA._TokenBucket(0))
+    t0 = time.monotonic()
+    with pytest.raises(filtro_IA.PlazoAgotado):
+        filtro_IA._create_with_retry(None, "modelo", "{}", 1, deadline=t0 + 1)
+    assert time.monotonic() - t0 < 0.5
+
+def test_request_de_event_registry_acotado_al_plazo(monkeypatch):
+    timeouts = []
+    request = solo_apis._request_con_plazo(lambda *a, **kw: timeouts.append(kw["timeout"]))
+    monkeypatch.setattr(solo_apis._ER_LOCAL, "plazo", None, raising=False)
+    request("POST", "https://eventregistry.org/api", timeout=60)
+    solo_apis._ER_LOCAL.plazo = time.monotonic() + 3
+    request("POST", "https://eventregistry.org/api", timeout=60)
+    assert timeouts[0] == 60 and 2 < timeouts[1] <= 3
+    solo_apis._ER_LOCAL.plazo = time.monotonic() - 1
+    with pytest.raises(TimeoutError):
+        request("POST", "https://eventregistry.org/api", timeout=60)
+    assert len(timeouts) == 2
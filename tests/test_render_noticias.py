@@ -0,0 +1,53 @@
+# tests/test_render_noticias.py
+import csv
+import io
+
+import pytest
+
+from render_noticias import ERRORES_MAX, GMAIL_CLIP_BYTES, SECCIONES, Fila, render_digest
+
+def _filas(n: int, categorias=("ALTA", "MEDIA", "BAJA", "SIN CLASIFICAR")) -> list[Fila]:
+    return [Fila(categoria=categorias[i % len(categorias)], etiquetas=f"Empresa {i} (ALTA)",
+                 titulo=f"Título de la noticia número {i} con acentos y ñ", url=f"https://www.df.cl/noticia-{i}",
+                 fuente="df.cl", fecha="2026-10-18 08:00", descripcion="Descripción larga. " * 20)
+            for i in range(n)]
+
+def test_pocas_filas_van_completas_y_sin_adjuntos():
+    d = render_digest(_filas(8), "Noticias", [])
+    assert d.stats["completas"] == 8 and d.stats["compactas"] == d.stats["omitidas"] == 0
+    assert d.adjuntos == []
+    # Secciones en orden, ALTA primero
+    posiciones = [d.html.index(f"<h3 class='s'>{s} (2)</h3>") for s in SECCIONES]
+    assert posiciones == sorted(posiciones)
+
+def test_sin_filas():
+    d = render_digest([], "Noticias", [])
+    assert "Sin noticias relevantes" in d.html and d.adjuntos == []
+
+@pytest.mark.parametrize("n", [100, 600, 5000])
+def test_html_nunca_pasa_el_presupuesto(n):
+    errores = [("emol.com", f"error {i} <con html>") for i in range(ERRORES_MAX + 5)]
+    d = render_digest(_filas(n), "Noticias", errores)
+    assert len(d.html.encode("utf-8")) == d.stats["bytes_html"] <= GMAIL_CLIP_BYTES
+    assert d.stats["completas"] + d.stats["compactas"] + d.stats["omitidas"] == n
+    # Los errores se reservan antes que las filas: siempre llegan al destinatario
+    assert "error 0 &lt;con html&gt;" in d.html and "… y 5 errores más" in d.html
+    assert d.html.endswith("</div></div></body></html>")
+
+def test_lo_que_no_cabe_va_adjunto():
+    filas = _filas(3000)
+    d = render_digest(filas, "Noticias", [("df.cl", "timeout")])
+    assert d.stats["omitidas"] > 0 and d.stats["compactas"] > 0
+    assert "más en SIN CLASIFICAR (ver adjunto)" in d.html
+    adjuntos = {nombre: contenido for nombre, contenido, _ in d.adjuntos}
+    assert set(adjuntos) == {"reporte_completo.html", "reporte_completo.csv"}
+    filas_csv = list(csv.reader(io.StringIO(adjuntos["reporte_completo.csv"].decode("utf-8-sig"))))
+    assert len(filas_csv) == 1 + len(filas)
+    assert adjuntos["reporte_completo.html"].decode("utf-8").count("<li class='n'>") == len(filas)
+
+def test_presupuesto_chico():
+    d = render_digest(_filas(50), "Noticias", [], presupuesto=3000)
+    assert d.stats["bytes_html"] <= 3000
+    assert d.stats["omitidas"] > 40
+    assert d.stats["completas"] + d.stats["compactas"] + d.stats["omitidas"] == 50
+    assert "ver adjunto" in d.texto
@@ -0,0 +1,58 @@
+# tests/test_watchlist_noticias.py
+import json
+import os
+
+import pytest
+
+from watchlist_noticias import TrieMatcher, Watchlist, cargar_artefacto, guardar_artefacto, huella, validar
+
+def _normalizar(s: str) -> str:
+    return s.lower()
+
+@pytest.fixture
+def watchlist():
+    return Watchlist(empresas=["CAP S.A.", "Banco de Chile"], aliases={"CAP S.A.": ["CAP"], "Banco de Chile": ["bchile"]},
+                     industria_keywords={"Mineria": ["cobre", "mina"]}, negativos={"Mineria": ["mina de oro falsa"]})
+
+def test_trie_respeta_limites_de_palabra():
+    m = TrieMatcher({"CAP": ["cap"], "Banco": ["banco de chile", "banco"]})
+    assert m.buscar("la cap sube; el banco de chile baja") == {"CAP": ["cap"], "Banco": ["banco", "banco de chile"]}
+    assert m.buscar("capital y bancos") == {}
+    assert m.posiciones("cap cap") == {"CAP": [0, 4]}
+
+def test_validar_detecta_alias_compartidos(watchlist):
+    assert validar(watchlist, _normalizar) == []
+    watchlist.aliases["Banco de Chile"].append("cap")
+    assert validar(watchlist, _normalizar) == ["alias 'cap' compartido por: Banco de Chile, CAP S.A."]
+
+def test_artefacto_json_ida_y_vuelta(tmp_path, watchlist):
+    d = str(tmp_path)
+    h = huella(watchlist)
+    matchers = (TrieMatcher({"CAP S.A.": ["cap"]}), TrieMatcher({"Mineria": ["cobre", "mina"]}))
+    guardar_artefacto(d, h, matchers)
+    (nombre,) = os.listdir(d)
+    assert nombre.endswith(".json")
+    cargados = cargar_artefacto(d, h)
+    texto = "cap compra una mina de cobre"
+    assert [m.buscar(texto) for m in cargados] == [m.buscar(texto) for m in matchers]
+    assert [m.labels for m in cargados] == [m.labels for m in matchers]
+
+def test_artefacto_de_otra_huella_o_alterado_se_descarta(tmp_path, watchlist):
+    d = str(tmp_path)
+    h = huella(watchlist)
+    guardar_artefacto(d, h, (TrieMatcher({"CAP S.A.": ["cap"]}),))
+    watchlist.empresas.append("Otra")
+    assert cargar_artefacto(d, huella(watchlist)) is None
+    (ruta,) = [os.path.join(d, f) for f in os.listdir(d)]
+    with open(ruta, encoding="utf-8") as fh:
+        data = json.load(fh)
+    data["matchers"] = [{"labels": "no es lista", "trie": {}}]
+    with open(ruta, "w", encoding="utf-8") as fh:
+        json.dump(data, fh)
+    assert cargar_artefacto(d, h) is None
+
+def test_guardar_borra_artefactos_previos(tmp_path, watchlist):
+    d = str(tmp_path)
+    (tmp_path / "matchers-0123456789abcdef.pkl").write_bytes(b"viejo")
+    guardar_artefacto(d, huella(watchlist), (TrieMatcher({}),))
+    assert [f.endswith(".json") for f in os.listdir(d)] == [True]
@@ -0,0 +1,213 @@
+# watchlist_noticias.py
+import gc
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+# Watchlist externa (empresas + alias, industrias + keywords + negativos) en JSON:
+#   {"empresas": [{"nombre": "CAP S.A.", "alias": ["CAP", ...], "nota": "⚠ ..."}, ...],
+#    "industrias": {"Mineria": {"keywords": [...], "negativos": [...]}, ...}}
+# y artefacto de matchers ya compilados en disco, con nombre = huella (sha256) del
+# contenido de la watchlist: al arrancar se carga el artefacto y solo se recompila
+# si la watchlist (o el formato del artefacto) cambió.
+
+ARTEFACTO_VERSION = 3  # subir si cambia la normalización o la estructura de los matchers
+
+# El artefacto es JSON (el trie tal cual, dicts anidados) y no pickle: vive en el
+# directorio de caché, que CI restaura entre corridas, y cargarlo no debe poder
+# ejecutar código. Un archivo alterado a lo más da matches malos hasta que cambie la
+# huella; uno con estructura inválida se descarta y se recompila.
+
+_WORD_CHAR_RE = re.compile(r"\w")
+_BOUNDARY_RE = re.compile(r"\b")
+
+class TrieMatcher:
+    """
+    Trie de caracteres sobre patrones ya normalizados, anclado en límites de palabra.
+    Equivale a correr re.search(rf"\\b{re.escape(p)}\\b", texto) para cada patrón,
+    pero recorre el texto una sola vez (sin importar cuántos patrones haya).
+    Los nodos son dicts {carácter: nodo, "": {label: [patrones]}}: la clave "" (nunca
+    un carácter del texto) marca los terminales y deja el trie serializable en JSON.
+    """
+    __slots__ = ("_root", "labels")
+
+    def __init__(self, patrones_por_label: dict[str, list[str]]):
+        self._root: dict = {}
+        self.labels: list[str] = list(patrones_por_label)
+        for label, patrones in patrones_por_label.items():
+            for p in patrones:
+                if not p:
+                    continue
+                node = self._root
+                for ch in p:
+                    node = node.setdefault(ch, {})
+                # "" -> { label: [patrones que terminan aquí] }
+                node.setdefault("", {}).setdefault(label, []).append(p)
+
+    def estado(self) -> dict:
+        """Labels y trie como datos planos (para el artefacto JSON)."""
+        return {"labels": self.labels, "trie": self._root}
+
+    @classmethod
+    def desde_estado(cls, estado: dict) -> "TrieMatcher":
+        """Inverso de estado(), sin recompilar. ValueError si la estructura no calza."""
+        if not (isinstance(estado, dict) and isinstance(estado.get("labels"), list)
+                and isinstance(estado.get("trie"), dict)):
+            raise ValueError("matcher con estructura inválida")
+        m = cls.__new__(cls)
+        m.labels = [str(l) for l in estado["labels"]]
+        m._root = estado["trie"]
+        return m
+
+    def buscar(self, texto: str) -> dict[str, list[str]]:
+        """Devuelve { label: [patrones que hicieron match] } para todo el texto."""
+        hits: dict[str, list[str]] = {}
+        for _, label, p in self._ocurrencias(texto):
+            acc = hits.setdefault(label, [])
+            if p not in acc:
+                acc.append(p)
+        return hits
+
+    def posiciones(self, texto: str) -> dict[str, list[int]]:
+        """Devuelve { label: [inicio de cada ocurrencia] } (mismas coincidencias que buscar)."""
+        pos: dict[str, list[int]] = {}
+        for i, label, _ in self._ocurrencias(texto):
+            acc = pos.setdefault(label, [])
+            if not acc or acc[-1] != i:
+                acc.append(i)
+        return pos
+
+    def _ocurrencias(self, texto: str) -> Iterator[tuple[int, str, str]]:
+        """Genera (inicio, label, patrón) por cada ocurrencia anclada en límites de palabra."""
+        if not texto or not self._root:
+            return
+        root = self._root
+        n = len(texto)
+        for m in _BOUNDARY_RE.finditer(texto):
+            i = m.start()
+            node = root.get(texto[i]) if i < n else None
+            j = i + 1
+            while node is not None:
+                terminales = node.get("")
+                if terminales:
+                    # \b al final: cambia la "clase" (palabra / no palabra) entre j-1 y j
+                    prev_w = _WORD_CHAR_RE.match(texto[j - 1]) is not None
+                    next_w = j < n and _WORD_CHAR_RE.match(texto[j]) is not None
+                    if prev_w != next_w:
+                        for label, pats in terminales.items():
+                            for p in pats:
+                                yield i, label, p
+                if j >= n:
+                    break
+                node = node.get(texto[j])
+                j += 1
+
+@dataclass(slots=True)
+class Watchlist:
+    empresas: list[str]
+    aliases: dict[str, list[str]]
+    industria_keywords: dict[str, list[str]]
+    negativos: dict[str, list[str]]
+
+def cargar_watchlist(path: str) -> Watchlist:
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    try:
+        empresas = [str(e["nombre"]) for e in data["empresas"]]
+        aliases = {str(e["nombre"]): [str(a) for a in e.get("alias") or []] for e in data["empresas"]}
+        industrias = data.get("industrias") or {}
+        keywords = {str(i): [str(k) for k in v.get("keywords") or []] for i, v in industrias.items()}
+        negativos = {str(i): [str(n) for n in v.get("negativos") or []] for i, v in industrias.items() if v.get("negativos")}
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"watchlist con formato inválido ({path}): {e!r}") from e
+    return Watchlist(empresas, aliases, keywords, negativos)
+
+def validar(w: Watchlist, normalizar: Callable[[str], str]) -> list[str]:
+    """
+    Problemas que impiden usar la watchlist: empresas repetidas, alias vacíos tras
+    normalizar y alias que chocan entre empresas (el mismo texto marcaría a dos emisores).
+    Repetir un alias dentro de la misma empresa no es problema.
+    """
+    problemas = []
+    vistos: set[str] = set()
+    for e in w.empresas:
+        if not normalizar(e).strip():
+            problemas.append(f"empresa sin nombre: {e!r}")
+        if e in vistos:
+            problemas.append(f"empresa repetida: {e!r}")
+        vistos.add(e)
+    duenos: dict[str, set[str]] = defaultdict(set)
+    for e in w.empresas:
+        for a in [e] + w.aliases.get(e, []):
+            p = normalizar(a)
+            if not p.strip():
+                problemas.append(f"alias vacío tras normalizar en {e!r}: {a!r}")
+                continue
+            duenos[p].add(e)
+    for p, es in sorted(duenos.items()):
+        if len(es) > 1:
+            problemas.append(f"alias {p!r} compartido por: {', '.join(sorted(es))}")
+    for i in w.negativos:
+        if i not in w.industria_keywords:
+            problemas.append(f"negativos para industria sin keywords: {i!r}")
+    return problemas
+
+def huella(w: Watchlist) -> str:
+    """sha256 del contenido (orden incluido: define el orden de labels) + versiones."""
+    contenido = json.dumps(
+        [ARTEFACTO_VERSION, sys.version_info[:2], w.empresas, w.aliases, w.industria_keywords, w.negativos],
+        ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+def _ruta(directorio: str, h: str) -> str:
+    return os.path.join(directorio, f"matchers-{h[:16]}.json")
+
+def cargar_artefacto(directorio: str, h: str) -> tuple[TrieMatcher, ...] | None:
+    """Matchers compilados para la huella `h`, o None si no hay artefacto válido."""
+    if not directorio:
+        return None
+    # El trie son cientos de miles de dicts chicos: sin GC durante la carga es ~3x más rápido
+    gc_activo = gc.isenabled()
+    gc.disable()
+    try:
+        with open(_ruta(directorio, h), encoding="utf-8") as fh:
+            data = json.load(fh)
+        if not isinstance(data, dict) or data.get("huella") != h:
+            return None
+        matchers = tuple(TrieMatcher.desde_estado(e) for e in data["matchers"])
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"[WARN] Artefacto de matchers ilegible ({e}); se recompila.", flush=True)
+        return None
+    finally:
+        if gc_activo:
+            gc.enable()
+    return matchers
+
+def guardar_artefacto(directorio: str, h: str, matchers: tuple[TrieMatcher, ...]) -> None:
+    """Escribe el artefacto (atómico) y borra los de otras huellas (y los .pkl de versiones previas)."""
+    if not directorio:
+        return
+    os.makedirs(directorio, exist_ok=True)
+    ruta = _ruta(directorio, h)
+    tmp = ruta + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        # dumps (encoder en C) y una sola escritura: json.dump a archivo va trozo a trozo en Python
+        fh.write(json.dumps({"huella": h, "matchers": [m.estado() for m in matchers]},
+                            ensure_ascii=False, separators=(",", ":")))
+    os.replace(tmp, ruta)  # escritura atómica
+    viejos = glob.glob(os.path.join(directorio, "matchers-*.json")) + glob.glob(os.path.join(directorio, "matchers-*.pkl"))
+    for viejo in viejos:
+        if viejo != ruta:
+            try:
+                os.remove(viejo)
+            except OSError:
+                pass